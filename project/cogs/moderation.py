@@ -1,35 +1,290 @@
 import asyncio
+import contextlib
 import logging
 import re
+from collections.abc import Iterable
 
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 
 from project.config import get_config
-from project.database.connection import init_database
+from project.database.analytics import (
+    GuildModerationStats,
+    get_async_analytics_service,
+)
+from project.database.audit_queue import audit_queue
+from project.database.cleanup import run_sqlite_maintenance
+from project.database.connection import engine
+from project.database.executor import DatabaseBusyError, run_db
+from project.database.models import SecureWarning
+from project.database.schema import check_schema_version_async
+from project.database.security import security_manager
 
 # Import our secure database system
-from project.database.services import get_warning_service
+from project.database.services import (
+    DEFAULT_PAGE_SIZE,
+    AsyncWarningService,
+    get_async_warning_service,
+)
+from project.database.unit_of_work import (
+    begin_async_unit_of_work,
+    current_async_unit_of_work,
+    end_async_unit_of_work,
+)
 from project.utils.audit import log_moderation_action
 from project.utils.permissions import validate_hierarchy
 
 
 logger = logging.getLogger(__name__)
 
+# Seconds the !warnings page buttons stay active
+WARNINGS_VIEW_TIMEOUT = 180
+
+# !modstats period bounds (days) and number of recent days listed
+MODSTATS_MAX_DAYS = 365
+MODSTATS_RECENT_DAYS = 7
+
+# Hours between SQLite PRAGMA optimize / WAL checkpoint runs
+SQLITE_MAINTENANCE_HOURS = 6
+
+# Reply when the database sheds a command under load
+DATABASE_BUSY_MESSAGE = "⏳ The database is busy right now. Please retry in a moment."
+
+
+def match_moderators(
+    moderator_hashes: Iterable[str],
+    staff: list[tuple[int, str]],
+) -> dict[str, str]:
+    """Mentions of the staff behind ``moderator_hashes``.
+
+    Only hashes are stored, so staff (member ID, mention) are hashed until
+    every wanted hash is found. Blocking: run it through run_db().
+    """
+    wanted = set(moderator_hashes)
+    mentions = {}
+    for member_id, mention in staff:
+        if not wanted:
+            break
+        moderator_hash = security_manager.hash_discord_id(str(member_id))
+        if moderator_hash in wanted:
+            wanted.discard(moderator_hash)
+            mentions[moderator_hash] = mention
+    return mentions
+
+
+async def resolve_moderators(
+    stats: GuildModerationStats,
+    guild: discord.Guild,
+) -> dict[str, str]:
+    """Mentions of the top moderators, hashed off the event loop."""
+    if not stats.top_moderators:
+        return {}
+    staff = [
+        (member.id, member.mention)
+        for member in guild.members
+        if member.guild_permissions.manage_messages
+    ]
+    return await run_db(
+        match_moderators,
+        [moderator_hash for moderator_hash, _count in stats.top_moderators],
+        staff,
+    )
+
+
+def build_modstats_embed(
+    stats: GuildModerationStats,
+    moderators: dict[str, str],
+) -> discord.Embed:
+    """Render moderation analytics; ``moderators`` maps hashes to mentions."""
+    embed = discord.Embed(
+        title=f"📊 Moderation stats: last {stats.days} days",
+        color=discord.Color.blurple(),
+    )
+
+    totals: dict[str, int] = {}
+    for action_counts in stats.actions_per_day.values():
+        for action_type, count in action_counts.items():
+            totals[action_type] = totals.get(action_type, 0) + count
+    embed.add_field(
+        name=f"Actions ({stats.total_actions})",
+        value="\n".join(
+            f"{action_type}: {count}"
+            for action_type, count in sorted(totals.items(), key=lambda t: -t[1])
+        )
+        or "None",
+        inline=True,
+    )
+
+    recent = sorted(stats.actions_per_day.items(), reverse=True)
+    embed.add_field(
+        name="Recent days",
+        value="\n".join(
+            f"{day.isoformat()}: {sum(action_counts.values())}"
+            for day, action_counts in recent[:MODSTATS_RECENT_DAYS]
+        )
+        or "None",
+        inline=True,
+    )
+
+    embed.add_field(
+        name="Top moderators",
+        value="\n".join(
+            f"{moderators.get(moderator_hash, f'`{moderator_hash[:8]}`')}: {count}"
+            for moderator_hash, count in stats.top_moderators
+        )
+        or "None",
+        inline=False,
+    )
+    embed.add_field(
+        name="Repeat offenders",
+        value="\n".join(
+            f"`{user_hash[:8]}`: {count} actions"
+            for user_hash, count in stats.repeat_offenders
+        )
+        or "None",
+        inline=False,
+    )
+    embed.set_footer(text="Members are shown by hashed ID")
+    return embed
+
+
+class WarningHistoryView(discord.ui.View):
+    """Paged !warnings embed.
+
+    Pages are fetched with keyset pagination and only the visible page is
+    decrypted, so cost stays flat however long the member's history is.
+    """
+
+    def __init__(
+        self,
+        service: AsyncWarningService,
+        guild_id: str,
+        member: discord.Member,
+        author_id: int,
+        total: int,
+        page_size: int = DEFAULT_PAGE_SIZE,
+    ):
+        super().__init__(timeout=WARNINGS_VIEW_TIMEOUT)
+        self.service = service
+        self.guild_id = guild_id
+        self.member = member
+        self.author_id = author_id
+        self.total = total
+        self.page_size = page_size
+        # Cursor of every page visited so far; the last one is on screen
+        self.cursors: list[str | None] = [None]
+        self.next_cursor: str | None = None
+        self.message: discord.Message | None = None
+
+    async def render(self) -> discord.Embed:
+        """Fetch and decrypt the current page and build its embed."""
+        page = await self.service.get_user_warnings_page(
+            self.guild_id,
+            str(self.member.id),
+            limit=self.page_size,
+            cursor=self.cursors[-1],
+        )
+        self.next_cursor = page.next_cursor
+        self.previous_page.disabled = len(self.cursors) == 1
+        self.next_page.disabled = page.next_cursor is None
+
+        embed = discord.Embed(
+            title=f"📋 Warnings for {self.member.display_name}",
+            color=discord.Color.blue(),
+        )
+        embed.set_thumbnail(url=self.member.display_avatar.url)
+
+        if not page.warnings:
+            embed.description = "No warnings found."
+        else:
+            reasons = await SecureWarning.decrypt_reasons_async(page.warnings)
+            for warning, reason in zip(page.warnings, reasons, strict=True):
+                created_date = warning.created_at.strftime("%Y-%m-%d %H:%M")
+
+                embed.add_field(
+                    name=f"Warning #{warning.id}",
+                    value=f"**Reason:** {reason}\n**Date:** {created_date}",
+                    inline=False,
+                )
+
+        embed.set_footer(
+            text=f"Page {len(self.cursors)} • Total warnings: {self.total}",
+        )
+        return embed
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        """Only let the moderator who ran the command turn pages."""
+        if interaction.user.id == self.author_id:
+            return True
+        await interaction.response.send_message(
+            "❌ Only the moderator who ran this command can change pages.",
+            ephemeral=True,
+        )
+        return False
+
+    @discord.ui.button(label="◀ Previous", style=discord.ButtonStyle.secondary)
+    async def previous_page(self, interaction: discord.Interaction, _button):
+        self.cursors.pop()
+        await interaction.response.edit_message(embed=await self.render(), view=self)
+
+    @discord.ui.button(label="Next ▶", style=discord.ButtonStyle.secondary)
+    async def next_page(self, interaction: discord.Interaction, _button):
+        self.cursors.append(self.next_cursor)
+        await interaction.response.edit_message(embed=await self.render(), view=self)
+
+    async def on_timeout(self):
+        """Disable the buttons once the view stops listening."""
+        for item in self.children:
+            item.disabled = True
+        if self.message:
+            with contextlib.suppress(discord.HTTPException):
+                await self.message.edit(view=self)
+
 
 class Moderation(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
 
     async def cog_load(self):
-        """Initialize database when cog is loaded."""
+        """Check the database schema version when the cog is loaded.
+
+        Migrations are applied by `alembic upgrade head` before the bot
+        starts; loading the cog runs no DDL.
+        """
         try:
-            # Consider making init_database async if possible
-            init_database()
-            logger.info("✅ Database initialized for moderation system")
+            revision = await check_schema_version_async()
+            logger.info("✅ Database schema at revision %s", revision)
         except Exception:
-            logger.exception("❌ Failed to initialize database")
+            logger.exception("❌ Database schema check failed")
             raise
+        if engine.dialect.name == "sqlite":
+            self.sqlite_maintenance.start()
+
+    async def cog_unload(self):
+        """Stop maintenance and write queued audit logs before unloading."""
+        self.sqlite_maintenance.cancel()
+        if audit_queue is not None:
+            await run_db(audit_queue.close)
+
+    async def cog_before_invoke(self, _ctx):
+        """Give each command one database session, opened on first use."""
+        begin_async_unit_of_work()
+
+    async def cog_after_invoke(self, ctx):
+        """Commit the command's database work, or roll it back if it failed."""
+        await end_async_unit_of_work(failed=ctx.command_failed)
+
+    @staticmethod
+    async def commit_database_work():
+        """Commit the command's writes before telling the moderator they worked."""
+        unit = current_async_unit_of_work()
+        if unit is not None:
+            await unit.commit()
+
+    @tasks.loop(hours=SQLITE_MAINTENANCE_HOURS)
+    async def sqlite_maintenance(self):
+        """Refresh SQLite statistics and checkpoint the WAL off the event loop."""
+        await run_db(run_sqlite_maintenance)
 
     @commands.command(name="warn")
     @commands.has_permissions(manage_messages=True)
@@ -47,17 +302,16 @@ class Moderation(commands.Cog):
             return
 
         # Add warning to secure database
-        service = get_warning_service()
+        service = get_async_warning_service()
         try:
-            warning = service.add_warning(
+            # Insert and count in one transaction
+            warning, warning_count = await service.add_warning_with_count(
                 guild_id=str(ctx.guild.id),
                 user_id=str(member.id),
                 moderator_id=str(ctx.author.id),
                 reason=reason,
             )
-
-            # Get updated warning count
-            warning_count = service.get_warning_count(str(ctx.guild.id), str(member.id))
+            await self.commit_database_work()
             max_warnings = get_config().max_warnings_before_action
 
             embed = discord.Embed(
@@ -89,66 +343,58 @@ class Moderation(commands.Cog):
                 f"Warning {warning.id} added for user {member.id} in guild {ctx.guild.id}",
             )
 
+        except DatabaseBusyError:
+            await ctx.send(DATABASE_BUSY_MESSAGE)
         except Exception:
             logger.exception("Failed to add warning")
             await ctx.send("❌ Failed to add warning. Please try again.")
-        finally:
-            service.close()
 
     @commands.command(name="warnings")
     @commands.has_permissions(manage_messages=True)
     async def list_warnings(self, ctx, member: discord.Member):
-        service = get_warning_service()
+        service = get_async_warning_service()
         try:
-            user_warnings = service.get_user_warnings(str(ctx.guild.id), str(member.id))
-
-            embed = discord.Embed(
-                title=f"📋 Warnings for {member.display_name}",
-                color=discord.Color.blue(),
+            total = await service.get_warning_count(str(ctx.guild.id), str(member.id))
+            view = WarningHistoryView(
+                service,
+                guild_id=str(ctx.guild.id),
+                member=member,
+                author_id=ctx.author.id,
+                total=total,
             )
-            embed.set_thumbnail(url=member.display_avatar.url)
+            embed = await view.render()
 
-            if not user_warnings:
-                embed.description = "No warnings found."
+            if view.next_cursor is None:
+                # Single page: no buttons needed
+                view.stop()
+                await ctx.send(embed=embed)
             else:
-                for _i, warning in enumerate(user_warnings, 1):
-                    reason = warning.get_decrypted_reason()
-                    created_date = warning.created_at.strftime("%Y-%m-%d %H:%M")
-
-                    embed.add_field(
-                        name=f"Warning #{warning.id}",
-                        value=f"**Reason:** {reason}\n**Date:** {created_date}",
-                        inline=False,
-                    )
-
-            embed.set_footer(text=f"Total warnings: {len(user_warnings)}")
-            await ctx.send(embed=embed)
+                view.message = await ctx.send(embed=embed, view=view)
 
+        except DatabaseBusyError:
+            await ctx.send(DATABASE_BUSY_MESSAGE)
         except Exception:
             logger.exception("Failed to get warnings")
             await ctx.send("❌ Failed to retrieve warnings. Please try again.")
-        finally:
-            service.close()
 
     @commands.command(name="clearwarnings")
     @commands.has_permissions(manage_messages=True)
     async def clear_warnings(self, ctx, member: discord.Member):
         """Clear all warnings for a user (soft delete for GDPR compliance)."""
-        service = get_warning_service()
+        service = get_async_warning_service()
         try:
-            # Get current warnings
-            user_warnings = service.get_user_warnings(str(ctx.guild.id), str(member.id))
+            # Soft delete all warnings in one statement
+            cleared_count = await service.clear_user_warnings(
+                str(ctx.guild.id),
+                str(member.id),
+                str(ctx.author.id),
+            )
+            await self.commit_database_work()
 
-            if not user_warnings:
+            if not cleared_count:
                 await ctx.send(f"ℹ️ {member.mention} has no warnings to clear.")
                 return
 
-            # Soft delete all warnings
-            cleared_count = 0
-            for warning in user_warnings:
-                if service.delete_warning(warning.id):
-                    cleared_count += 1
-
             await ctx.send(
                 f"✅ Cleared {cleared_count} warning(s) for {member.mention}",
             )
@@ -160,19 +406,25 @@ class Moderation(commands.Cog):
                 ctx.guild,
             )
 
+        except DatabaseBusyError:
+            await ctx.send(DATABASE_BUSY_MESSAGE)
         except Exception:
             logger.exception("Failed to clear warnings")
             await ctx.send("❌ Failed to clear warnings. Please try again.")
-        finally:
-            service.close()
 
     @commands.command(name="deletewarning")
     @commands.has_permissions(manage_messages=True)
     async def delete_warning(self, ctx, warning_id: int):
         """Delete a specific warning by ID."""
-        service = get_warning_service()
+        service = get_async_warning_service()
         try:
-            if service.delete_warning(warning_id):
+            deleted = await service.delete_warning(
+                warning_id,
+                str(ctx.guild.id),
+                str(ctx.author.id),
+            )
+            await self.commit_database_work()
+            if deleted:
                 await ctx.send(f"✅ Warning #{warning_id} has been deleted.")
                 await log_moderation_action(
                     "DELETE_WARNING",
@@ -186,11 +438,33 @@ class Moderation(commands.Cog):
                     f"❌ Warning #{warning_id} not found or already deleted.",
                 )
 
+        except DatabaseBusyError:
+            await ctx.send(DATABASE_BUSY_MESSAGE)
         except Exception:
             logger.exception("Failed to delete warning")
             await ctx.send("❌ Failed to delete warning. Please try again.")
-        finally:
-            service.close()
+
+    @commands.command(name="modstats")
+    @commands.has_permissions(manage_messages=True)
+    async def modstats(self, ctx, days: int = 30):
+        """Show moderation trends: actions per day, top moderators, offenders."""
+        if not 1 <= days <= MODSTATS_MAX_DAYS:
+            await ctx.send(f"❌ Days must be between 1 and {MODSTATS_MAX_DAYS}.")
+            return
+
+        try:
+            stats = await get_async_analytics_service().get_guild_stats(
+                str(ctx.guild.id),
+                days,
+            )
+            moderators = await resolve_moderators(stats, ctx.guild)
+            await ctx.send(embed=build_modstats_embed(stats, moderators))
+
+        except DatabaseBusyError:
+            await ctx.send(DATABASE_BUSY_MESSAGE)
+        except Exception:
+            logger.exception("Failed to get moderation stats")
+            await ctx.send("❌ Failed to retrieve moderation stats. Please try again.")
 
     @commands.command(name="kick")
     @commands.has_permissions(kick_members=True)
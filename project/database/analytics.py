@@ -0,0 +1,157 @@
+"""Per-guild moderation analytics served from daily rollups."""
+
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from datetime import UTC, date, datetime, timedelta
+from typing import Any, TypeVar
+
+from sqlalchemy import desc, func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.orm import Session
+
+from .connection import get_async_session_factory
+from .models import ModerationRollup
+from .security import security_manager
+from .unit_of_work import run_in_session, session_scope
+
+
+T = TypeVar("T")
+
+DEFAULT_STATS_DAYS = 30
+DEFAULT_TOP_LIMIT = 5
+
+
+@dataclass
+class GuildModerationStats:
+    """Moderation trends of one guild over the last ``days`` days."""
+
+    days: int
+    # day -> action type -> number of actions
+    actions_per_day: dict[date, dict[str, int]] = field(default_factory=dict)
+    # (moderator_id_hash, actions), most active first
+    top_moderators: list[tuple[str, int]] = field(default_factory=list)
+    # (user_id_hash, offences) for members with more than one offence
+    repeat_offenders: list[tuple[str, int]] = field(default_factory=list)
+
+    @property
+    def total_actions(self) -> int:
+        """Number of actions in the period."""
+        return sum(sum(types.values()) for types in self.actions_per_day.values())
+
+
+def _ranked(
+    db: Session,
+    guild_hash: str,
+    metric: str,
+    since: date,
+    limit: int,
+    minimum: int = 1,
+) -> list[tuple[str, int]]:
+    """Sum one rollup metric per key over a period, largest first."""
+    total = func.sum(ModerationRollup.total)
+    return [
+        (key, count)
+        for key, count in db.execute(
+            select(ModerationRollup.key, total)
+            .where(
+                ModerationRollup.guild_id_hash == guild_hash,
+                ModerationRollup.metric == metric,
+                ModerationRollup.day >= since,
+            )
+            .group_by(ModerationRollup.key)
+            .having(total >= minimum)
+            .order_by(desc(total), ModerationRollup.key)
+            .limit(limit),
+        )
+    ]
+
+
+def _get_guild_stats(
+    db: Session,
+    guild_id: str,
+    days: int = DEFAULT_STATS_DAYS,
+    limit: int = DEFAULT_TOP_LIMIT,
+) -> GuildModerationStats:
+    """Read a guild's moderation trends from the daily rollups."""
+    if days < 1:
+        raise ValueError("days must be at least 1")
+    guild_hash = security_manager.hash_discord_id(guild_id)
+    since = datetime.now(UTC).date() - timedelta(days=days - 1)
+
+    stats = GuildModerationStats(days=days)
+    for day, action_type, count in db.execute(
+        select(ModerationRollup.day, ModerationRollup.key, ModerationRollup.total)
+        .where(
+            ModerationRollup.guild_id_hash == guild_hash,
+            ModerationRollup.metric == "action",
+            ModerationRollup.day >= since,
+        )
+        .order_by(ModerationRollup.day, ModerationRollup.key),
+    ):
+        stats.actions_per_day.setdefault(day, {})[action_type] = count
+
+    stats.top_moderators = _ranked(db, guild_hash, "moderator", since, limit)
+    stats.repeat_offenders = _ranked(db, guild_hash, "offender", since, limit, 2)
+    return stats
+
+
+class AnalyticsService:
+    """Moderation analytics for a guild.
+
+    Every query reads the small ``moderation_rollups`` table, which is kept
+    up to date as audit logs are written and compacted by DatabaseCleanup,
+    so cost depends on the period asked for rather than on how many years
+    of logs the guild has.
+    """
+
+    def get_guild_stats(
+        self,
+        guild_id: str,
+        days: int = DEFAULT_STATS_DAYS,
+        limit: int = DEFAULT_TOP_LIMIT,
+    ) -> GuildModerationStats:
+        """Get actions per day by type, top moderators and repeat offenders.
+
+        Args:
+            guild_id: Guild to report on
+            days: Number of days, including today, to cover
+            limit: Maximum moderators and offenders to return
+
+        Returns:
+            The guild's moderation trends for the period
+        """
+        with session_scope(read_only=True) as db:
+            return _get_guild_stats(db, guild_id, days, limit)
+
+
+class AsyncAnalyticsService:
+    """Asyncio counterpart of AnalyticsService for use from cogs."""
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession] | None = None,
+    ):
+        self._session_factory = session_factory or get_async_session_factory()
+
+    async def _read(self, operation: Callable[..., T], *args: Any) -> T:
+        """Run a read-only operation, on the read replica if there is one."""
+        return await run_in_session(
+            self._session_factory,
+            operation,
+            *args,
+            read_only=True,
+        )
+
+    async def get_guild_stats(
+        self,
+        guild_id: str,
+        days: int = DEFAULT_STATS_DAYS,
+        limit: int = DEFAULT_TOP_LIMIT,
+    ) -> GuildModerationStats:
+        """Get actions per day by type, top moderators and repeat offenders."""
+        return await self._read(_get_guild_stats, guild_id, days, limit)
+
+
+def get_async_analytics_service() -> AsyncAnalyticsService:
+    """Get a new async analytics service instance."""
+    return AsyncAnalyticsService()
@@ -0,0 +1,346 @@
+"""Write-behind queue for moderation audit logs."""
+
+import atexit
+import base64
+import json
+import logging
+import os
+import threading
+import time
+from collections.abc import Iterable
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+from sqlalchemy import event, insert
+from sqlalchemy.orm import Session, sessionmaker
+
+from .connection import SessionLocal
+from .models import ModerationLog, ModerationRollup
+
+
+logger = logging.getLogger(__name__)
+
+# Session.info key holding (queue, rows) pairs that are queued once the
+# session commits
+PENDING_KEY = "pending_audit_logs"
+
+# Ciphertext columns, base64-encoded in the spool file
+BINARY_FIELDS = ("reason_encrypted", "context_encrypted")
+
+# Spool file key counting failed replays of a row while the database was up
+ATTEMPTS_FIELD = "spool_attempts"
+
+# Failed replays after which a spooled row is moved to the quarantine file
+MAX_SPOOL_ATTEMPTS = 3
+
+# A spooled audit row and its failed replays so far
+SpooledRow = tuple[dict[str, Any], int]
+
+
+def _encode_row(row: dict[str, Any], attempts: int = 0) -> str:
+    """Serialize one audit row as a spool file line."""
+    encoded = dict(row)
+    for field in BINARY_FIELDS:
+        if encoded.get(field) is not None:
+            encoded[field] = base64.b64encode(encoded[field]).decode("ascii")
+    encoded["created_at"] = row["created_at"].isoformat()
+    if attempts:
+        encoded[ATTEMPTS_FIELD] = attempts
+    return json.dumps(encoded) + "\n"
+
+
+def _decode_row(line: str) -> SpooledRow:
+    """Parse one spool file line back into an audit row and its attempts."""
+    row = json.loads(line)
+    attempts = row.pop(ATTEMPTS_FIELD, 0)
+    for field in BINARY_FIELDS:
+        if row.get(field) is not None:
+            row[field] = base64.b64decode(row[field])
+    row["created_at"] = datetime.fromisoformat(row["created_at"])
+    return row, attempts
+
+
+def _append_rows(path: Path, spooled: Iterable[SpooledRow]) -> None:
+    """Append rows to a private (0600) spool or quarantine file."""
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o600)
+    with os.fdopen(fd, "w") as spool:
+        spool.writelines(_encode_row(row, attempts) for row, attempts in spooled)
+
+
+class AuditLogQueue:
+    """Batches ModerationLog inserts off the command path.
+
+    Rows (as built by ``ModerationLog.bulk_values``) are held in memory and
+    written with one bulk insert every ``flush_interval_ms`` or as soon as
+    ``max_batch`` rows are waiting. Rows of a failed flush are appended to a
+    private spool file and re-inserted by a later flush, so an unavailable
+    database delays audit rows instead of dropping them.
+
+    The spool is replayed apart from the new batch. If the replay fails
+    while the new batch goes in, the spooled rows are retried one by one,
+    and a row failing MAX_SPOOL_ATTEMPTS times is moved to a quarantine
+    file next to the spool, so a row the database always rejects cannot
+    hold back the rest.
+    """
+
+    def __init__(
+        self,
+        flush_interval_ms: int = 250,
+        max_batch: int = 100,
+        spool_path: str | Path = "audit_spool.ndjson",
+        session_factory: sessionmaker = SessionLocal,
+    ):
+        if flush_interval_ms <= 0 or max_batch <= 0:
+            raise ValueError("flush_interval_ms and max_batch must be positive")
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_batch = max_batch
+        self.spool_path = Path(spool_path)
+        self.quarantine_path = self.spool_path.with_name(
+            f"{self.spool_path.stem}.quarantine{self.spool_path.suffix}",
+        )
+        self.session_factory = session_factory
+        self._pending: list[dict[str, Any]] = []
+        self._lock = threading.Lock()
+        # Serializes flushes so rows are inserted in the order they were queued
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self.enqueued = 0
+        self.flushed = 0
+        self.spooled = 0
+        self.quarantined = 0
+        self.flushes = 0
+        self.failed_flushes = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+
+    @classmethod
+    def from_env(cls) -> "AuditLogQueue | None":
+        """Build the queue if AUDIT_QUEUE_ENABLED is set, else return None."""
+        if os.getenv("AUDIT_QUEUE_ENABLED", "false").lower() != "true":
+            return None
+        return cls(
+            flush_interval_ms=int(os.getenv("AUDIT_QUEUE_FLUSH_MS", "250")),
+            max_batch=int(os.getenv("AUDIT_QUEUE_MAX_BATCH", "100")),
+            spool_path=os.getenv("AUDIT_QUEUE_SPOOL_FILE", "audit_spool.ndjson"),
+        )
+
+    def enqueue(self, rows: Iterable[dict[str, Any]]) -> None:
+        """Queue audit rows for the next flush."""
+        rows = list(rows)
+        if not rows:
+            return
+        self._ensure_started()
+        with self._lock:
+            self._pending.extend(rows)
+            self.enqueued += len(rows)
+            full = len(self._pending) >= self.max_batch
+        if full:
+            self._wake.set()
+
+    def defer(self, db: Session, rows: Iterable[dict[str, Any]]) -> None:
+        """Queue audit rows once ``db`` commits; they are dropped on rollback."""
+        if not db.in_transaction():
+            db.begin()
+        db.info.setdefault(PENDING_KEY, []).append((self, list(rows)))
+
+    def flush(self) -> int:
+        """Write every queued row (and any spooled rows) now.
+
+        Returns:
+            Number of rows inserted into moderation_logs
+        """
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, []
+            spooled = self._read_spool()
+            if not spooled and not batch:
+                return 0
+
+            started = time.perf_counter()
+            inserted = 0
+            replayed = bool(spooled) and self._insert([row for row, _ in spooled])
+            if replayed:
+                self.spool_path.unlink(missing_ok=True)
+                inserted += len(spooled)
+                logger.info("Replayed %s spooled audit log rows", len(spooled))
+            if batch:
+                if self._insert(batch):
+                    inserted += len(batch)
+                    if spooled and not replayed:
+                        # The database is up, so some spooled rows are bad
+                        inserted += self._replay_rows(spooled)
+                else:
+                    # Spooled rows still on disk stay there; the batch is added
+                    self._spool(batch)
+            if not inserted:
+                return 0
+
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            self.flushes += 1
+            self.flushed += inserted
+            self.last_flush_ms = elapsed_ms
+            self.max_flush_ms = max(self.max_flush_ms, elapsed_ms)
+            return inserted
+
+    def _insert(self, rows: list[dict[str, Any]], log_failure: bool = True) -> bool:
+        """Insert rows and their rollups in one transaction."""
+        try:
+            with self.session_factory() as db:
+                db.execute(insert(ModerationLog.__table__), rows)
+                ModerationRollup.record(db, rows)
+                db.commit()
+        except Exception:
+            if log_failure:
+                self.failed_flushes += 1
+                logger.exception("Audit log flush of %s rows failed", len(rows))
+            return False
+        return True
+
+    def _replay_rows(self, spooled: list[SpooledRow]) -> int:
+        """Insert spooled rows one at a time, quarantining rows that keep failing.
+
+        Returns:
+            Number of rows inserted
+        """
+        inserted = 0
+        kept: list[SpooledRow] = []
+        rejected: list[SpooledRow] = []
+        for row, attempts in spooled:
+            if self._insert([row], log_failure=False):
+                inserted += 1
+            elif attempts + 1 >= MAX_SPOOL_ATTEMPTS:
+                rejected.append((row, attempts + 1))
+            else:
+                kept.append((row, attempts + 1))
+
+        if rejected:
+            try:
+                _append_rows(self.quarantine_path, rejected)
+            except OSError:
+                logger.exception("Could not quarantine %s audit rows", len(rejected))
+                kept.extend(rejected)
+            else:
+                self.quarantined += len(rejected)
+                logger.error(
+                    "Quarantined %s audit log rows that failed %s replays to %s",
+                    len(rejected),
+                    MAX_SPOOL_ATTEMPTS,
+                    self.quarantine_path,
+                )
+
+        # Replace the spool with the rows still to retry
+        tmp_path = self.spool_path.with_name(f"{self.spool_path.name}.tmp")
+        try:
+            tmp_path.unlink(missing_ok=True)
+            if kept:
+                _append_rows(tmp_path, kept)
+                tmp_path.replace(self.spool_path)
+            else:
+                self.spool_path.unlink(missing_ok=True)
+        except OSError:
+            logger.exception("Could not rewrite audit spool file %s", self.spool_path)
+        logger.warning(
+            "Replayed %s of %s spooled audit log rows one by one",
+            inserted,
+            len(spooled),
+        )
+        return inserted
+
+    def _spool(self, rows: list[dict[str, Any]]) -> None:
+        """Append rows to the spool file, keeping them queued if that fails."""
+        try:
+            _append_rows(self.spool_path, ((row, 0) for row in rows))
+        except OSError:
+            logger.exception("Could not spool %s audit log rows", len(rows))
+            with self._lock:
+                self._pending[:0] = rows
+            return
+        self.spooled += len(rows)
+        logger.warning("Spooled %s audit log rows to %s", len(rows), self.spool_path)
+
+    def _read_spool(self) -> list[SpooledRow]:
+        """Load rows, with their failed replays, left by failed flushes."""
+        if not self.spool_path.exists():
+            return []
+        try:
+            with self.spool_path.open() as spool:
+                return [_decode_row(line) for line in spool if line.strip()]
+        except (OSError, ValueError):
+            logger.exception("Could not read audit spool file %s", self.spool_path)
+            return []
+
+    def _run(self) -> None:
+        """Flush on every interval, or earlier when a full batch is waiting."""
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def _ensure_started(self) -> None:
+        """Start the flush thread on first use."""
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run,
+                name="audit-log-queue",
+                daemon=True,
+            )
+            self._thread.start()
+            atexit.register(self.close)
+
+    def close(self, timeout: float | None = 5) -> None:
+        """Stop the flush thread and write everything still queued."""
+        thread = self._thread
+        if thread is not None:
+            self._stop.set()
+            self._wake.set()
+            thread.join(timeout)
+            self._thread = None
+            atexit.unregister(self.close)
+        self.flush()
+
+    def stats(self) -> dict[str, Any]:
+        """Return queue depth, throughput counters and flush latency."""
+        with self._lock:
+            depth = len(self._pending)
+        return {
+            "queue_depth": depth,
+            "enqueued": self.enqueued,
+            "flushed": self.flushed,
+            "spooled": self.spooled,
+            "quarantined": self.quarantined,
+            "flushes": self.flushes,
+            "failed_flushes": self.failed_flushes,
+            "last_flush_ms": round(self.last_flush_ms, 2),
+            "max_flush_ms": round(self.max_flush_ms, 2),
+        }
+
+
+# Global write-behind queue; None unless AUDIT_QUEUE_ENABLED=true
+audit_queue = AuditLogQueue.from_env()
+
+
+def get_audit_queue_stats() -> dict[str, Any] | None:
+    """Get depth and flush metrics of the audit queue, if it is enabled."""
+    return audit_queue.stats() if audit_queue is not None else None
+
+
+@event.listens_for(Session, "after_commit")
+def _queue_deferred_rows(session: Session) -> None:
+    """Hand rows deferred in a committed session to their queue."""
+    for queue, rows in session.info.pop(PENDING_KEY, ()):
+        queue.enqueue(rows)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _drop_deferred_rows(session: Session, previous_transaction) -> None:
+    """Discard rows deferred in a rolled back session."""
+    if previous_transaction.parent is None:
+        session.info.pop(PENDING_KEY, None)
@@ -0,0 +1,260 @@
+"""Bounded in-memory caches for database reads."""
+
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Hashable, Iterable
+from typing import Any
+
+
+logger = logging.getLogger(__name__)
+
+
+class TTLCache:
+    """Thread-safe LRU cache with a per-entry TTL and an optional size budget.
+
+    Entries are evicted least-recently-used first once either ``max_entries``
+    or ``max_bytes`` (measured with ``sizeof``) is exceeded, and lazily when
+    read after their TTL. ``on_evict`` is called with every value that leaves
+    the cache, whatever the reason.
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        ttl_seconds: float,
+        max_bytes: int | None = None,
+        sizeof: Callable[[Any], int] | None = None,
+        on_evict: Callable[[Any], None] | None = None,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._sizeof = sizeof or (lambda _value: 0)
+        self._on_evict = on_evict
+        self._entries: OrderedDict[Hashable, tuple[float, Any, int]] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(
+        self,
+        key: Hashable,
+        is_valid: Callable[[Any], bool] | None = None,
+        transform: Callable[[Any], Any] | None = None,
+    ) -> Any | None:
+        """Return a cached value, or None on a miss.
+
+        Expired entries, and entries rejected by ``is_valid``, are dropped
+        and counted as misses. ``transform`` is applied to a hit before the
+        lock is released, so it sees the value before any concurrent
+        eviction hands it to ``on_evict``.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value, _size = entry
+            if expires_at < time.monotonic() or (is_valid and not is_valid(value)):
+                self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return transform(value) if transform else value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Insert or replace a value, evicting LRU entries to stay in bounds."""
+        size = self._sizeof(value)
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or (
+                self.max_bytes is not None and self._bytes > self.max_bytes
+            ):
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> None:
+        """Drop a single entry if present."""
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def clear(self) -> None:
+        """Drop every entry."""
+        with self._lock:
+            for key in list(self._entries):
+                self._remove(key)
+
+    def _remove(self, key: Hashable) -> None:
+        """Remove an entry; caller must hold the lock."""
+        _expires_at, value, size = self._entries.pop(key)
+        self._bytes -= size
+        if self._on_evict:
+            self._on_evict(value)
+
+    def stats(self) -> dict[str, Any]:
+        """Return hit/miss counters and current occupancy."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+            }
+
+
+class DecryptedReasonCache:
+    """Opt-in cache of decrypted warning reasons keyed by warning ID and version.
+
+    Plaintexts live only in process memory, as bytearrays that are zeroed
+    when evicted, expired or invalidated; nothing is ever written to disk.
+    A version mismatch (e.g. after a soft delete) is treated as a miss.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float = 300,
+        max_bytes: int = 1024 * 1024,
+        max_entries: int = 10_000,
+    ):
+        self._cache = TTLCache(
+            max_entries=max_entries,
+            ttl_seconds=ttl_seconds,
+            max_bytes=max_bytes,
+            sizeof=lambda entry: len(entry[1]),
+            on_evict=self._wipe,
+        )
+
+    @staticmethod
+    def _wipe(entry: tuple[int, bytearray]) -> None:
+        """Overwrite an evicted plaintext in place."""
+        plaintext = entry[1]
+        plaintext[:] = bytes(len(plaintext))
+
+    @classmethod
+    def from_env(cls) -> "DecryptedReasonCache | None":
+        """Build the cache if REASON_CACHE_ENABLED is set, else return None."""
+        if os.getenv("REASON_CACHE_ENABLED", "false").lower() != "true":
+            return None
+        return cls(
+            ttl_seconds=float(os.getenv("REASON_CACHE_TTL_SECONDS", "300")),
+            max_bytes=int(os.getenv("REASON_CACHE_MAX_BYTES", str(1024 * 1024))),
+        )
+
+    def get(self, warning_id: int, version: int) -> str | None:
+        """Return the cached reason for this warning version, if any."""
+        # Decoded under the cache lock: an eviction may wipe the bytearray
+        return self._cache.get(
+            warning_id,
+            is_valid=lambda cached: cached[0] == version,
+            transform=lambda cached: cached[1].decode("utf-8"),
+        )
+
+    def put(self, warning_id: int, version: int, reason: str) -> None:
+        """Cache a decrypted reason."""
+        self._cache.set(warning_id, (version, bytearray(reason.encode("utf-8"))))
+
+    def invalidate(self, warning_id: int) -> None:
+        """Drop and wipe the cached reason of a warning."""
+        self._cache.invalidate(warning_id)
+
+    def clear(self) -> None:
+        """Drop and wipe every cached reason."""
+        self._cache.clear()
+
+    def stats(self) -> dict[str, Any]:
+        """Return hit/miss counters and current occupancy."""
+        return self._cache.stats()
+
+
+# Global decrypted-reason cache; None unless REASON_CACHE_ENABLED=true
+reason_cache = DecryptedReasonCache.from_env()
+
+
+def invalidate_reasons(warning_ids: Iterable[int]) -> None:
+    """Drop cached reasons of written or deleted warnings (no-op if disabled)."""
+    if reason_cache is None:
+        return
+    for warning_id in warning_ids:
+        reason_cache.invalidate(warning_id)
+
+
+class WarningSummaryCache:
+    """Read-through cache of per-member warning summaries keyed by lookup key.
+
+    Every invalidation bumps a generation counter, and ``put`` only stores a
+    summary loaded under the current generation. A read that raced a write
+    therefore never caches the state from before that write.
+    """
+
+    def __init__(self, ttl_seconds: float = 60, max_entries: int = 10_000):
+        self._cache = TTLCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+        self._lock = threading.Lock()
+        self._generation = 0
+
+    @classmethod
+    def from_env(cls) -> "WarningSummaryCache | None":
+        """Build the cache if WARNING_SUMMARY_CACHE_ENABLED is set, else None."""
+        if os.getenv("WARNING_SUMMARY_CACHE_ENABLED", "false").lower() != "true":
+            return None
+        return cls(
+            ttl_seconds=float(os.getenv("WARNING_SUMMARY_CACHE_TTL_SECONDS", "60")),
+            max_entries=int(os.getenv("WARNING_SUMMARY_CACHE_MAX_ENTRIES", "10000")),
+        )
+
+    @property
+    def generation(self) -> int:
+        """Take before loading a summary and pass to ``put``."""
+        return self._generation
+
+    def get(self, lookup_key: str) -> Any | None:
+        """Return the cached summary of a member, or None on a miss."""
+        return self._cache.get(lookup_key)
+
+    def put(self, lookup_key: str, summary: Any, generation: int) -> None:
+        """Cache a summary unless an invalidation happened since it was loaded."""
+        with self._lock:
+            if generation == self._generation:
+                self._cache.set(lookup_key, summary)
+
+    def invalidate(self, lookup_keys: Iterable[str]) -> None:
+        """Drop the summaries of members whose warnings changed."""
+        with self._lock:
+            self._generation += 1
+            for lookup_key in lookup_keys:
+                self._cache.invalidate(lookup_key)
+
+    def clear(self) -> None:
+        """Drop every summary."""
+        with self._lock:
+            self._generation += 1
+            self._cache.clear()
+
+    def stats(self) -> dict[str, Any]:
+        """Return hit/miss counters and current occupancy."""
+        return self._cache.stats()
+
+
+# Global warning summary cache; None unless WARNING_SUMMARY_CACHE_ENABLED=true
+summary_cache = WarningSummaryCache.from_env()
+
+
+def invalidate_summaries(lookup_keys: Iterable[str]) -> None:
+    """Drop cached summaries of changed members (no-op if disabled)."""
+    if summary_cache is None:
+        return
+    summary_cache.invalidate(lookup_keys)
@@ -4,10 +4,12 @@ import logging
 import os
 from datetime import UTC, datetime, timedelta
 
-from sqlalchemy import and_
+from sqlalchemy import and_, text, update
 
-from .connection import get_db_session
-from .models import ModerationLog, SecureWarning
+from .cache import invalidate_reasons
+from .connection import get_db_session, route_reads
+from .models import ModerationLog, ModerationRollup, SecureWarning, WarningCounter
+from .partitions import MONTHS_AHEAD, ensure_partitions, purge_before
 
 
 logger = logging.getLogger(__name__)
@@ -48,11 +50,20 @@ class DatabaseCleanup:
             count = len(old_warnings)
 
             if count > 0:
+                # Their logs stay, without the reference
+                logs = ModerationLog.__table__
+                self.db.execute(
+                    update(logs)
+                    .where(logs.c.warning_id.in_([w.id for w in old_warnings]))
+                    .values(warning_id=None),
+                )
+
                 # Hard delete them
                 for warning in old_warnings:
                     self.db.delete(warning)
 
                 self.db.commit()
+                invalidate_reasons(warning.id for warning in old_warnings)
                 logger.info(
                     f"Hard deleted {count} old warnings (older than {days_old} days)",
                 )
@@ -74,70 +85,170 @@ class DatabaseCleanup:
         - Audit requirements: 2-7 years depending on jurisdiction
         - Discord ToS compliance: 2 years is standard
         - Anti-harassment evidence: 2 years reasonable
+
+        On a partitioned database, months entirely older than the cutoff
+        are dropped as whole partitions and only the rest is deleted row by
+        row; the rows of dropped partitions are not counted.
+
+        Returns:
+            Number of logs deleted row by row
         """
         if days_old < 0:
             raise ValueError("days_old must be a positive integer")
         cutoff_date = datetime.now(UTC) - timedelta(days=days_old)
 
         try:
-            deleted_count = (
-                self.db.query(ModerationLog)
-                .filter(ModerationLog.created_at < cutoff_date)
-                .delete()
-            )
+            result = purge_before(self.db.connection(), cutoff_date)
 
             self.db.commit()
+            if result.dropped:
+                logger.info(
+                    f"Dropped moderation log partitions {', '.join(result.dropped)}",
+                )
             logger.info(
-                f"Deleted {deleted_count} old moderation logs (older than {days_old} days)",
+                f"Deleted {result.deleted} old moderation logs (older than {days_old} days)",
             )
-            return deleted_count
+            return result.deleted
 
         except Exception:
             self.db.rollback()
             logger.exception("Failed to cleanup old logs")
             return 0
 
-    def get_cleanup_stats(self) -> dict:
-        """Get statistics about data that can be cleaned up."""
+    def create_log_partitions(self, months_ahead: int = MONTHS_AHEAD) -> list[str]:
+        """Create the moderation log partitions of the coming months.
+
+        Run at least monthly; logs of a month without a partition go to the
+        default partition until it is created. A no-op on databases whose
+        logs are not partitioned.
+
+        Returns:
+            Names of the partitions created
+        """
         try:
-            now = datetime.now(UTC)
+            created = ensure_partitions(self.db.connection(), months_ahead)
+            self.db.commit()
+            return created
 
-            # Count soft-deleted warnings by age
-            soft_deleted_30d = (
-                self.db.query(SecureWarning)
-                .filter(
-                    and_(
-                        SecureWarning.is_deleted.is_(True),
-                        SecureWarning.deleted_at < now - timedelta(days=30),
-                    ),
+        except Exception:
+            self.db.rollback()
+            logger.exception("Failed to create moderation log partitions")
+            return []
+
+    def repair_warning_counters(self) -> int:
+        """Rebuild the materialized active-warning counters from the warnings table.
+
+        Counters are kept in sync by every write path; this repairs drift
+        (e.g. from manual SQL) and seeds counters for existing history.
+        """
+        try:
+            repaired = WarningCounter.rebuild(self.db)
+            self.db.commit()
+            logger.info("Repaired %s warning counters", repaired)
+            return repaired
+
+        except Exception:
+            self.db.rollback()
+            logger.exception("Failed to repair warning counters")
+            return 0
+
+    def compact_moderation_rollups(self, days: int = 2) -> int:
+        """Rebuild the last ``days`` days of analytics rollups from the audit log.
+
+        Rollups are incremented as logs are written; compaction picks up logs
+        written by other means and repairs drift. Older days are left alone so
+        their totals survive cleanup_old_logs().
+        """
+        if days < 1:
+            raise ValueError("days must be at least 1")
+        try:
+            since = datetime.now(UTC).date() - timedelta(days=days - 1)
+            written = ModerationRollup.compact(self.db, since)
+            self.db.commit()
+            logger.info("Compacted %s moderation rollups since %s", written, since)
+            return written
+
+        except Exception:
+            self.db.rollback()
+            logger.exception("Failed to compact moderation rollups")
+            return 0
+
+    def optimize_sqlite(self) -> dict:
+        """Refresh SQLite planner statistics and checkpoint the WAL.
+
+        PRAGMA optimize only re-analyzes tables whose statistics are stale, so
+        it is cheap to run often. The TRUNCATE checkpoint copies the
+        write-ahead log into the database file and resets it, so the WAL
+        cannot grow between SQLite's own passive checkpoints. Other backends
+        are skipped.
+
+        Returns:
+            ``checkpoint_busy``, True when readers kept the WAL from being
+            reset; empty for other backends or on failure
+        """
+        if self.db.get_bind().dialect.name != "sqlite":
+            return {}
+        try:
+            self.db.execute(text("PRAGMA optimize"))
+            busy = self.db.execute(text("PRAGMA wal_checkpoint(TRUNCATE)")).one()[0]
+            self.db.commit()
+            if busy:
+                logger.warning("SQLite WAL checkpoint was blocked by readers")
+            else:
+                logger.info("Optimized SQLite and reset the WAL")
+            return {"checkpoint_busy": bool(busy)}
+
+        except Exception:
+            self.db.rollback()
+            logger.exception("Failed to optimize SQLite database")
+            return {}
+
+    def get_cleanup_stats(self) -> dict:
+        """Get statistics about data that can be cleaned up.
+
+        Counts come from the read replica, if configured, until this
+        session's first write pins it to the primary.
+        """
+        try:
+            with route_reads(self.db):
+                now = datetime.now(UTC)
+
+                # Count soft-deleted warnings by age
+                soft_deleted_30d = (
+                    self.db.query(SecureWarning)
+                    .filter(
+                        and_(
+                            SecureWarning.is_deleted.is_(True),
+                            SecureWarning.deleted_at < now - timedelta(days=30),
+                        ),
+                    )
+                    .count()
                 )
-                .count()
-            )
 
-            soft_deleted_180d = (
-                self.db.query(SecureWarning)
-                .filter(
-                    and_(
-                        SecureWarning.is_deleted.is_(True),
-                        SecureWarning.deleted_at < now - timedelta(days=180),
-                    ),
+                soft_deleted_180d = (
+                    self.db.query(SecureWarning)
+                    .filter(
+                        and_(
+                            SecureWarning.is_deleted.is_(True),
+                            SecureWarning.deleted_at < now - timedelta(days=180),
+                        ),
+                    )
+                    .count()
                 )
-                .count()
-            )
 
-            # Count old logs
-            old_logs_365d = (
-                self.db.query(ModerationLog)
-                .filter(ModerationLog.created_at < now - timedelta(days=365))
-                .count()
-            )
+                # Count old logs
+                old_logs_365d = (
+                    self.db.query(ModerationLog)
+                    .filter(ModerationLog.created_at < now - timedelta(days=365))
+                    .count()
+                )
 
-            return {
-                "soft_deleted_warnings_30d": soft_deleted_30d,
-                "soft_deleted_warnings_180d": soft_deleted_180d,
-                "old_logs_365d": old_logs_365d,
-                "cleanup_date": now.isoformat(),
-            }
+                return {
+                    "soft_deleted_warnings_30d": soft_deleted_30d,
+                    "soft_deleted_warnings_180d": soft_deleted_180d,
+                    "old_logs_365d": old_logs_365d,
+                    "cleanup_date": now.isoformat(),
+                }
 
         except Exception:
             logger.exception("Failed to get cleanup stats")
@@ -157,12 +268,20 @@ def run_cleanup(warning_days: int = 90, log_days: int = 730) -> dict:
 
         warnings_deleted = cleanup.hard_delete_old_soft_deleted(warning_days)
         logs_deleted = cleanup.cleanup_old_logs(log_days)
+        log_partitions_created = cleanup.create_log_partitions()
+        counters_repaired = cleanup.repair_warning_counters()
+        rollups_compacted = cleanup.compact_moderation_rollups()
+        sqlite_maintenance = cleanup.optimize_sqlite()
 
         stats_after = cleanup.get_cleanup_stats()
 
         return {
             "warnings_hard_deleted": warnings_deleted,
             "logs_deleted": logs_deleted,
+            "log_partitions_created": log_partitions_created,
+            "counters_repaired": counters_repaired,
+            "rollups_compacted": rollups_compacted,
+            "sqlite_maintenance": sqlite_maintenance,
             "stats_before": stats_before,
             "stats_after": stats_after,
         }
@@ -170,6 +289,15 @@ def run_cleanup(warning_days: int = 90, log_days: int = 730) -> dict:
         cleanup.close()
 
 
+def run_sqlite_maintenance() -> dict:
+    """Run the periodic SQLite optimize and WAL checkpoint."""
+    cleanup = DatabaseCleanup()
+    try:
+        return cleanup.optimize_sqlite()
+    finally:
+        cleanup.close()
+
+
 class LegalCompliance:
     """Handles legal compliance and data retention policies."""
 
@@ -1,31 +1,314 @@
 """Database connection and session management."""
 
 import os
-from collections.abc import Generator
+import threading
+import time
+from collections import deque
+from collections.abc import Generator, Iterator
+from contextlib import contextmanager
+from typing import Any
 
-from sqlalchemy import create_engine
+from sqlalchemy import Delete, Insert, Update, create_engine, event, exc, make_url
+from sqlalchemy.engine import URL, Connection, Engine
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
 from sqlalchemy.orm import Session, declarative_base, sessionmaker
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool, StaticPool
+from sqlalchemy.sql import ClauseElement
 
+from .settings import DatabasePoolConfig, SQLiteConfig
 
-# Database URL from environment
+
+# Checkout wait times kept for the latency percentiles in PoolMetrics.stats()
+POOL_WAIT_SAMPLES = 1000
+
+
+class PoolMetrics:
+    """Connection pool usage collected from SQLAlchemy pool events.
+
+    Tracks checkouts, connections currently checked out (and the peak),
+    connections opened beyond ``pool_size``, checkout timeouts and how long
+    checkouts waited for a connection, to size the pool for real load.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._waits_ms: deque[float] = deque(maxlen=POOL_WAIT_SAMPLES)
+        self._engine: Engine | None = None
+        self.checked_out = 0
+        self.peak_checked_out = 0
+        self.checkouts = 0
+        self.connections_opened = 0
+        self.overflow_events = 0
+        self.timeouts = 0
+        self.max_wait_ms = 0.0
+
+    def attach(self, engine: Engine) -> None:
+        """Collect metrics from ``engine``'s pool, including after dispose()."""
+        self._engine = engine
+        if isinstance(engine.pool, MeteredQueuePool | MeteredAsyncQueuePool):
+            engine.pool.metrics = self
+        event.listen(engine, "connect", self._on_connect)
+        event.listen(engine, "checkout", self._on_checkout)
+        event.listen(engine, "checkin", self._on_checkin)
+
+    def _queue_pool(self) -> QueuePool | None:
+        """The attached engine's current pool, if it is a QueuePool."""
+        pool = self._engine.pool if self._engine is not None else None
+        return pool if isinstance(pool, QueuePool) else None
+
+    def _on_connect(self, *_args) -> None:
+        pool = self._queue_pool()
+        with self._lock:
+            self.connections_opened += 1
+            # Overflow is counted from -pool_size, so > 0 means beyond the pool
+            if pool is not None and pool.overflow() > 0:
+                self.overflow_events += 1
+
+    def _on_checkout(self, *_args) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.checked_out += 1
+            self.peak_checked_out = max(self.peak_checked_out, self.checked_out)
+
+    def _on_checkin(self, *_args) -> None:
+        with self._lock:
+            self.checked_out = max(self.checked_out - 1, 0)
+
+    def record_wait(self, wait_ms: float) -> None:
+        """Record how long a checkout waited for a pooled connection."""
+        with self._lock:
+            self._waits_ms.append(wait_ms)
+            self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+
+    def record_timeout(self) -> None:
+        """Record a checkout that gave up after ``pool_timeout`` seconds."""
+        with self._lock:
+            self.timeouts += 1
+
+    def stats(self) -> dict[str, Any]:
+        """Return pool occupancy, overflow and checkout latency."""
+        pool = self._queue_pool()
+        with self._lock:
+            waits = sorted(self._waits_ms)
+            return {
+                "pool_size": pool.size() if pool is not None else 1,
+                "overflow": max(pool.overflow(), 0) if pool is not None else 0,
+                "checked_out": self.checked_out,
+                "peak_checked_out": self.peak_checked_out,
+                "checkouts": self.checkouts,
+                "connections_opened": self.connections_opened,
+                "overflow_events": self.overflow_events,
+                "timeouts": self.timeouts,
+                "avg_wait_ms": round(sum(waits) / len(waits), 2) if waits else 0.0,
+                "p95_wait_ms": round(waits[int(len(waits) * 0.95)], 2)
+                if waits
+                else 0.0,
+                "max_wait_ms": round(self.max_wait_ms, 2),
+            }
+
+
+class _MeteredPoolMixin:
+    """Times every checkout of a QueuePool, including waits for a free slot."""
+
+    metrics: PoolMetrics | None = None
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            record = super()._do_get()
+        except exc.TimeoutError:
+            if self.metrics is not None:
+                self.metrics.record_timeout()
+            raise
+        if self.metrics is not None:
+            self.metrics.record_wait((time.perf_counter() - started) * 1000)
+        return record
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+class MeteredQueuePool(_MeteredPoolMixin, QueuePool):
+    """QueuePool reporting checkout waits to PoolMetrics."""
+
+
+class MeteredAsyncQueuePool(_MeteredPoolMixin, AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool reporting checkout waits to PoolMetrics."""
+
+
+def _is_memory_sqlite(url: str) -> bool:
+    """Whether ``url`` names an in-memory SQLite database."""
+    return url.startswith("sqlite") and (":memory:" in url or "mode=memory" in url)
+
+
+def engine_options(
+    url: str,
+    pool: DatabasePoolConfig,
+    *,
+    is_async: bool = False,
+) -> dict[str, Any]:
+    """Build create_engine() keyword arguments for ``url``.
+
+    In-memory SQLite shares one connection through StaticPool. aiosqlite
+    file databases keep the driver's default of one connection per checkout;
+    every other engine gets a metered QueuePool sized by ``pool``.
+    """
+    options: dict[str, Any] = {"echo": False}
+    is_sqlite = url.startswith("sqlite")
+    if is_sqlite and not is_async:
+        options["connect_args"] = {"check_same_thread": False}
+    if _is_memory_sqlite(url):
+        options["poolclass"] = StaticPool
+        return options
+    if is_sqlite and is_async:
+        return options
+
+    options.update(
+        poolclass=MeteredAsyncQueuePool if is_async else MeteredQueuePool,
+        pool_size=pool.pool_size,
+        max_overflow=pool.max_overflow,
+        pool_recycle=pool.pool_recycle,
+        pool_timeout=pool.pool_timeout,
+        pool_pre_ping=not is_sqlite
+        if pool.pool_pre_ping is None
+        else pool.pool_pre_ping,
+    )
+    return options
+
+
+def enable_sqlite_pragmas(
+    db_engine: Engine,
+    url: str,
+    sqlite: SQLiteConfig,
+) -> None:
+    """Apply the SQLite profile to every new connection of ``db_engine``."""
+    if not url.startswith("sqlite"):
+        return
+    pragmas = sqlite.pragmas(in_memory=_is_memory_sqlite(url))
+    if not pragmas:
+        return
+
+    @event.listens_for(db_engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, _connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+
+
+def create_db_engine(
+    url: str,
+    pool: DatabasePoolConfig | None = None,
+    metrics: PoolMetrics | None = None,
+    sqlite: SQLiteConfig | None = None,
+) -> Engine:
+    """Create a sync engine with the configured pool and SQLite pragmas.
+
+    Pool usage is reported to ``metrics`` when given.
+    """
+    db_engine = create_engine(
+        url,
+        **engine_options(url, pool or DatabasePoolConfig()),
+    )
+    enable_sqlite_pragmas(db_engine, url, sqlite or SQLiteConfig())
+    if metrics is not None:
+        metrics.attach(db_engine)
+    return db_engine
+
+
+# Session.info keys read by RoutingSession
+READ_ONLY_KEY = "route_reads"
+PINNED_KEY = "pinned_to_primary"
+
+
+class RoutingSession(Session):
+    """Session that sends read-only work to a read replica.
+
+    Queries go to ``replica`` while the session is marked read-only (see
+    route_reads()). Flushes and INSERT/UPDATE/DELETE statements always go to
+    the primary bind and pin the session to it, so for the rest of the
+    session (a command's unit of work) reads see its own writes. Without a
+    replica this behaves like a plain Session.
+    """
+
+    def __init__(self, *args: Any, replica: Engine | None = None, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.replica = replica
+
+    def get_bind(
+        self,
+        mapper: Any = None,
+        clause: ClauseElement | None = None,
+        **kwargs: Any,
+    ) -> Engine | Connection:
+        if self.replica is None:
+            return super().get_bind(mapper, clause=clause, **kwargs)
+        if self._flushing or isinstance(clause, Insert | Update | Delete):
+            self.info[PINNED_KEY] = True
+        elif self.info.get(READ_ONLY_KEY) and not self.info.get(PINNED_KEY):
+            return self.replica
+        return super().get_bind(mapper, clause=clause, **kwargs)
+
+
+@contextmanager
+def route_reads(db: Session) -> Iterator[Session]:
+    """Send ``db``'s queries to the read replica, if any, inside the block."""
+    previous = db.info.get(READ_ONLY_KEY, False)
+    db.info[READ_ONLY_KEY] = True
+    try:
+        yield db
+    finally:
+        db.info[READ_ONLY_KEY] = previous
+
+
+# Database URLs and pool and SQLite settings from environment (see settings.py).
+# DATABASE_READ_URL is an optional replica.
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///warnings.db")
-engine_kwargs = {
-    "echo": False,
-}
+DATABASE_READ_URL = os.getenv("DATABASE_READ_URL") or None
+POOL_CONFIG = DatabasePoolConfig.from_env()
+SQLITE_CONFIG = SQLiteConfig.from_env()
 
-if DATABASE_URL.startswith("sqlite"):
-    engine_kwargs["connect_args"] = {"check_same_thread": False}
-    if ":memory:" in DATABASE_URL or "mode=memory" in DATABASE_URL:
-        engine_kwargs["poolclass"] = StaticPool
-else:
-    engine_kwargs["pool_pre_ping"] = True
+pool_metrics = PoolMetrics()
+async_pool_metrics = PoolMetrics()
+read_pool_metrics = PoolMetrics()
+async_read_pool_metrics = PoolMetrics()
 
-engine = create_engine(DATABASE_URL, **engine_kwargs)
+engine = create_db_engine(DATABASE_URL, POOL_CONFIG, pool_metrics, SQLITE_CONFIG)
+read_engine = (
+    create_db_engine(DATABASE_READ_URL, POOL_CONFIG, read_pool_metrics, SQLITE_CONFIG)
+    if DATABASE_READ_URL
+    else None
+)
 
-SessionLocal = sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+SessionLocal = sessionmaker(
+    bind=engine,
+    class_=RoutingSession,
+    replica=read_engine,
+    autoflush=False,
+    expire_on_commit=False,
+)
 Base = declarative_base()
 
+# asyncio drivers used by AsyncWarningService for each backend
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
+
+# Created on first use so importing this module never needs the async drivers
+_async_engine: AsyncEngine | None = None
+_async_read_engine: AsyncEngine | None = None
+_async_session_factory: async_sessionmaker[AsyncSession] | None = None
+
 
 def get_db() -> Generator[Session, None, None]:
     """Get database session with automatic cleanup."""
@@ -37,9 +320,80 @@ def get_db() -> Generator[Session, None, None]:
 
 
 def init_database():
-    """Initialize database tables."""
-    Base.metadata.create_all(bind=engine)
-    print(f"✅ Database initialized: {DATABASE_URL}")
+    """Create or upgrade the database schema by applying the migrations."""
+    # Imported here: schema imports this module for Base and engine
+    from .schema import upgrade_database  # noqa: PLC0415
+
+    revision = upgrade_database(engine)
+    print(f"✅ Database initialized: {DATABASE_URL} (revision {revision})")
+
+
+def to_async_url(url: str) -> URL:
+    """Map a database URL to the asyncio driver of its backend."""
+    parsed = make_url(url)
+    driver = ASYNC_DRIVERS.get(parsed.get_backend_name(), parsed.drivername)
+    return parsed.set(drivername=driver)
+
+
+def get_async_engine() -> AsyncEngine:
+    """Get the asyncio engine, creating it on first use.
+
+    Note: an in-memory SQLite database is private to each engine, so the
+    sync and async engines only share data with a file or server database.
+    """
+    global _async_engine
+    if _async_engine is None:
+        _async_engine = _create_async_db_engine(DATABASE_URL, async_pool_metrics)
+    return _async_engine
+
+
+def get_async_read_engine() -> AsyncEngine | None:
+    """Get the asyncio replica engine, or None without DATABASE_READ_URL."""
+    global _async_read_engine
+    if _async_read_engine is None and DATABASE_READ_URL:
+        _async_read_engine = _create_async_db_engine(
+            DATABASE_READ_URL,
+            async_read_pool_metrics,
+        )
+    return _async_read_engine
+
+
+def _create_async_db_engine(url: str, metrics: PoolMetrics) -> AsyncEngine:
+    """Create an asyncio engine with the configured pool and SQLite pragmas."""
+    async_engine = create_async_engine(
+        to_async_url(url),
+        **engine_options(url, POOL_CONFIG, is_async=True),
+    )
+    enable_sqlite_pragmas(async_engine.sync_engine, url, SQLITE_CONFIG)
+    metrics.attach(async_engine.sync_engine)
+    return async_engine
+
+
+def get_async_session_factory() -> async_sessionmaker[AsyncSession]:
+    """Get the asyncio session factory bound to the asyncio engines."""
+    global _async_session_factory
+    if _async_session_factory is None:
+        replica = get_async_read_engine()
+        _async_session_factory = async_sessionmaker(
+            bind=get_async_engine(),
+            sync_session_class=RoutingSession,
+            replica=replica.sync_engine if replica is not None else None,
+            autoflush=False,
+            expire_on_commit=False,
+        )
+    return _async_session_factory
+
+
+def get_pool_stats() -> dict[str, dict[str, Any]]:
+    """Get pool metrics of every engine created so far."""
+    stats = {"sync": pool_metrics.stats()}
+    if read_engine is not None:
+        stats["read"] = read_pool_metrics.stats()
+    if _async_engine is not None:
+        stats["async"] = async_pool_metrics.stats()
+    if _async_read_engine is not None:
+        stats["async_read"] = async_read_pool_metrics.stats()
+    return stats
 
 
 def get_db_session() -> Session:
@@ -0,0 +1,297 @@
+"""Bounded thread pool for blocking database work called from async code.
+
+The asyncio services run on AsyncSession, but some database work is still
+synchronous: maintenance, audit queue flushes, scripts' WarningService
+calls. ``run_db()`` runs such work on a small dedicated pool instead of the
+event loop or asyncio's shared default executor. When more than
+``max_queue`` jobs are already waiting for a thread, new ones fail at once
+with DatabaseBusyError rather than queueing without bound, so a burst of
+commands cannot pile up work the database will take minutes to drain.
+
+The asyncio services get the same bound from ``db_admission``: at most
+``max_async_active`` of their operations run at once and ``max_async_queue``
+wait for a slot, after which new ones fail with DatabaseBusyError too.
+"""
+
+import asyncio
+import contextlib
+import contextvars
+import threading
+import time
+from collections import deque
+from collections.abc import AsyncIterator, Callable
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, TypeVar
+
+from .settings import DatabaseExecutorConfig
+
+
+T = TypeVar("T")
+
+
+class DatabaseBusyError(RuntimeError):
+    """Raised when the database executor's or admission queue is full."""
+
+
+class LatencyHistogram:
+    """Thread-safe histogram of durations in fixed millisecond buckets."""
+
+    # Upper bounds of the buckets; slower samples count as "+Inf"
+    BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = [0] * (len(self.BUCKETS_MS) + 1)
+        self._total_ms = 0.0
+        self._max_ms = 0.0
+
+    def observe(self, ms: float) -> None:
+        """Record one duration."""
+        index = next(
+            (i for i, bound in enumerate(self.BUCKETS_MS) if ms <= bound),
+            len(self.BUCKETS_MS),
+        )
+        with self._lock:
+            self._counts[index] += 1
+            self._total_ms += ms
+            self._max_ms = max(self._max_ms, ms)
+
+    def percentile(self, fraction: float) -> float:
+        """Upper bound of the bucket holding the given fraction of samples."""
+        with self._lock:
+            counts = list(self._counts)
+            max_ms = self._max_ms
+        target = fraction * sum(counts)
+        seen = 0
+        for bound, count in zip((*self.BUCKETS_MS, max_ms), counts, strict=True):
+            seen += count
+            if count and seen >= target:
+                return float(min(bound, max_ms))
+        return 0.0
+
+    def stats(self) -> dict[str, Any]:
+        """Sample count, average, p95, maximum and per-bucket counts."""
+        with self._lock:
+            counts = list(self._counts)
+            total_ms = self._total_ms
+            max_ms = self._max_ms
+        count = sum(counts)
+        labels = [f"le_{bound}ms" for bound in self.BUCKETS_MS] + ["+Inf"]
+        return {
+            "count": count,
+            "avg_ms": round(total_ms / count, 2) if count else 0.0,
+            "p95_ms": round(self.percentile(0.95), 2),
+            "max_ms": round(max_ms, 2),
+            "buckets": dict(zip(labels, counts, strict=True)),
+        }
+
+
+class DatabaseExecutor:
+    """Thread pool with a bounded queue and wait/run time histograms."""
+
+    def __init__(self, max_workers: int = 4, max_queue: int = 64):
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+        if max_queue < 0:
+            raise ValueError("max_queue must be non-negative")
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix="db",
+        )
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+        self._peak_queued = 0
+        self._completed = 0
+        self._rejected = 0
+        self.queue_wait = LatencyHistogram()
+        self.execution = LatencyHistogram()
+
+    @classmethod
+    def from_config(cls, config: DatabaseExecutorConfig) -> "DatabaseExecutor":
+        """Create an executor from its settings."""
+        return cls(max_workers=config.max_workers, max_queue=config.max_queue)
+
+    def submit(self, fn: Callable[..., T], *args: Any) -> "Future[T]":
+        """Queue ``fn(*args)`` in the caller's context.
+
+        Raises:
+            DatabaseBusyError: max_queue jobs are already waiting
+        """
+        with self._lock:
+            # Every thread busy and max_queue jobs waiting for one
+            if self._queued + self._running >= self.max_workers + self.max_queue:
+                self._rejected += 1
+                raise DatabaseBusyError(
+                    f"Database executor saturated ({self._queued} jobs queued)",
+                )
+            self._queued += 1
+            self._peak_queued = max(self._peak_queued, self._queued)
+
+        context = contextvars.copy_context()
+        queued_at = time.perf_counter()
+        started = threading.Event()
+
+        def job() -> T:
+            started.set()
+            with self._lock:
+                self._queued -= 1
+                self._running += 1
+            start = time.perf_counter()
+            self.queue_wait.observe((start - queued_at) * 1000)
+            try:
+                return context.run(fn, *args)
+            finally:
+                self.execution.observe((time.perf_counter() - start) * 1000)
+                with self._lock:
+                    self._running -= 1
+                    self._completed += 1
+
+        def forget_if_cancelled(future: Future) -> None:
+            # A job cancelled before it started never leaves the queue itself
+            if future.cancelled() and not started.is_set():
+                with self._lock:
+                    self._queued -= 1
+
+        future = self._executor.submit(job)
+        future.add_done_callback(forget_if_cancelled)
+        return future
+
+    async def run(self, fn: Callable[..., T], *args: Any) -> T:
+        """Run ``fn(*args)`` on the pool and await its result."""
+        return await asyncio.wrap_future(self.submit(fn, *args))
+
+    def stats(self) -> dict[str, Any]:
+        """Current load, totals and the wait and execution time histograms."""
+        with self._lock:
+            stats = {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "running": self._running,
+                "queued": self._queued,
+                "peak_queued": self._peak_queued,
+                "completed": self._completed,
+                "rejected": self._rejected,
+            }
+        stats["queue_wait"] = self.queue_wait.stats()
+        stats["execution"] = self.execution.stats()
+        return stats
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop the worker threads, cancelling jobs that have not started."""
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+
+class AdmissionLimiter:
+    """Bounded admission for async database operations on one event loop.
+
+    At most ``max_active`` operations hold a slot at once; up to
+    ``max_queue`` more wait for one in arrival order, and any further
+    operation is rejected with DatabaseBusyError instead of waiting.
+    """
+
+    def __init__(self, max_active: int = 10, max_queue: int = 64):
+        if max_active < 1:
+            raise ValueError("max_active must be at least 1")
+        if max_queue < 0:
+            raise ValueError("max_queue must be non-negative")
+        self.max_active = max_active
+        self.max_queue = max_queue
+        self._active = 0
+        self._waiters: deque[asyncio.Future] = deque()
+        self._peak_waiting = 0
+        self._admitted = 0
+        self._rejected = 0
+        self.queue_wait = LatencyHistogram()
+
+    @classmethod
+    def from_config(cls, config: DatabaseExecutorConfig) -> "AdmissionLimiter":
+        """Create a limiter from its settings."""
+        return cls(
+            max_active=config.max_async_active,
+            max_queue=config.max_async_queue,
+        )
+
+    @contextlib.asynccontextmanager
+    async def admit(self) -> AsyncIterator[None]:
+        """Hold an operation slot for the duration of the block.
+
+        Raises:
+            DatabaseBusyError: max_queue operations are already waiting
+        """
+        queued_at = time.perf_counter()
+        if self._active < self.max_active and not self._waiters:
+            self._active += 1
+        elif len(self._waiters) >= self.max_queue:
+            self._rejected += 1
+            raise DatabaseBusyError(
+                f"Database saturated ({len(self._waiters)} operations waiting)",
+            )
+        else:
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            self._peak_waiting = max(self._peak_waiting, len(self._waiters))
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter.done() and not waiter.cancelled():
+                    # Handed a slot as the caller was cancelled; pass it on
+                    self._release()
+                else:
+                    with contextlib.suppress(ValueError):
+                        self._waiters.remove(waiter)
+                raise
+        self._admitted += 1
+        self.queue_wait.observe((time.perf_counter() - queued_at) * 1000)
+        try:
+            yield
+        finally:
+            self._release()
+
+    def _release(self) -> None:
+        """Hand the slot to the oldest waiter, or free it."""
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self._active -= 1
+
+    def stats(self) -> dict[str, Any]:
+        """Current load, totals and the slot wait time histogram."""
+        return {
+            "max_active": self.max_active,
+            "max_queue": self.max_queue,
+            "active": self._active,
+            "waiting": len(self._waiters),
+            "peak_waiting": self._peak_waiting,
+            "admitted": self._admitted,
+            "rejected": self._rejected,
+            "queue_wait": self.queue_wait.stats(),
+        }
+
+
+EXECUTOR_CONFIG = DatabaseExecutorConfig.from_env()
+db_executor = DatabaseExecutor.from_config(EXECUTOR_CONFIG)
+db_admission = AdmissionLimiter.from_config(EXECUTOR_CONFIG)
+
+
+async def run_db(fn: Callable[..., T], *args: Any) -> T:
+    """Run blocking database work on the database executor.
+
+    Raises:
+        DatabaseBusyError: The executor's queue is full
+    """
+    return await db_executor.run(fn, *args)
+
+
+def get_executor_stats() -> dict[str, Any]:
+    """Get load and latency metrics of the database executor."""
+    return db_executor.stats()
+
+
+def get_admission_stats() -> dict[str, Any]:
+    """Get load and wait metrics of async database admission."""
+    return db_admission.stats()
@@ -0,0 +1,85 @@
+"""Alembic environment for the bot's database.
+
+project.database.schema passes the connection and target metadata in
+``config.attributes``. The ``alembic`` command line, run from the repository
+root, falls back to the application's engine and models.
+"""
+
+from logging.config import fileConfig
+
+from alembic import context
+
+
+config = context.config
+target_metadata = config.attributes.get("target_metadata")
+connection = config.attributes.get("connection")
+
+if target_metadata is None:
+    from project.database import models  # noqa: F401  (registers the tables)
+    from project.database.connection import DATABASE_URL, Base, engine
+
+    if config.config_file_name is not None:
+        fileConfig(config.config_file_name)
+    target_metadata = Base.metadata
+    if not config.get_main_option("sqlalchemy.url"):
+        config.set_main_option("sqlalchemy.url", DATABASE_URL.replace("%", "%%"))
+else:
+    engine = None
+
+
+def include_name(name, type_, _parent_names) -> bool:
+    """Leave moderation_logs partitions out of autogenerate.
+
+    They are created and dropped by project/database/partitions.py, not by
+    migrations; on SQLite moderation_logs itself is a view over them.
+    """
+    if type_ == "table":
+        return not name.startswith("moderation_logs_")
+    return True
+
+
+def include_object(_obj, name, type_, reflected, compare_to) -> bool:
+    """Skip moderation_logs where it is the SQLite view of the partitions."""
+    return not (
+        type_ == "table"
+        and name == "moderation_logs"
+        and not reflected
+        and compare_to is None
+        and context.get_context().dialect.name == "sqlite"
+    )
+
+
+def run_migrations_offline() -> None:
+    """Emit the migration SQL for ``sqlalchemy.url`` without connecting."""
+    context.configure(
+        url=config.get_main_option("sqlalchemy.url"),
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations(db_connection) -> None:
+    """Run migrations on an open connection."""
+    context.configure(
+        connection=db_connection,
+        target_metadata=target_metadata,
+        include_name=include_name,
+        include_object=include_object,
+        # SQLite cannot ALTER most constraints; batch mode recreates the table
+        render_as_batch=db_connection.dialect.name == "sqlite",
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+elif connection is not None:
+    run_migrations(connection)
+else:
+    with engine.connect() as db_connection:
+        run_migrations(db_connection)
+        db_connection.commit()
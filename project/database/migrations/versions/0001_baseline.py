@@ -0,0 +1,126 @@
+"""Baseline schema, as created by Base.metadata.create_all before migrations.
+
+Revision ID: 0001_baseline
+Revises:
+Create Date: 2026-10-17
+
+Databases created before migrations already have this schema; mark them
+with ``alembic stamp 0001_baseline`` (upgrade_database() does so itself once
+it has checked that the database matches) instead of running it.
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0001_baseline"
+down_revision: str | None = None
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "warnings",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("guild_id_hash", sa.String(64), nullable=False),
+        sa.Column("user_id_hash", sa.String(64), nullable=False),
+        sa.Column("moderator_id_hash", sa.String(64), nullable=False),
+        sa.Column("reason_encrypted", sa.Text(), nullable=False),
+        sa.Column("lookup_key", sa.String(16), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("is_deleted", sa.Boolean(), nullable=False),
+        sa.Column("deleted_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("version", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_warnings_id", "warnings", ["id"])
+    op.create_index("ix_warnings_guild_id_hash", "warnings", ["guild_id_hash"])
+    op.create_index("ix_warnings_user_id_hash", "warnings", ["user_id_hash"])
+    op.create_index(
+        "ix_warnings_moderator_id_hash",
+        "warnings",
+        ["moderator_id_hash"],
+    )
+    op.create_index("ix_warnings_lookup_key", "warnings", ["lookup_key"])
+    op.create_index("ix_warnings_is_deleted", "warnings", ["is_deleted"])
+    op.create_index(
+        "idx_guild_user_active",
+        "warnings",
+        ["guild_id_hash", "user_id_hash", "is_deleted"],
+    )
+    op.create_index("idx_lookup_active", "warnings", ["lookup_key", "is_deleted"])
+    op.create_index("idx_created_at", "warnings", ["created_at"])
+
+    op.create_table(
+        "moderation_logs",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("guild_id_hash", sa.String(64), nullable=False),
+        sa.Column("user_id_hash", sa.String(64), nullable=False),
+        sa.Column("moderator_id_hash", sa.String(64), nullable=False),
+        sa.Column("action_type", sa.String(50), nullable=False),
+        sa.Column("reason_encrypted", sa.Text(), nullable=True),
+        sa.Column("warning_id", sa.Integer(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("context_encrypted", sa.Text(), nullable=True),
+        sa.ForeignKeyConstraint(["warning_id"], ["warnings.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_moderation_logs_id", "moderation_logs", ["id"])
+    op.create_index(
+        "ix_moderation_logs_guild_id_hash",
+        "moderation_logs",
+        ["guild_id_hash"],
+    )
+    op.create_index(
+        "ix_moderation_logs_user_id_hash",
+        "moderation_logs",
+        ["user_id_hash"],
+    )
+    op.create_index(
+        "ix_moderation_logs_moderator_id_hash",
+        "moderation_logs",
+        ["moderator_id_hash"],
+    )
+    op.create_index(
+        "ix_moderation_logs_action_type",
+        "moderation_logs",
+        ["action_type"],
+    )
+    op.create_index(
+        "idx_guild_action_date",
+        "moderation_logs",
+        ["guild_id_hash", "action_type", "created_at"],
+    )
+    op.create_index(
+        "idx_user_actions",
+        "moderation_logs",
+        ["user_id_hash", "created_at"],
+    )
+
+    op.create_table(
+        "gdpr_requests",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("user_id_hash", sa.String(64), nullable=False),
+        sa.Column("request_type", sa.String(20), nullable=False),
+        sa.Column("status", sa.String(20), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("completed_at", sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_gdpr_requests_id", "gdpr_requests", ["id"])
+    op.create_index(
+        "ix_gdpr_requests_user_id_hash",
+        "gdpr_requests",
+        ["user_id_hash"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("gdpr_requests")
+    op.drop_table("moderation_logs")
+    op.drop_table("warnings")
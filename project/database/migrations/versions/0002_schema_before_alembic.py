@@ -0,0 +1,139 @@
+"""Schema changes made to the models before migrations existed.
+
+Revision ID: 0002_schema_before_alembic
+Revises: 0001_baseline
+Create Date: 2026-10-17
+
+- ``hash_scheme`` on warnings, moderation_logs and gdpr_requests. Existing
+  rows get 1 (legacy salted Argon2), the scheme they were hashed with.
+- Ciphertext columns become binary. PostgreSQL converts the legacy base64
+  text in place; SQLite keeps the stored values, which remain readable until
+  ``python -m project.database.reencrypt`` rewrites them.
+- Indexes: ix_warnings_hash_scheme, idx_guild_user_history (history pages),
+  idx_log_created_at (retention cleanup) and ix_moderation_logs_warning_id
+  (warning deletes).
+- Tables: maintenance_checkpoints, warning_counters and moderation_rollups.
+
+Downgrading on PostgreSQL converts ciphertexts back to text, so it fails
+once rows hold the binary format.
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0002_schema_before_alembic"
+down_revision: str | None = "0001_baseline"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+# Ciphertext columns of each table, and whether they are nullable
+CIPHERTEXT_COLUMNS = {
+    "warnings": {"reason_encrypted": False},
+    "moderation_logs": {"reason_encrypted": True, "context_encrypted": True},
+}
+
+
+def is_sqlite() -> bool:
+    return op.get_bind().dialect.name == "sqlite"
+
+
+def batch_alter_table(table: str):
+    """Alter a table in place, or on SQLite recreate it.
+
+    Recreating lets new columns sit where the models declare them.
+    """
+    return op.batch_alter_table(table, recreate="always" if is_sqlite() else "auto")
+
+
+def add_hash_scheme(batch_op, after: str) -> None:
+    batch_op.add_column(
+        sa.Column("hash_scheme", sa.Integer(), server_default="1", nullable=False),
+        **({"insert_after": after} if is_sqlite() else {}),
+    )
+
+
+def upgrade() -> None:
+    with batch_alter_table("warnings") as batch_op:
+        add_hash_scheme(batch_op, after="moderator_id_hash")
+        batch_op.create_index("ix_warnings_hash_scheme", ["hash_scheme"])
+        batch_op.create_index(
+            "idx_guild_user_history",
+            ["guild_id_hash", "user_id_hash", "is_deleted", "created_at", "id"],
+        )
+    with batch_alter_table("moderation_logs") as batch_op:
+        add_hash_scheme(batch_op, after="moderator_id_hash")
+        batch_op.create_index("ix_moderation_logs_warning_id", ["warning_id"])
+        batch_op.create_index("idx_log_created_at", ["created_at"])
+    with batch_alter_table("gdpr_requests") as batch_op:
+        add_hash_scheme(batch_op, after="user_id_hash")
+
+    for table, columns in CIPHERTEXT_COLUMNS.items():
+        with op.batch_alter_table(table) as batch_op:
+            for column, nullable in columns.items():
+                batch_op.alter_column(
+                    column,
+                    type_=sa.LargeBinary(),
+                    existing_type=sa.Text(),
+                    existing_nullable=nullable,
+                    postgresql_using=f"convert_to({column}, 'UTF8')",
+                )
+
+    op.create_table(
+        "maintenance_checkpoints",
+        sa.Column("job_name", sa.String(64), nullable=False),
+        sa.Column("table_name", sa.String(64), nullable=False),
+        sa.Column("last_id", sa.Integer(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint("job_name", "table_name"),
+    )
+
+    op.create_table(
+        "warning_counters",
+        sa.Column("lookup_key", sa.String(16), nullable=False),
+        sa.Column("active_count", sa.Integer(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint("lookup_key"),
+    )
+
+    op.create_table(
+        "moderation_rollups",
+        sa.Column("guild_id_hash", sa.String(64), nullable=False),
+        sa.Column("metric", sa.String(16), nullable=False),
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("key", sa.String(64), nullable=False),
+        sa.Column("total", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("guild_id_hash", "metric", "day", "key"),
+    )
+    op.create_index("idx_rollup_day", "moderation_rollups", ["day"])
+
+
+def downgrade() -> None:
+    op.drop_table("moderation_rollups")
+    op.drop_table("warning_counters")
+    op.drop_table("maintenance_checkpoints")
+
+    for table, columns in CIPHERTEXT_COLUMNS.items():
+        with op.batch_alter_table(table) as batch_op:
+            for column, nullable in columns.items():
+                batch_op.alter_column(
+                    column,
+                    type_=sa.Text(),
+                    existing_type=sa.LargeBinary(),
+                    existing_nullable=nullable,
+                    postgresql_using=f"convert_from({column}, 'UTF8')",
+                )
+
+    with op.batch_alter_table("gdpr_requests") as batch_op:
+        batch_op.drop_column("hash_scheme")
+    with op.batch_alter_table("moderation_logs") as batch_op:
+        batch_op.drop_index("idx_log_created_at")
+        batch_op.drop_index("ix_moderation_logs_warning_id")
+        batch_op.drop_column("hash_scheme")
+    with op.batch_alter_table("warnings") as batch_op:
+        batch_op.drop_index("idx_guild_user_history")
+        batch_op.drop_index("ix_warnings_hash_scheme")
+        batch_op.drop_column("hash_scheme")
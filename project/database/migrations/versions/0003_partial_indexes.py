@@ -0,0 +1,100 @@
+"""Partial indexes on active warnings; drop redundant indexes.
+
+Revision ID: 0003_partial_indexes
+Revises: 0002_schema_before_alembic
+Create Date: 2026-10-17
+
+Active-warning reads (summaries, pages, counters) filter on
+``is_deleted IS false``. They now use partial indexes that hold only active
+rows. idx_guild_user_history loses its is_deleted column, so full-history
+pages need no sort. The dropped indexes duplicate the primary key or are a
+prefix of a composite index.
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0003_partial_indexes"
+down_revision: str | None = "0002_schema_before_alembic"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+# Rendered per dialect like the services' filter, so SQLite's planner can
+# match it against their queries ("is_deleted IS 0" / "is_deleted IS false")
+ACTIVE = sa.column("is_deleted", sa.Boolean()).is_(False)
+
+REDUNDANT = {
+    "warnings": [
+        "ix_warnings_id",
+        "ix_warnings_guild_id_hash",
+        "idx_guild_user_active",
+        "idx_lookup_active",
+    ],
+    "moderation_logs": [
+        "ix_moderation_logs_id",
+        "ix_moderation_logs_guild_id_hash",
+        "ix_moderation_logs_user_id_hash",
+    ],
+    "gdpr_requests": ["ix_gdpr_requests_id"],
+}
+
+
+def upgrade() -> None:
+    op.create_index(
+        "idx_active_guild_user",
+        "warnings",
+        ["guild_id_hash", "user_id_hash", "created_at", "id"],
+        sqlite_where=ACTIVE,
+        postgresql_where=ACTIVE,
+    )
+    op.create_index(
+        "idx_active_lookup",
+        "warnings",
+        ["lookup_key"],
+        sqlite_where=ACTIVE,
+        postgresql_where=ACTIVE,
+    )
+    op.drop_index("idx_guild_user_history", table_name="warnings")
+    op.create_index(
+        "idx_guild_user_history",
+        "warnings",
+        ["guild_id_hash", "user_id_hash", "created_at", "id"],
+    )
+    for table, indexes in REDUNDANT.items():
+        for index in indexes:
+            op.drop_index(index, table_name=table)
+
+
+def downgrade() -> None:
+    op.create_index("ix_gdpr_requests_id", "gdpr_requests", ["id"])
+    op.create_index(
+        "ix_moderation_logs_user_id_hash",
+        "moderation_logs",
+        ["user_id_hash"],
+    )
+    op.create_index(
+        "ix_moderation_logs_guild_id_hash",
+        "moderation_logs",
+        ["guild_id_hash"],
+    )
+    op.create_index("ix_moderation_logs_id", "moderation_logs", ["id"])
+    op.create_index("idx_lookup_active", "warnings", ["lookup_key", "is_deleted"])
+    op.create_index(
+        "idx_guild_user_active",
+        "warnings",
+        ["guild_id_hash", "user_id_hash", "is_deleted"],
+    )
+    op.create_index("ix_warnings_guild_id_hash", "warnings", ["guild_id_hash"])
+    op.create_index("ix_warnings_id", "warnings", ["id"])
+    op.drop_index("idx_guild_user_history", table_name="warnings")
+    op.create_index(
+        "idx_guild_user_history",
+        "warnings",
+        ["guild_id_hash", "user_id_hash", "is_deleted", "created_at", "id"],
+    )
+    op.drop_index("idx_active_lookup", table_name="warnings")
+    op.drop_index("idx_active_guild_user", table_name="warnings")
@@ -0,0 +1,278 @@
+"""Partition moderation_logs by month.
+
+Revision ID: 0004_partition_moderation_logs
+Revises: 0003_partial_indexes
+Create Date: 2026-10-17
+
+PostgreSQL: moderation_logs becomes a table partitioned by RANGE
+(created_at) with a partition per month and a default partition. Its
+primary key gains created_at, as a partitioned table's keys must include
+the partition key.
+
+SQLite: each month is its own table behind a moderation_logs view whose
+INSTEAD OF triggers route writes; see project/database/partitions.py, which
+maintains the partitions after this migration. The first id of a month's
+table is (year * 12 + month - 1) * 10**10.
+
+Existing rows are copied into the partitions of their months. Partitions
+are created up to three months ahead.
+"""
+
+from collections.abc import Sequence
+from datetime import UTC, date, datetime
+
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0004_partition_moderation_logs"
+down_revision: str | None = "0003_partial_indexes"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+TABLE = "moderation_logs"
+PREFIX = "moderation_logs_p"
+DEFAULT = "moderation_logs_default"
+OLD_TABLE = "moderation_logs_old"
+MONTHS_AHEAD = 3
+ID_BLOCK = 10**10
+
+INDEXES = {
+    "ix_moderation_logs_moderator_id_hash": ["moderator_id_hash"],
+    "ix_moderation_logs_action_type": ["action_type"],
+    "ix_moderation_logs_warning_id": ["warning_id"],
+    "idx_guild_action_date": ["guild_id_hash", "action_type", "created_at"],
+    "idx_user_actions": ["user_id_hash", "created_at"],
+    "idx_log_created_at": ["created_at"],
+}
+
+COLUMN_NAMES = (
+    "id, guild_id_hash, user_id_hash, moderator_id_hash, hash_scheme, "
+    "action_type, reason_encrypted, warning_id, created_at, context_encrypted"
+)
+
+
+def columns(id_default: str | None = None) -> list[sa.Column]:
+    return [
+        sa.Column(
+            "id",
+            sa.Integer(),
+            server_default=sa.text(id_default) if id_default else None,
+            nullable=False,
+        ),
+        sa.Column("guild_id_hash", sa.String(64), nullable=False),
+        sa.Column("user_id_hash", sa.String(64), nullable=False),
+        sa.Column("moderator_id_hash", sa.String(64), nullable=False),
+        sa.Column("hash_scheme", sa.Integer(), server_default="1", nullable=False),
+        sa.Column("action_type", sa.String(50), nullable=False),
+        sa.Column("reason_encrypted", sa.LargeBinary(), nullable=True),
+        sa.Column("warning_id", sa.Integer(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("context_encrypted", sa.LargeBinary(), nullable=True),
+        sa.ForeignKeyConstraint(["warning_id"], ["warnings.id"]),
+    ]
+
+
+def add_months(day: date, months: int) -> date:
+    index = day.year * 12 + day.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def month_of(value) -> date:
+    """Month of a created_at value (text on SQLite, datetime on PostgreSQL)."""
+    if isinstance(value, str):
+        return date.fromisoformat(f"{value[:7]}-01")
+    return value.astimezone(UTC).date().replace(day=1)
+
+
+def months_to_create(source: str) -> list[date]:
+    """Months of the rows in ``source``, through MONTHS_AHEAD months ahead."""
+    created_at = sa.column("created_at")
+    query = sa.select(sa.func.min(created_at), sa.func.max(created_at))
+    oldest, newest = op.get_bind().execute(query.select_from(sa.table(source))).one()
+    current = datetime.now(UTC).date().replace(day=1)
+    first = month_of(oldest) if oldest is not None else current
+    last = max(add_months(current, MONTHS_AHEAD), first)
+    if newest is not None:
+        last = max(last, month_of(newest))
+    months = [first]
+    while months[-1] < last:
+        months.append(add_months(months[-1], 1))
+    return months
+
+
+def bound(day: date, dialect: str) -> str:
+    if dialect == "postgresql":
+        return f"'{day.isoformat()} 00:00:00+00'"
+    return f"'{day.isoformat()}'"
+
+
+def in_range(month: date, dialect: str, expression: str = "created_at") -> str:
+    return (
+        f"{expression} >= {bound(month, dialect)} "
+        f"AND {expression} < {bound(add_months(month, 1), dialect)}"
+    )
+
+
+def copy_rows(source: str, target: str, where: str = "1 = 1") -> None:
+    """Copy the rows of ``source`` matching ``where`` into ``target``."""
+    # Table names and conditions come from this module's constants and months
+    op.execute(
+        f"INSERT INTO {target} ({COLUMN_NAMES}) "  # noqa: S608
+        f"SELECT {COLUMN_NAMES} FROM {source} WHERE {where}",
+    )
+
+
+def create_sqlite_table(name: str, first_id: int) -> None:
+    suffix = name.removeprefix(f"{TABLE}_")
+    op.create_table(
+        name,
+        *columns(),
+        sa.PrimaryKeyConstraint("id"),
+        sqlite_autoincrement=True,
+    )
+    for index, index_columns in INDEXES.items():
+        op.create_index(f"{index}_{suffix}", name, index_columns)
+    op.execute(
+        sa.text(
+            "INSERT INTO sqlite_sequence (name, seq) VALUES (:name, :seq)",
+        ).bindparams(name=name, seq=first_id),
+    )
+
+
+def create_sqlite_view(months: list[date]) -> None:
+    """The moderation_logs view and triggers, as partitions.py builds them."""
+    names = [f"{PREFIX}{month:%Y%m}" for month in months]
+    tables = [*names, DEFAULT]
+    column_names = COLUMN_NAMES.split(", ")
+    new_values = ", ".join(f"NEW.{name}" for name in column_names)
+    assignments = ", ".join(
+        f"{name} = NEW.{name}" for name in column_names if name != "id"
+    )
+    in_any_partition = " OR ".join(
+        f"({in_range(month, 'sqlite', 'NEW.created_at')})" for month in months
+    )
+    inserts = [
+        f"INSERT INTO {name} ({COLUMN_NAMES}) SELECT {new_values} "
+        f"WHERE {in_range(month, 'sqlite', 'NEW.created_at')};"
+        for name, month in zip(names, months, strict=True)
+    ]
+    inserts.append(
+        f"INSERT INTO {DEFAULT} ({COLUMN_NAMES}) SELECT {new_values} "
+        f"WHERE NOT ({in_any_partition or '0'});",
+    )
+    # Identifiers are this module's constants and the months' table names
+    updates = [
+        f"UPDATE {name} SET {assignments} WHERE id = OLD.id;"  # noqa: S608
+        for name in tables
+    ]
+    deletes = [f"DELETE FROM {name} WHERE id = OLD.id;" for name in tables]  # noqa: S608
+    selects = " UNION ALL ".join(
+        f"SELECT {COLUMN_NAMES} FROM {name}"  # noqa: S608
+        for name in tables
+    )
+
+    op.execute(f"CREATE VIEW {TABLE} AS {selects}")
+    for event, statements in (
+        ("INSERT", inserts),
+        ("UPDATE", updates),
+        ("DELETE", deletes),
+    ):
+        op.execute(
+            f"CREATE TRIGGER {TABLE}_{event.lower()} INSTEAD OF {event} ON {TABLE} "
+            f"BEGIN {' '.join(statements)} END",
+        )
+
+
+def upgrade_sqlite() -> None:
+    op.rename_table(TABLE, OLD_TABLE)
+    for index in INDEXES:
+        op.drop_index(index, table_name=OLD_TABLE)
+    months = months_to_create(OLD_TABLE)
+
+    last_id = op.get_bind().scalar(
+        sa.select(sa.func.max(sa.column("id"))).select_from(sa.table(OLD_TABLE)),
+    )
+    create_sqlite_table(DEFAULT, last_id or 0)
+    for month in months:
+        name = f"{PREFIX}{month:%Y%m}"
+        create_sqlite_table(name, (month.year * 12 + month.month - 1) * ID_BLOCK)
+        copy_rows(OLD_TABLE, name, in_range(month, "sqlite"))
+    copy_rows(
+        OLD_TABLE,
+        DEFAULT,
+        f"created_at < {bound(months[0], 'sqlite')} "
+        f"OR created_at >= {bound(add_months(months[-1], 1), 'sqlite')}",
+    )
+    op.drop_table(OLD_TABLE)
+    create_sqlite_view(months)
+
+
+def upgrade_postgresql() -> None:
+    # The old table's constraint and index names are needed for the new one
+    op.rename_table(TABLE, OLD_TABLE)
+    op.drop_constraint("moderation_logs_pkey", OLD_TABLE, type_="primary")
+    for index in INDEXES:
+        op.drop_index(index, table_name=OLD_TABLE)
+    months = months_to_create(OLD_TABLE)
+
+    op.create_table(
+        TABLE,
+        *columns(id_default="nextval('moderation_logs_id_seq'::regclass)"),
+        sa.PrimaryKeyConstraint("id", "created_at", name="moderation_logs_pkey"),
+        postgresql_partition_by="RANGE (created_at)",
+    )
+    op.execute(f"ALTER SEQUENCE moderation_logs_id_seq OWNED BY {TABLE}.id")
+    for index, index_columns in INDEXES.items():
+        op.create_index(index, TABLE, index_columns)
+    for month in months:
+        op.execute(
+            f"CREATE TABLE {PREFIX}{month:%Y%m} PARTITION OF {TABLE} "
+            f"FOR VALUES FROM ({bound(month, 'postgresql')}) "
+            f"TO ({bound(add_months(month, 1), 'postgresql')})",
+        )
+    op.execute(f"CREATE TABLE {DEFAULT} PARTITION OF {TABLE} DEFAULT")
+    copy_rows(OLD_TABLE, TABLE)
+    op.drop_table(OLD_TABLE)
+
+
+def upgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == "postgresql":
+        upgrade_postgresql()
+    elif dialect == "sqlite":
+        upgrade_sqlite()
+
+
+def create_plain_table(id_default: str | None = None) -> None:
+    op.create_table(TABLE, *columns(id_default), sa.PrimaryKeyConstraint("id"))
+    for index, index_columns in INDEXES.items():
+        op.create_index(index, TABLE, index_columns)
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name == "postgresql":
+        op.rename_table(TABLE, OLD_TABLE)
+        op.drop_constraint("moderation_logs_pkey", OLD_TABLE, type_="primary")
+        for index in INDEXES:
+            op.drop_index(index, table_name=OLD_TABLE)
+        create_plain_table(id_default="nextval('moderation_logs_id_seq'::regclass)")
+        op.execute(f"ALTER SEQUENCE moderation_logs_id_seq OWNED BY {TABLE}.id")
+        copy_rows(OLD_TABLE, TABLE)
+        # Dropping the partitioned table drops its partitions
+        op.drop_table(OLD_TABLE)
+    elif bind.dialect.name == "sqlite":
+        tables = bind.scalars(
+            sa.text(
+                "SELECT name FROM sqlite_master WHERE type = 'table' "
+                "AND (name LIKE :prefix OR name = :default)",
+            ),
+            {"prefix": f"{PREFIX}%", "default": DEFAULT},
+        ).all()
+        op.execute(f"DROP VIEW {TABLE}")
+        create_plain_table()
+        for name in tables:
+            copy_rows(name, TABLE)
+            op.drop_table(name)
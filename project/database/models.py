@@ -1,22 +1,38 @@
 """Database models for secure Discord bot data storage."""
 
 import logging
-from datetime import UTC, datetime
+from collections import Counter
+from collections.abc import Iterable
+from datetime import UTC, date, datetime, time
 
 from sqlalchemy import (
     Boolean,
     Column,
+    Date,
     DateTime,
     ForeignKey,
     Index,
+    Insert,
     Integer,
+    LargeBinary,
     String,
-    Text,
+    case,
+    delete,
+    event,
+    func,
+    insert,
+    select,
+    text,
+    update,
 )
-from sqlalchemy.orm import relationship, validates
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Mapper, Session, backref, relationship, validates
+from sqlalchemy.orm.attributes import set_committed_value
 
+from . import cache
 from .connection import Base
-from .security import security_manager
+from .security import HASH_SCHEME_ARGON2, security_manager
 
 
 logger = logging.getLogger(__name__)
@@ -35,6 +51,25 @@ ALLOWED_ACTION_TYPES = {
     "warning_edited",
 }
 
+# Action types that count towards a member's repeat-offender total
+OFFENCE_ACTION_TYPES = {"warn", "mute", "timeout", "kick", "ban"}
+
+# Analytics rollup metrics and the ModerationLog column each one is keyed by
+ROLLUP_METRICS = {
+    "action": "action_type",
+    "moderator": "moderator_id_hash",
+    "offender": "user_id_hash",
+}
+
+# Dialect inserts supporting ON CONFLICT DO UPDATE
+UPSERT_INSERTS = {
+    "sqlite": sqlite.insert,
+    "postgresql": postgresql.insert,
+}
+
+# Placeholder returned instead of plaintext when decryption fails
+DECRYPTION_FAILED = "[DECRYPTION_FAILED]"
+
 
 class SecureWarning(Base):
     """Secure warning storage with encryption and hashing."""
@@ -42,15 +77,25 @@ class SecureWarning(Base):
     __tablename__ = "warnings"
 
     # Primary key
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
 
-    # Hashed identifiers for privacy (64 chars for SHA-256)
-    guild_id_hash = Column(String(64), nullable=False, index=True)
+    # Hashed identifiers for privacy (64 chars for SHA-256); guild lookups use
+    # the composite indexes below
+    guild_id_hash = Column(String(64), nullable=False)
     user_id_hash = Column(String(64), nullable=False, index=True)
     moderator_id_hash = Column(String(64), nullable=False, index=True)
 
-    # Encrypted sensitive data
-    reason_encrypted = Column(Text, nullable=False)
+    # Scheme the ID hashes were produced with (rows without it predate keyed hashing)
+    hash_scheme = Column(
+        Integer,
+        nullable=False,
+        default=lambda: security_manager.hash_scheme,
+        server_default=str(HASH_SCHEME_ARGON2),
+        index=True,
+    )
+
+    # Encrypted sensitive data (binary format; legacy rows may hold base64 text)
+    reason_encrypted = Column(LargeBinary, nullable=False)
 
     # Lookup key for efficient queries (16 chars truncated)
     lookup_key = Column(String(16), nullable=False, index=True)
@@ -74,11 +119,37 @@ class SecureWarning(Base):
     # Data integrity
     version = Column(Integer, default=1, nullable=False)  # For optimistic locking
 
-    # Composite indexes for performance
+    # Composite indexes for performance; schema changes go through an Alembic
+    # migration in migrations/versions
     __table_args__ = (
-        Index("idx_guild_user_active", "guild_id_hash", "user_id_hash", "is_deleted"),
-        Index("idx_lookup_active", "lookup_key", "is_deleted"),
+        # Partial indexes over active rows only: summaries and pages of active
+        # warnings, and counter queries. Re-keying, which must also find
+        # deleted rows, uses ix_warnings_lookup_key.
+        Index(
+            "idx_active_guild_user",
+            "guild_id_hash",
+            "user_id_hash",
+            "created_at",
+            "id",
+            sqlite_where=is_deleted.is_(False),
+            postgresql_where=is_deleted.is_(False),
+        ),
+        Index(
+            "idx_active_lookup",
+            "lookup_key",
+            sqlite_where=is_deleted.is_(False),
+            postgresql_where=is_deleted.is_(False),
+        ),
         Index("idx_created_at", "created_at"),
+        # Keyset pagination over (created_at, id) of a member's full history,
+        # deleted warnings included
+        Index(
+            "idx_guild_user_history",
+            "guild_id_hash",
+            "user_id_hash",
+            "created_at",
+            "id",
+        ),
     )
 
     @validates("reason_encrypted")
@@ -102,37 +173,94 @@ class SecureWarning(Base):
 
         # Log anonymized action for audit
         logger.info(
-            f"Creating warning for user {security_manager.anonymize_for_logs(user_id)} "
-            f"in guild {security_manager.anonymize_for_logs(guild_id)}",
+            "Creating warning for user %s in guild %s",
+            security_manager.anonymized(user_id),
+            security_manager.anonymized(guild_id),
         )
 
         return cls(
             guild_id_hash=security_manager.hash_discord_id(guild_id),
             user_id_hash=security_manager.hash_discord_id(user_id),
             moderator_id_hash=security_manager.hash_discord_id(moderator_id),
-            reason_encrypted=security_manager.encrypt_text(reason.strip()),
+            hash_scheme=security_manager.hash_scheme,
+            reason_encrypted=security_manager.encrypt_to_bytes(reason.strip()),
             lookup_key=security_manager.create_lookup_key(guild_id, user_id),
         )
 
     def get_decrypted_reason(self) -> str:
         """Get the decrypted warning reason."""
+        if cache.reason_cache is not None and self.id is not None:
+            cached = cache.reason_cache.get(self.id, self.version)
+            if cached is not None:
+                return cached
         try:
-            return security_manager.decrypt_text(self.reason_encrypted)
+            reason = security_manager.decrypt_text(self.reason_encrypted)
         except ValueError:
-            logger.exception(f"Failed to decrypt warning {self.id}")
+            logger.exception("Failed to decrypt warning %s", self.id)
             # Return safe default to avoid leaking encryption details
-            return "[DECRYPTION_FAILED]"
+            return DECRYPTION_FAILED
+        if cache.reason_cache is not None and self.id is not None:
+            cache.reason_cache.put(self.id, self.version, reason)
+        return reason
+
+    @staticmethod
+    def _cached_reasons(
+        warnings: list["SecureWarning"],
+    ) -> tuple[list[str | None], list[int]]:
+        """Look up reasons in the cache; return them and the indexes of misses."""
+        if cache.reason_cache is None:
+            return [None] * len(warnings), list(range(len(warnings)))
+        reasons = [
+            cache.reason_cache.get(warning.id, warning.version) for warning in warnings
+        ]
+        return reasons, [i for i, reason in enumerate(reasons) if reason is None]
+
+    @staticmethod
+    def _fill_reasons(
+        warnings: list["SecureWarning"],
+        reasons: list[str | None],
+        missing: list[int],
+        decrypted: list[str],
+    ) -> list[str]:
+        """Merge freshly decrypted reasons into the result and the cache."""
+        for i, reason in zip(missing, decrypted, strict=True):
+            reasons[i] = reason
+            if cache.reason_cache is not None and reason != DECRYPTION_FAILED:
+                cache.reason_cache.put(warnings[i].id, warnings[i].version, reason)
+        return reasons
+
+    @staticmethod
+    def decrypt_reasons(warnings: list["SecureWarning"]) -> list[str]:
+        """Decrypt the reasons of several warnings in one batch."""
+        reasons, missing = SecureWarning._cached_reasons(warnings)
+        decrypted = security_manager.decrypt_many(
+            (warnings[i].reason_encrypted for i in missing),
+            default=DECRYPTION_FAILED,
+        )
+        return SecureWarning._fill_reasons(warnings, reasons, missing, decrypted)
+
+    @staticmethod
+    async def decrypt_reasons_async(warnings: list["SecureWarning"]) -> list[str]:
+        """Decrypt the reasons of several warnings off the event loop."""
+        reasons, missing = SecureWarning._cached_reasons(warnings)
+        if not missing:
+            return reasons
+        decrypted = await security_manager.decrypt_many_async(
+            [warnings[i].reason_encrypted for i in missing],
+            default=DECRYPTION_FAILED,
+        )
+        return SecureWarning._fill_reasons(warnings, reasons, missing, decrypted)
 
     def soft_delete(self):
         """Soft delete this warning for GDPR compliance with optimistic locking."""
         if self.is_deleted:
-            logger.warning(f"Warning {self.id} is already deleted")
+            logger.warning("Warning %s is already deleted", self.id)
             return
 
         self.is_deleted = True
         self.deleted_at = datetime.now(UTC)
         self.version += 1  # Increment version for optimistic locking
-        logger.info(f"Soft deleted warning {self.id} (version {self.version})")
+        logger.info("Soft deleted warning %s (version %s)", self.id, self.version)
 
     def to_dict(self, include_sensitive: bool = True) -> dict:
         """Convert to dictionary with optional sensitive data."""
@@ -154,12 +282,18 @@ class ModerationLog(Base):
 
     __tablename__ = "moderation_logs"
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
 
-    # Hashed identifiers
-    guild_id_hash = Column(String(64), nullable=False, index=True)
-    user_id_hash = Column(String(64), nullable=False, index=True)
+    # Hashed identifiers; guild and user lookups use the composite indexes
+    guild_id_hash = Column(String(64), nullable=False)
+    user_id_hash = Column(String(64), nullable=False)
     moderator_id_hash = Column(String(64), nullable=False, index=True)
+    hash_scheme = Column(
+        Integer,
+        nullable=False,
+        default=lambda: security_manager.hash_scheme,
+        server_default=str(HASH_SCHEME_ARGON2),
+    )
 
     # Action details
     action_type = Column(
@@ -167,11 +301,21 @@ class ModerationLog(Base):
         nullable=False,
         index=True,
     )  # warn, kick, ban, etc.
-    reason_encrypted = Column(Text, nullable=True)
+    reason_encrypted = Column(LargeBinary, nullable=True)
 
     # Optional reference to warning
-    warning_id = Column(Integer, ForeignKey("warnings.id"), nullable=True)
-    warning = relationship("SecureWarning", backref="logs")
+    warning_id = Column(
+        Integer,
+        ForeignKey("warnings.id"),
+        nullable=True,
+        index=True,
+    )
+    # Deleting a warning leaves its logs to DatabaseCleanup, which detaches
+    # them with a Core UPDATE; see partitions.update_logs() for why
+    warning = relationship(
+        "SecureWarning",
+        backref=backref("logs", passive_deletes="all"),
+    )
 
     # Metadata
     created_at = Column(
@@ -181,12 +325,13 @@ class ModerationLog(Base):
     )
 
     # Additional context (encrypted)
-    context_encrypted = Column(Text, nullable=True)  # Additional details
+    context_encrypted = Column(LargeBinary, nullable=True)  # Additional details
 
     # Indexes
     __table_args__ = (
         Index("idx_guild_action_date", "guild_id_hash", "action_type", "created_at"),
         Index("idx_user_actions", "user_id_hash", "created_at"),
+        Index("idx_log_created_at", "created_at"),
     )
 
     @validates("action_type")
@@ -212,23 +357,73 @@ class ModerationLog(Base):
         """Create a new moderation log entry."""
         # Log anonymized action
         logger.info(
-            f"Logging {action_type} action by moderator "
-            f"{security_manager.anonymize_for_logs(moderator_id)} "
-            f"on user {security_manager.anonymize_for_logs(user_id)}",
+            "Logging %s action by moderator %s on user %s",
+            action_type,
+            security_manager.anonymized(moderator_id),
+            security_manager.anonymized(user_id),
         )
 
         return cls(
             guild_id_hash=security_manager.hash_discord_id(guild_id),
             user_id_hash=security_manager.hash_discord_id(user_id),
             moderator_id_hash=security_manager.hash_discord_id(moderator_id),
+            hash_scheme=security_manager.hash_scheme,
             action_type=action_type.lower(),
-            reason_encrypted=security_manager.encrypt_text(reason) if reason else None,
+            reason_encrypted=(
+                security_manager.encrypt_to_bytes(reason) if reason else None
+            ),
             context_encrypted=(
-                security_manager.encrypt_text(context) if context else None
+                security_manager.encrypt_to_bytes(context) if context else None
             ),
             warning_id=warning_id,
         )
 
+    @classmethod
+    def bulk_values(
+        cls,
+        guild_id: str,
+        user_id: str,
+        moderator_id: str,
+        action_type: str,
+        warning_ids: list[int | None],
+        reason: str | None = None,
+        context: str | None = None,
+    ) -> list[dict]:
+        """Build bulk insert parameters for one action applied to many warnings.
+
+        IDs are hashed and reason and context encrypted once; every row
+        shares those values and differs only in its warning ID.
+        """
+        action_type = action_type.lower()
+        if action_type not in ALLOWED_ACTION_TYPES:
+            raise ValueError(
+                f"Invalid action type: {action_type}. "
+                f"Must be one of {ALLOWED_ACTION_TYPES}",
+            )
+        logger.info(
+            "Logging %s %s actions by moderator %s on user %s",
+            len(warning_ids),
+            action_type,
+            security_manager.anonymized(moderator_id),
+            security_manager.anonymized(user_id),
+        )
+
+        shared = {
+            "guild_id_hash": security_manager.hash_discord_id(guild_id),
+            "user_id_hash": security_manager.hash_discord_id(user_id),
+            "moderator_id_hash": security_manager.hash_discord_id(moderator_id),
+            "hash_scheme": security_manager.hash_scheme,
+            "action_type": action_type,
+            "reason_encrypted": (
+                security_manager.encrypt_to_bytes(reason) if reason else None
+            ),
+            "context_encrypted": (
+                security_manager.encrypt_to_bytes(context) if context else None
+            ),
+            "created_at": datetime.now(UTC),
+        }
+        return [{**shared, "warning_id": warning_id} for warning_id in warning_ids]
+
     def get_decrypted_reason(self) -> str:
         """Get the decrypted reason."""
         if not self.reason_encrypted:
@@ -236,7 +431,7 @@ class ModerationLog(Base):
         try:
             return security_manager.decrypt_text(self.reason_encrypted)
         except ValueError:
-            return "[DECRYPTION_FAILED]"
+            return DECRYPTION_FAILED
 
     def get_decrypted_context(self) -> str:
         """Get the decrypted context."""
@@ -245,7 +440,51 @@ class ModerationLog(Base):
         try:
             return security_manager.decrypt_text(self.context_encrypted)
         except ValueError:
-            return "[DECRYPTION_FAILED]"
+            return DECRYPTION_FAILED
+
+    @staticmethod
+    def decrypt_fields(logs: list["ModerationLog"]) -> list[tuple[str, str]]:
+        """Decrypt reason and context of several logs in one batch.
+
+        Returns:
+            (reason, context) pairs in the same order as ``logs``
+        """
+        ciphertexts = []
+        for log in logs:
+            ciphertexts.extend((log.reason_encrypted, log.context_encrypted))
+        plaintexts = security_manager.decrypt_many(
+            ciphertexts,
+            default=DECRYPTION_FAILED,
+        )
+        return list(zip(plaintexts[::2], plaintexts[1::2], strict=True))
+
+
+@event.listens_for(ModerationLog, "after_insert")
+def _read_back_log_id(
+    _mapper: Mapper,
+    connection: Connection,
+    target: ModerationLog,
+) -> None:
+    """Set the id of a log the ORM inserted through the SQLite partition view.
+
+    The view's INSTEAD OF trigger writes the row to its month's table, and
+    SQLite restores last_insert_rowid() when the trigger ends, so the ORM
+    would be handed another row's id. The write lock is held from the insert
+    on, so the row is the newest one with its created_at.
+    """
+    if connection.dialect.name != "sqlite":
+        return
+    kind = connection.scalar(
+        text("SELECT type FROM sqlite_master WHERE name = :name"),
+        {"name": ModerationLog.__tablename__},
+    )
+    if kind != "view":
+        return
+    logs = ModerationLog.__table__
+    log_id = connection.scalar(
+        select(func.max(logs.c.id)).where(logs.c.created_at == target.created_at),
+    )
+    set_committed_value(target, "id", log_id)
 
 
 class GDPRRequest(Base):
@@ -253,8 +492,14 @@ class GDPRRequest(Base):
 
     __tablename__ = "gdpr_requests"
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     user_id_hash = Column(String(64), nullable=False, index=True)
+    hash_scheme = Column(
+        Integer,
+        nullable=False,
+        default=lambda: security_manager.hash_scheme,
+        server_default=str(HASH_SCHEME_ARGON2),
+    )
     request_type = Column(String(20), nullable=False)  # 'export', 'delete'
     status = Column(
         String(20),
@@ -294,5 +539,275 @@ class GDPRRequest(Base):
         """Create a new GDPR request."""
         return cls(
             user_id_hash=security_manager.hash_discord_id(user_id),
+            hash_scheme=security_manager.hash_scheme,
             request_type=request_type,
         )
+
+
+class MaintenanceCheckpoint(Base):
+    """Progress of resumable background maintenance jobs."""
+
+    __tablename__ = "maintenance_checkpoints"
+
+    job_name = Column(String(64), primary_key=True)
+    table_name = Column(String(64), primary_key=True)
+    last_id = Column(Integer, default=0, nullable=False)
+    updated_at = Column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(UTC),
+        onupdate=lambda: datetime.now(UTC),
+    )
+
+
+class WarningCounter(Base):
+    """Materialized count of a member's active warnings, keyed by lookup key.
+
+    Every write path that changes the number of active warnings adjusts the
+    counter in the same transaction, so threshold checks read one row
+    instead of counting the member's whole history.
+    """
+
+    __tablename__ = "warning_counters"
+
+    lookup_key = Column(String(16), primary_key=True)
+    active_count = Column(Integer, default=0, nullable=False)
+    updated_at = Column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(UTC),
+        onupdate=lambda: datetime.now(UTC),
+    )
+
+    @staticmethod
+    def count_active(db: Session, lookup_key: str) -> int:
+        """Count a member's active warnings from the base table."""
+        return db.execute(
+            select(func.count(SecureWarning.id)).where(
+                SecureWarning.lookup_key == lookup_key,
+                SecureWarning.is_deleted.is_(False),
+            ),
+        ).scalar_one()
+
+    @classmethod
+    def adjust(cls, db: Session, lookup_key: str, delta: int) -> int:
+        """Apply a change in active warnings and return the new count.
+
+        Must be called after the change to ``warnings`` has been flushed, in
+        the same transaction. A member without a counter yet (e.g. history
+        from before counters existed) is seeded from the base table.
+        """
+        new_count = db.execute(
+            update(cls)
+            .where(cls.lookup_key == lookup_key)
+            .values(
+                active_count=cls.active_count + delta,
+                updated_at=datetime.now(UTC),
+            )
+            .returning(cls.active_count),
+        ).scalar_one_or_none()
+
+        if new_count is None:
+            new_count = db.execute(
+                cls._seed(db, {lookup_key: delta}).returning(cls.active_count),
+                {
+                    "lookup_key": lookup_key,
+                    "active_count": cls.count_active(db, lookup_key),
+                },
+            ).scalar_one()
+        return new_count
+
+    @classmethod
+    def adjust_many(cls, db: Session, deltas: dict[str, int]) -> None:
+        """Apply changes to several members' counters in one statement.
+
+        Same contract as adjust(); members without a counter are seeded from
+        the base table with a single grouped count.
+        """
+        if not deltas:
+            return
+        updated = db.execute(
+            update(cls)
+            .where(cls.lookup_key.in_(deltas))
+            .values(
+                active_count=cls.active_count
+                + case(deltas, value=cls.lookup_key, else_=0),
+                updated_at=datetime.now(UTC),
+            )
+            .returning(cls.lookup_key)
+            .execution_options(synchronize_session=False),
+        ).scalars()
+
+        missing = set(deltas) - set(updated)
+        if missing:
+            counts = dict(
+                db.execute(
+                    select(SecureWarning.lookup_key, func.count(SecureWarning.id))
+                    .where(
+                        SecureWarning.lookup_key.in_(missing),
+                        SecureWarning.is_deleted.is_(False),
+                    )
+                    .group_by(SecureWarning.lookup_key),
+                ).all(),
+            )
+            db.execute(
+                cls._seed(db, deltas),
+                [
+                    {
+                        "lookup_key": lookup_key,
+                        "active_count": counts.get(lookup_key, 0),
+                    }
+                    for lookup_key in missing
+                ],
+            )
+
+    @classmethod
+    def _seed(cls, db: Session, deltas: dict[str, int]) -> Insert:
+        """Insert counted counters, applying ``deltas`` to concurrently seeded ones.
+
+        Another transaction may seed the same member between our failed
+        update and this insert; its count already includes its own change, so
+        only ours is added on conflict.
+        """
+        upsert = UPSERT_INSERTS[db.get_bind().dialect.name](cls.__table__)
+        return upsert.on_conflict_do_update(
+            index_elements=["lookup_key"],
+            set_={
+                "active_count": cls.__table__.c.active_count
+                + case(deltas, value=upsert.excluded.lookup_key, else_=0),
+                "updated_at": datetime.now(UTC),
+            },
+        )
+
+    @classmethod
+    def get_count(cls, db: Session, lookup_key: str) -> int:
+        """Read a member's active warning count, counting if not materialized."""
+        counter = db.get(cls, lookup_key)
+        if counter is None:
+            return cls.count_active(db, lookup_key)
+        return counter.active_count
+
+    @classmethod
+    def rebuild(cls, db: Session) -> int:
+        """Recompute every counter from the base table without committing.
+
+        Returns:
+            Number of counters that were missing or wrong
+        """
+        actual = dict(
+            db.execute(
+                select(SecureWarning.lookup_key, func.count(SecureWarning.id))
+                .where(SecureWarning.is_deleted.is_(False))
+                .group_by(SecureWarning.lookup_key),
+            ).all(),
+        )
+        repaired = 0
+        for counter in db.query(cls):
+            expected = actual.pop(counter.lookup_key, 0)
+            if counter.active_count != expected:
+                counter.active_count = expected
+                repaired += 1
+        for lookup_key, count in actual.items():
+            db.add(cls(lookup_key=lookup_key, active_count=count))
+            repaired += 1
+        return repaired
+
+
+class ModerationRollup(Base):
+    """Daily per-guild moderation totals backing the analytics service.
+
+    One row per (guild, metric, day, key): actions by type, actions by
+    moderator hash and offences by member hash. Rows are incremented in the
+    transaction that inserts the audit logs, and compact() rebuilds recent
+    days from moderation_logs, so analytics never scan the log table.
+    """
+
+    __tablename__ = "moderation_rollups"
+    __table_args__ = (Index("idx_rollup_day", "day"),)
+
+    guild_id_hash = Column(String(64), primary_key=True)
+    metric = Column(String(16), primary_key=True)
+    day = Column(Date, primary_key=True)
+    key = Column(String(64), primary_key=True)
+    total = Column(Integer, default=0, nullable=False)
+
+    @staticmethod
+    def _deltas(rows: Iterable[dict]) -> Counter:
+        """Count audit rows per rollup key."""
+        deltas = Counter()
+        for row in rows:
+            created_at = row["created_at"]
+            if created_at.tzinfo is None:
+                # SQLite returns stored UTC timestamps without a timezone
+                created_at = created_at.replace(tzinfo=UTC)
+            day = created_at.astimezone(UTC).date()
+            for metric, column in ROLLUP_METRICS.items():
+                if (
+                    metric == "offender"
+                    and row["action_type"] not in OFFENCE_ACTION_TYPES
+                ):
+                    continue
+                deltas[(row["guild_id_hash"], metric, day, row[column])] += 1
+        return deltas
+
+    @staticmethod
+    def _values(deltas: Counter) -> list[dict]:
+        """Build insert parameters from per-key totals."""
+        return [
+            {
+                "guild_id_hash": guild_id_hash,
+                "metric": metric,
+                "day": day,
+                "key": key,
+                "total": total,
+            }
+            for (guild_id_hash, metric, day, key), total in deltas.items()
+        ]
+
+    @classmethod
+    def _increment(cls, db: Session, deltas: Counter) -> None:
+        """Add totals to rollup rows, creating missing ones, in one statement."""
+        if not deltas:
+            return
+        upsert = UPSERT_INSERTS[db.get_bind().dialect.name](cls.__table__)
+        db.execute(
+            upsert.on_conflict_do_update(
+                index_elements=["guild_id_hash", "metric", "day", "key"],
+                set_={"total": cls.__table__.c.total + upsert.excluded.total},
+            ),
+            cls._values(deltas),
+        )
+
+    @classmethod
+    def record(cls, db: Session, rows: list[dict]) -> None:
+        """Count freshly inserted audit rows (ModerationLog.bulk_values)."""
+        cls._increment(db, cls._deltas(rows))
+
+    @classmethod
+    def compact(cls, db: Session, since: date) -> int:
+        """Rebuild rollups of ``since`` and later days without committing.
+
+        Older days are kept as they are, so totals outlive the audit logs
+        removed by retention cleanup.
+
+        Returns:
+            Number of rollup rows written
+        """
+        db.execute(delete(cls).where(cls.day >= since))
+        logs = db.execute(
+            select(
+                ModerationLog.guild_id_hash,
+                ModerationLog.moderator_id_hash,
+                ModerationLog.user_id_hash,
+                ModerationLog.action_type,
+                ModerationLog.created_at,
+            )
+            .where(
+                ModerationLog.created_at
+                >= datetime.combine(since, time.min, tzinfo=UTC),
+            )
+            .execution_options(yield_per=1000),
+        ).mappings()
+        # Counted exactly like record() so both paths agree on day boundaries
+        deltas = cls._deltas(logs)
+        if deltas:
+            db.execute(insert(cls), cls._values(deltas))
+        return len(deltas)
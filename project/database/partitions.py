@@ -0,0 +1,401 @@
+"""Monthly partitions of the moderation_logs audit table.
+
+Migration 0004 splits moderation_logs by the month of created_at:
+
+- PostgreSQL: moderation_logs is partitioned by RANGE (created_at), with
+  one partition per month (``moderation_logs_pYYYYMM``) and a default
+  partition for rows outside them.
+- SQLite: every month is its own table, behind a ``moderation_logs`` view
+  that reads them with UNION ALL. INSTEAD OF triggers on the view insert
+  each row into its month's table and apply updates and deletes to the
+  table holding the row. A month's ids start at ``month * ID_BLOCK``, so ids
+  are unique across tables and keep increasing from month to month.
+
+Queries keep using ModerationLog. A created_at range is pruned to the
+matching partitions by PostgreSQL, and on SQLite becomes one index search
+per month table. Retention drops the months older than the cutoff instead
+of deleting their rows.
+
+Creating partitions is DDL, so it is left to migrations and the cleanup job
+(ensure_partitions()), never the bot; rows of months without a partition
+land in the default partition until theirs is created. Databases built by
+create_all() (tests, benchmarks) keep a single table, which these functions
+leave as it is.
+"""
+
+import logging
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import UTC, date, datetime, time
+from typing import Any
+
+from sqlalchemy import (
+    DateTime,
+    Index,
+    MetaData,
+    Table,
+    bindparam,
+    column,
+    delete,
+    insert,
+    select,
+    table,
+    text,
+    update,
+)
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+from sqlalchemy.schema import CreateIndex, CreateTable
+
+from .models import ModerationLog, SecureWarning
+
+
+logger = logging.getLogger(__name__)
+
+TABLE_NAME = ModerationLog.__tablename__
+PARTITION_PREFIX = f"{TABLE_NAME}_p"
+DEFAULT_PARTITION = f"{TABLE_NAME}_default"
+
+# Months after the current one that get a partition in advance
+MONTHS_AHEAD = 3
+
+# SQLite: the first id of a month's table is (year * 12 + month - 1) * ID_BLOCK
+ID_BLOCK = 10**10
+
+
+def add_months(day: date, months: int) -> date:
+    """First day of the month ``months`` after the month of ``day``."""
+    index = day.year * 12 + day.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+@dataclass(frozen=True, order=True)
+class Partition:
+    """One month of moderation logs: created_at in [start, end)."""
+
+    start: date
+
+    @classmethod
+    def of(cls, moment: date) -> "Partition":
+        """The partition holding a date or datetime (UTC)."""
+        return cls(date(moment.year, moment.month, 1))
+
+    @classmethod
+    def from_name(cls, name: str) -> "Partition":
+        """Parse a ``moderation_logs_pYYYYMM`` table name."""
+        month = name.removeprefix(PARTITION_PREFIX)
+        return cls(date(int(month[:4]), int(month[4:]), 1))
+
+    @property
+    def end(self) -> date:
+        """First day after the partition."""
+        return add_months(self.start, 1)
+
+    @property
+    def name(self) -> str:
+        """Table name of the partition."""
+        return f"{PARTITION_PREFIX}{self.start:%Y%m}"
+
+    @property
+    def first_id(self) -> int:
+        """SQLite: ids of the partition's rows start after this one."""
+        return (self.start.year * 12 + self.start.month - 1) * ID_BLOCK
+
+
+@dataclass
+class PurgeResult:
+    """Outcome of purge_before()."""
+
+    dropped: list[str] = field(default_factory=list)
+    deleted: int = 0
+
+
+def _is_partition_name(name: str) -> bool:
+    suffix = name.removeprefix(PARTITION_PREFIX)
+    return name.startswith(PARTITION_PREFIX) and len(suffix) == 6 and suffix.isdigit()
+
+
+def _bound(day: date, dialect: str) -> str:
+    """SQL literal for midnight UTC of ``day``.
+
+    SQLite stores naive UTC timestamps as text, so a date compares correctly
+    against them; PostgreSQL needs the offset for timestamptz.
+    """
+    if dialect == "postgresql":
+        return f"'{day.isoformat()} 00:00:00+00'"
+    return f"'{day.isoformat()}'"
+
+
+def _in_range(
+    partition: Partition,
+    dialect: str,
+    expression: str = "created_at",
+) -> str:
+    return (
+        f"{expression} >= {_bound(partition.start, dialect)} "
+        f"AND {expression} < {_bound(partition.end, dialect)}"
+    )
+
+
+def is_partitioned(connection: Connection) -> bool:
+    """Whether moderation_logs has been split into partitions."""
+    dialect = connection.dialect.name
+    if dialect == "postgresql":
+        return bool(
+            connection.scalar(
+                text(
+                    "SELECT relkind = 'p' FROM pg_class WHERE oid = to_regclass(:name)",
+                ),
+                {"name": TABLE_NAME},
+            ),
+        )
+    if dialect == "sqlite":
+        return (
+            connection.scalar(
+                text("SELECT type FROM sqlite_master WHERE name = :name"),
+                {"name": TABLE_NAME},
+            )
+            == "view"
+        )
+    return False
+
+
+def list_partitions(connection: Connection) -> list[Partition]:
+    """The monthly partitions, oldest first (without the default one)."""
+    if connection.dialect.name == "postgresql":
+        names = connection.scalars(
+            text(
+                "SELECT child.relname FROM pg_inherits "
+                "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+                "WHERE pg_inherits.inhparent = to_regclass(:name)",
+            ),
+            {"name": TABLE_NAME},
+        )
+    else:
+        names = connection.scalars(
+            text("SELECT name FROM sqlite_master WHERE type = 'table'"),
+        )
+    return sorted(
+        Partition.from_name(name) for name in names if _is_partition_name(name)
+    )
+
+
+def _sqlite_table(name: str) -> Table:
+    """A copy of the moderation_logs table, indexes and all, named ``name``."""
+    metadata = MetaData()
+    # Target of the warning_id foreign key
+    SecureWarning.__table__.to_metadata(metadata)
+    source = ModerationLog.__table__
+    partition = source.to_metadata(metadata, name=name)
+    partition.dialect_options["sqlite"]["autoincrement"] = True
+    # Index names are global in SQLite, so each table's carry its suffix
+    suffix = name.removeprefix(f"{TABLE_NAME}_")
+    partition.indexes.clear()
+    for index in source.indexes:
+        Index(
+            f"{index.name}_{suffix}",
+            *(partition.c[indexed.name] for indexed in index.columns),
+        )
+    return partition
+
+
+def _rebuild_sqlite_view(connection: Connection) -> None:
+    """Recreate the moderation_logs view and its triggers over every table."""
+    partitions = list_partitions(connection)
+    tables = [partition.name for partition in partitions] + [DEFAULT_PARTITION]
+    columns = [c.name for c in ModerationLog.__table__.columns]
+    column_list = ", ".join(columns)
+    new_values = ", ".join(f"NEW.{name}" for name in columns)
+    assignments = ", ".join(f"{name} = NEW.{name}" for name in columns if name != "id")
+
+    in_any_partition = " OR ".join(
+        f"({_in_range(partition, 'sqlite', 'NEW.created_at')})"
+        for partition in partitions
+    )
+    inserts = [
+        f"INSERT INTO {partition.name} ({column_list}) SELECT {new_values} "
+        f"WHERE {_in_range(partition, 'sqlite', 'NEW.created_at')};"
+        for partition in partitions
+    ]
+    inserts.append(
+        f"INSERT INTO {DEFAULT_PARTITION} ({column_list}) SELECT {new_values} "
+        f"WHERE NOT ({in_any_partition or '0'});",
+    )
+    # Identifiers are the model's columns and list_partitions()' table names
+    updates = [
+        f"UPDATE {name} SET {assignments} WHERE id = OLD.id;"  # noqa: S608
+        for name in tables
+    ]
+    deletes = [f"DELETE FROM {name} WHERE id = OLD.id;" for name in tables]  # noqa: S608
+
+    selects = " UNION ALL ".join(
+        f"SELECT {column_list} FROM {name}"  # noqa: S608
+        for name in tables
+    )
+
+    # Dropping the view drops its triggers too
+    connection.execute(text(f"DROP VIEW IF EXISTS {TABLE_NAME}"))
+    connection.execute(text(f"CREATE VIEW {TABLE_NAME} AS {selects}"))
+    for event, statements in (
+        ("INSERT", inserts),
+        ("UPDATE", updates),
+        ("DELETE", deletes),
+    ):
+        connection.execute(
+            text(
+                f"CREATE TRIGGER {TABLE_NAME}_{event.lower()} "
+                f"INSTEAD OF {event} ON {TABLE_NAME} "
+                f"BEGIN {' '.join(statements)} END",
+            ),
+        )
+
+
+def _create_partition(connection: Connection, partition: Partition) -> None:
+    """Create one month's partition and move its rows out of the default one."""
+    name = partition.name
+    dialect = connection.dialect.name
+    if dialect == "postgresql":
+        in_range = _in_range(partition, dialect)
+        # Attaching checks the default partition holds no rows of the month,
+        # so they are moved into the new table before it is attached
+        connection.execute(
+            text(f"CREATE TABLE {name} (LIKE {TABLE_NAME} INCLUDING DEFAULTS)"),
+        )
+        connection.execute(
+            text(
+                # Identifiers are module constants and a Partition's name
+                f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} WHERE {in_range} "  # noqa: S608
+                f"RETURNING *) INSERT INTO {name} SELECT * FROM moved",
+            ),
+        )
+        connection.execute(
+            text(
+                f"ALTER TABLE {TABLE_NAME} ATTACH PARTITION {name} FOR VALUES "
+                f"FROM ({_bound(partition.start, dialect)}) "
+                f"TO ({_bound(partition.end, dialect)})",
+            ),
+        )
+        return
+
+    new_table = _sqlite_table(name)
+    connection.execute(CreateTable(new_table))
+    for index in new_table.indexes:
+        connection.execute(CreateIndex(index))
+    connection.execute(
+        text("INSERT INTO sqlite_sequence (name, seq) VALUES (:name, :seq)"),
+        {"name": name, "seq": partition.first_id},
+    )
+    default = table(
+        DEFAULT_PARTITION,
+        *(column(c.name, c.type) for c in ModerationLog.__table__.columns),
+    )
+    start, end = (
+        datetime.combine(day, time.min, tzinfo=UTC)
+        for day in (partition.start, partition.end)
+    )
+    in_month = (default.c.created_at >= start) & (default.c.created_at < end)
+    connection.execute(
+        insert(new_table).from_select(
+            [c.name for c in default.columns],
+            select(default).where(in_month),
+        ),
+    )
+    connection.execute(delete(default).where(in_month))
+
+
+def ensure_partitions(
+    connection: Connection,
+    months_ahead: int = MONTHS_AHEAD,
+    today: date | None = None,
+) -> list[str]:
+    """Create any missing partitions from this month to ``months_ahead`` ahead.
+
+    Returns:
+        Names of the partitions created
+    """
+    if months_ahead < 0:
+        raise ValueError("months_ahead must be non-negative")
+    if not is_partitioned(connection):
+        return []
+
+    current = Partition.of(today or datetime.now(UTC))
+    existing = set(list_partitions(connection))
+    missing = [
+        partition
+        for partition in (
+            Partition(add_months(current.start, offset))
+            for offset in range(months_ahead + 1)
+        )
+        if partition not in existing
+    ]
+    for partition in missing:
+        _create_partition(connection, partition)
+    if missing:
+        if connection.dialect.name == "sqlite":
+            _rebuild_sqlite_view(connection)
+        logger.info(
+            "Created moderation log partitions %s",
+            ", ".join(partition.name for partition in missing),
+        )
+    return [partition.name for partition in missing]
+
+
+def purge_before(connection: Connection, cutoff: datetime) -> PurgeResult:
+    """Remove moderation logs created before ``cutoff`` (timezone-aware).
+
+    Partitions that end before the cutoff are dropped whole, which takes the
+    same time however many rows they hold. Only the month the cutoff falls
+    in, and the default partition, are pruned with a row DELETE. An
+    unpartitioned table is pruned with a DELETE.
+
+    Returns:
+        The dropped partitions and the number of rows deleted by DELETE
+    """
+    result = PurgeResult()
+    if not is_partitioned(connection):
+        logs = ModerationLog.__table__
+        result.deleted = connection.execute(
+            delete(logs).where(logs.c.created_at < cutoff),
+        ).rowcount
+        return result
+
+    cutoff_day = cutoff.astimezone(UTC).date()
+    remaining = []
+    for partition in list_partitions(connection):
+        if datetime.combine(partition.end, time.min, tzinfo=UTC) <= cutoff:
+            connection.execute(text(f"DROP TABLE {partition.name}"))
+            result.dropped.append(partition.name)
+        elif partition.start <= cutoff_day:
+            remaining.append(partition.name)
+    if result.dropped and connection.dialect.name == "sqlite":
+        _rebuild_sqlite_view(connection)
+
+    # Row deletes go to the tables themselves: SQLite counts no rows for a
+    # DELETE through the view
+    for name in [*remaining, DEFAULT_PARTITION]:
+        rows = table(name, column("created_at", DateTime(timezone=True)))
+        result.deleted += connection.execute(
+            delete(rows).where(rows.c.created_at < cutoff),
+        ).rowcount
+    return result
+
+
+def update_logs(db: Session, updates: list[dict[str, Any]]) -> None:
+    """UPDATE moderation_logs rows by id.
+
+    ``updates`` holds an ``id`` and the new column values for each row. The
+    statements are Core UPDATEs: the ORM's, bulk or not, require a matched
+    row count, which SQLite reports as 0 for writes through the view.
+    """
+    logs = ModerationLog.__table__
+    batches: dict[tuple[str, ...], list[dict[str, Any]]] = defaultdict(list)
+    for values in updates:
+        columns = tuple(sorted(key for key in values if key != "id"))
+        batches[columns].append(
+            {"log_id": values["id"], **{key: values[key] for key in columns}},
+        )
+    for params in batches.values():
+        db.execute(
+            update(logs).where(logs.c.id == bindparam("log_id")),
+            params,
+        )
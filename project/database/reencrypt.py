@@ -0,0 +1,392 @@
+"""Batched in-place re-encryption of stored ciphertexts."""
+
+import logging
+import threading
+import time
+from collections import defaultdict
+from collections.abc import Iterator
+
+from sqlalchemy import (
+    LargeBinary,
+    Row,
+    Select,
+    bindparam,
+    inspect,
+    select,
+    text,
+    update,
+)
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from .connection import SessionLocal
+from .models import MaintenanceCheckpoint, ModerationLog, SecureWarning
+from .partitions import update_logs
+from .security import security_manager
+
+
+logger = logging.getLogger(__name__)
+
+# Encrypted columns of each model, converted together per row
+ENCRYPTED_COLUMNS = {
+    SecureWarning: ("reason_encrypted",),
+    ModerationLog: ("reason_encrypted", "context_encrypted"),
+}
+
+DEFAULT_BATCH_SIZE = 500
+
+# Times a batch's rows edited during their re-encryption are read again
+MAX_BATCH_ATTEMPTS = 3
+
+# Rotation runs next to the live bot, so it uses small batches and by default
+# spends at most a quarter of wall time inside transactions
+ROTATION_BATCH_SIZE = 200
+ROTATION_DUTY_CYCLE = 0.25
+
+
+def prepare_binary_columns(bind: Engine) -> None:
+    """Convert legacy text ciphertext columns to BYTEA on PostgreSQL.
+
+    SQLite keeps blobs written to a TEXT column as-is, so no DDL is needed
+    there; legacy values are converted by migrate_ciphertexts instead.
+    """
+    if bind.dialect.name != "postgresql":
+        return
+
+    inspector = inspect(bind)
+    with bind.begin() as conn:
+        for model, columns in ENCRYPTED_COLUMNS.items():
+            table = model.__tablename__
+            column_types = {
+                column["name"]: column["type"]
+                for column in inspector.get_columns(table)
+            }
+            for column in columns:
+                if isinstance(column_types[column], LargeBinary):
+                    continue
+                logger.info("Converting %s.%s to BYTEA", table, column)
+                conn.execute(
+                    text(
+                        f"ALTER TABLE {table} ALTER COLUMN {column} "
+                        f"TYPE BYTEA USING convert_to({column}, 'UTF8')",
+                    ),
+                )
+
+
+def iter_batches(
+    db: Session,
+    model,
+    columns: tuple[str, ...],
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    start_after: int = 0,
+) -> Iterator[list[Row]]:
+    """Keyset-iterate (id, *columns[, version]) rows in primary key order.
+
+    Each batch is a fresh ``WHERE id > last_id ORDER BY id LIMIT n`` query,
+    so no cursor or snapshot is held open between batches.
+    """
+    last_id = start_after
+    while True:
+        rows = db.execute(
+            _select_rows(model, columns)
+            .where(model.id > last_id)
+            .order_by(model.id)
+            .limit(batch_size),
+        ).all()
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1].id
+
+
+def _select_rows(model, columns: tuple[str, ...]) -> Select:
+    """SELECT of the id, ``columns`` and, if the model has one, version."""
+    selected = [model.id, *(getattr(model, column) for column in columns)]
+    if hasattr(model, "version"):
+        selected.append(model.version)
+    return select(*selected)
+
+
+def _reencrypt_batch(rows: list[Row], columns: tuple[str, ...], stats: dict) -> list:
+    """Build bulk update parameters for rows not under the primary key."""
+    updates = []
+    for row in rows:
+        values = {}
+        try:
+            for column in columns:
+                value = getattr(row, column)
+                if security_manager.needs_reencryption(value):
+                    values[column] = security_manager.encrypt_to_bytes(
+                        security_manager.decrypt_text(value),
+                    )
+        except ValueError:
+            stats["failed"] += 1
+            continue
+        if values:
+            if "version" in row._fields:
+                values["version"] = row.version
+            updates.append({"id": row.id, **values})
+    return updates
+
+
+def _apply_updates(db: Session, model, updates: list[dict]) -> int:
+    """Write a batch's re-encrypted values by primary key.
+
+    Versioned rows (warnings) are only written while their version is the
+    one read with the ciphertext, and their version is bumped, so an edit
+    made in between is never overwritten with the old reason.
+
+    Returns:
+        Number of rows written
+    """
+    if model is ModerationLog:
+        update_logs(db, updates)
+        return len(updates)
+
+    table = model.__table__
+    batches: dict[tuple[str, ...], list[dict]] = defaultdict(list)
+    for values in updates:
+        columns = tuple(sorted(key for key in values if key not in {"id", "version"}))
+        batches[columns].append(
+            {
+                "row_id": values["id"],
+                "row_version": values["version"],
+                **{column: values[column] for column in columns},
+            },
+        )
+
+    written = 0
+    for columns, params in batches.items():
+        statement = (
+            update(table)
+            .where(
+                table.c.id == bindparam("row_id"),
+                table.c.version == bindparam("row_version"),
+            )
+            .values(
+                version=table.c.version + 1,
+                **{column: bindparam(column) for column in columns},
+            )
+        )
+        if db.get_bind().dialect.supports_sane_multi_rowcount:
+            written += db.execute(statement, params).rowcount
+        else:
+            written += sum(db.execute(statement, row).rowcount for row in params)
+    return written
+
+
+def _convert_batch(
+    db: Session,
+    model,
+    columns: tuple[str, ...],
+    rows: list[Row],
+    stats: dict,
+) -> int:
+    """Re-encrypt and write one batch of rows.
+
+    Rows edited since they were read are read again and retried, up to
+    MAX_BATCH_ATTEMPTS times; the ones still changing count as failed and
+    are left to the next run.
+
+    Returns:
+        Number of rows converted
+    """
+    converted = 0
+    for _attempt in range(MAX_BATCH_ATTEMPTS):
+        updates = _reencrypt_batch(rows, columns, stats)
+        if not updates:
+            return converted
+        written = _apply_updates(db, model, updates)
+        converted += written
+        if written == len(updates):
+            return converted
+        # Rows already written are up to date now and are skipped
+        rows = db.execute(
+            _select_rows(model, columns)
+            .where(model.id.in_([values["id"] for values in updates]))
+            .order_by(model.id),
+        ).all()
+
+    stats["failed"] += len(updates) - written
+    logger.warning(
+        "%s %s rows kept changing during re-encryption; re-run to convert them",
+        len(updates) - written,
+        model.__tablename__,
+    )
+    return converted
+
+
+def migrate_ciphertexts(
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    session_factory: sessionmaker = SessionLocal,
+) -> dict[str, dict[str, int]]:
+    """Convert every ciphertext to the current binary format in place.
+
+    Legacy base64 Fernet values and values under a non-primary key are
+    re-encrypted with the primary key. Rows are streamed in primary key
+    batches and every batch is committed on its own, so the migration can
+    be interrupted and re-run safely: up-to-date rows are skipped.
+
+    Returns:
+        Per-table counts of converted and failed rows
+    """
+    stats = {}
+    with session_factory() as db:
+        prepare_binary_columns(db.get_bind())
+
+        for model, columns in ENCRYPTED_COLUMNS.items():
+            table_stats = {"converted": 0, "failed": 0}
+
+            for rows in iter_batches(db, model, columns, batch_size):
+                table_stats["converted"] += _convert_batch(
+                    db,
+                    model,
+                    columns,
+                    rows,
+                    table_stats,
+                )
+                db.commit()
+
+            logger.info(
+                "Converted %s %s rows (%s failed)",
+                table_stats["converted"],
+                model.__tablename__,
+                table_stats["failed"],
+            )
+            stats[model.__tablename__] = table_stats
+
+    return stats
+
+
+class KeyRotationJob:
+    """Online re-encryption of all ciphertexts under the primary key.
+
+    Runs next to the live bot: rows are re-encrypted in small keyset batches,
+    each batch commits together with its checkpoint so an interrupted job
+    resumes where it stopped, and the job sleeps between batches so it only
+    occupies ``duty_cycle`` of wall time.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = ROTATION_BATCH_SIZE,
+        duty_cycle: float = ROTATION_DUTY_CYCLE,
+        session_factory: sessionmaker = SessionLocal,
+    ):
+        if not 0 < duty_cycle <= 1:
+            raise ValueError("duty_cycle must be in (0, 1]")
+        self.batch_size = batch_size
+        self.duty_cycle = duty_cycle
+        self.session_factory = session_factory
+        # Checkpoints are per target key, so a new rotation starts from scratch
+        self.job_name = f"rotate-keys:{security_manager.primary_key_id}"
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def _throttle(self, batch_seconds: float) -> None:
+        """Sleep long enough to keep the job within its duty cycle."""
+        pause = batch_seconds * (1 - self.duty_cycle) / self.duty_cycle
+        if pause > 0:
+            self._stop.wait(pause)
+
+    def _rotate_table(self, db: Session, model, columns: tuple[str, ...]) -> dict:
+        """Rotate one table, resuming from its checkpoint."""
+        table = model.__tablename__
+        checkpoint = db.get(MaintenanceCheckpoint, (self.job_name, table))
+        if checkpoint is None:
+            checkpoint = MaintenanceCheckpoint(
+                job_name=self.job_name,
+                table_name=table,
+                last_id=0,
+            )
+            db.add(checkpoint)
+            db.commit()
+
+        table_stats = {
+            "converted": 0,
+            "failed": 0,
+            "resumed_after": checkpoint.last_id,
+        }
+        # Batch time includes the keyset SELECT issued by iter_batches
+        started = time.perf_counter()
+        for rows in iter_batches(
+            db,
+            model,
+            columns,
+            self.batch_size,
+            start_after=checkpoint.last_id,
+        ):
+            table_stats["converted"] += _convert_batch(
+                db,
+                model,
+                columns,
+                rows,
+                table_stats,
+            )
+            checkpoint.last_id = rows[-1].id
+            db.commit()
+
+            if self._stop.is_set():
+                logger.info(
+                    "Key rotation paused at %s id %s",
+                    table,
+                    checkpoint.last_id,
+                )
+                break
+            self._throttle(time.perf_counter() - started)
+            started = time.perf_counter()
+
+        return table_stats
+
+    def run(self) -> dict[str, dict[str, int]]:
+        """Run the rotation until finished or stopped.
+
+        Returns:
+            Per-table counts of converted and failed rows
+        """
+        stats = {}
+        with self.session_factory() as db:
+            prepare_binary_columns(db.get_bind())
+
+            for model, columns in ENCRYPTED_COLUMNS.items():
+                stats[model.__tablename__] = self._rotate_table(db, model, columns)
+                if self._stop.is_set():
+                    return stats
+
+            # Finished: clear checkpoints so a re-run verifies from the start
+            db.query(MaintenanceCheckpoint).filter(
+                MaintenanceCheckpoint.job_name == self.job_name,
+            ).delete()
+            db.commit()
+
+        logger.info(
+            "Key rotation to key %s done",
+            security_manager.primary_key_id,
+        )
+        return stats
+
+    def start(self) -> threading.Thread:
+        """Run the rotation in a background thread."""
+        self._thread = threading.Thread(
+            target=self.run,
+            name="key-rotation",
+            daemon=True,
+        )
+        self._thread.start()
+        return self._thread
+
+    def stop(self, timeout: float | None = None) -> None:
+        """Ask the rotation to stop after the current batch and wait for it."""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+
+if __name__ == "__main__":
+    import sys
+
+    logging.basicConfig(level=logging.INFO)
+    if len(sys.argv) > 1 and sys.argv[1] == "rotate":
+        logger.info("Key rotation results: %s", KeyRotationJob().run())
+    else:
+        logger.info("Ciphertext migration results: %s", migrate_ciphertexts())
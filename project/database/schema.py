@@ -0,0 +1,165 @@
+"""Schema versioning with the Alembic migrations in ``migrations/``.
+
+Migrations are applied by ``alembic upgrade head`` (or upgrade_database())
+as a deployment step. The bot itself only checks at startup that the
+database is at the latest revision and never runs DDL.
+"""
+
+import logging
+from pathlib import Path
+
+from alembic import command
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy import create_engine, inspect
+from sqlalchemy.engine import Connection, Engine
+
+from . import models  # noqa: F401  (registers the tables on Base.metadata)
+from .connection import Base, engine, get_async_engine
+
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_DIR = Path(__file__).with_name("migrations")
+
+# Revision matching the schema create_all() built before migrations existed
+BASELINE_REVISION = "0001_baseline"
+
+
+class SchemaVersionError(RuntimeError):
+    """Raised when the database is not at the latest migration."""
+
+
+def alembic_config() -> Config:
+    """Alembic configuration for the bundled migrations."""
+    config = Config()
+    config.set_main_option("script_location", str(MIGRATIONS_DIR))
+    config.attributes["target_metadata"] = Base.metadata
+    return config
+
+
+def head_revision() -> str:
+    """The latest migration revision."""
+    return ScriptDirectory.from_config(alembic_config()).get_current_head()
+
+
+def current_revision(connection: Connection) -> str | None:
+    """The revision the database is at, or None if it is unversioned."""
+    return MigrationContext.configure(connection).get_current_revision()
+
+
+def check_schema_version(connection: Connection) -> str:
+    """Ensure the database is at the latest revision.
+
+    Returns:
+        The current revision
+
+    Raises:
+        SchemaVersionError: The database is unversioned or out of date
+    """
+    current = current_revision(connection)
+    head = head_revision()
+    if current == head:
+        return current
+    if current is None:
+        raise SchemaVersionError(
+            "Database has no schema version; run `alembic upgrade head` "
+            "(databases created before migrations: `alembic stamp "
+            f"{BASELINE_REVISION}` first)",
+        )
+    raise SchemaVersionError(
+        f"Database schema is at revision {current}, expected {head}; "
+        "run `alembic upgrade head`",
+    )
+
+
+def _schema_names(connection: Connection) -> dict[str, tuple[set[str], set[str]]]:
+    """Column and index names of every table but alembic_version."""
+    inspector = inspect(connection)
+    return {
+        table: (
+            {column["name"] for column in inspector.get_columns(table)},
+            {index["name"] for index in inspector.get_indexes(table)},
+        )
+        for table in inspector.get_table_names()
+        if table != "alembic_version"
+    }
+
+
+def baseline_mismatches(connection: Connection) -> list[str]:
+    """How a database's tables, columns and indexes differ from the baseline.
+
+    The baseline is built by its migration on a scratch SQLite database, so
+    only names are compared.
+    """
+    scratch = create_engine("sqlite://")
+    config = alembic_config()
+    try:
+        with scratch.begin() as baseline:
+            config.attributes["connection"] = baseline
+            command.upgrade(config, BASELINE_REVISION)
+            expected = _schema_names(baseline)
+    finally:
+        scratch.dispose()
+
+    actual = _schema_names(connection)
+    mismatches = []
+    for table in sorted(expected.keys() | actual.keys()):
+        if table not in actual:
+            mismatches.append(f"missing table {table}")
+        elif table not in expected:
+            mismatches.append(f"unexpected table {table}")
+        else:
+            for kind, wanted, found in zip(
+                ("column", "index"),
+                expected[table],
+                actual[table],
+                strict=True,
+            ):
+                mismatches.extend(
+                    f"missing {kind} {table}.{name}" for name in sorted(wanted - found)
+                )
+                mismatches.extend(
+                    f"unexpected {kind} {table}.{name}"
+                    for name in sorted(found - wanted)
+                )
+    return mismatches
+
+
+async def check_schema_version_async() -> str:
+    """check_schema_version() on the asyncio engine."""
+    async with get_async_engine().connect() as connection:
+        return await connection.run_sync(check_schema_version)
+
+
+def upgrade_database(db_engine: Engine | None = None, revision: str = "head") -> str:
+    """Apply migrations up to ``revision`` and return the new revision.
+
+    A database created by create_all() before migrations existed has the
+    baseline schema but no version; it is stamped with the baseline first.
+
+    Raises:
+        SchemaVersionError: The database is unversioned but its tables do not
+            match the baseline, so the revision it is at is unknown
+    """
+    config = alembic_config()
+    with (db_engine or engine).begin() as connection:
+        config.attributes["connection"] = connection
+        if current_revision(connection) is None and inspect(connection).has_table(
+            "warnings",
+        ):
+            mismatches = baseline_mismatches(connection)
+            if mismatches:
+                raise SchemaVersionError(
+                    f"Unversioned database does not match {BASELINE_REVISION} "
+                    f"({'; '.join(mismatches)}); run `alembic stamp <revision>` "
+                    "with the revision it matches, then `alembic upgrade head`",
+                )
+            logger.warning(
+                "Unversioned database with existing tables; stamping %s",
+                BASELINE_REVISION,
+            )
+            command.stamp(config, BASELINE_REVISION)
+        command.upgrade(config, revision)
+        return current_revision(connection)
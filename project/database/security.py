@@ -1,34 +1,252 @@
 """Security utilities for data encryption and hashing."""
 
+import asyncio
 import base64
+import contextlib
 import hashlib
+import hmac
+import json
 import logging
 import os
 import secrets
+import threading
+from collections.abc import Iterable
+from functools import lru_cache
+from pathlib import Path
 
-from cryptography.fernet import Fernet
+from cryptography.exceptions import InvalidTag
+from cryptography.fernet import Fernet, MultiFernet
 from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 
 
 logger = logging.getLogger(__name__)
 
+# Identifier hash schemes. Every row records the scheme its hashes were produced
+# with so that rows written under an older scheme can be found and re-keyed.
+HASH_SCHEME_ARGON2 = 1  # Legacy: random salt, cannot be used in equality filters
+HASH_SCHEME_HMAC_SHA256 = 2
+HASH_SCHEME_BLAKE2B = 3
+
+ID_HASH_ALGORITHMS = {
+    "hmac-sha256": HASH_SCHEME_HMAC_SHA256,
+    "blake2b": HASH_SCHEME_BLAKE2B,
+}
+
+# Default number of recently hashed IDs kept in memory
+DEFAULT_ID_HASH_CACHE_SIZE = 4096
+
+# Binary ciphertext storage formats:
+#   v1: version byte | nonce | AES-GCM ciphertext+tag
+#   v2: version byte | key ID byte | nonce | AES-GCM ciphertext+tag
+# Version bytes are below printable ASCII, so they never collide with legacy
+# base64 text ciphertexts stored in the same column.
+CIPHERTEXT_FORMAT_V1 = 0x01
+CIPHERTEXT_FORMAT_V2 = 0x02
+NONCE_SIZE = 12
+MAX_KEY_ID = 255
+
+# PBKDF2 iterations for password-based ENCRYPTION_KEY (OWASP recommended minimum)
+KEY_DERIVATION_ITERATIONS = 100_000
+
+
+class Argon2IDHasher:
+    """Legacy salted Argon2 hasher, kept only to verify rows being re-keyed."""
+
+    scheme = HASH_SCHEME_ARGON2
+
+    def __init__(self, pepper: str):
+        from argon2 import PasswordHasher
+
+        self._pepper = pepper
+        self._hasher = PasswordHasher()
+
+    def hash(self, discord_id: str) -> str:
+        """Hash an ID with a random salt (non-deterministic)."""
+        return self._hasher.hash(f"{discord_id}{self._pepper}")
+
+    def verify(self, discord_id: str, digest: str) -> bool:
+        """Check whether a stored Argon2 digest was produced from this ID."""
+        from argon2.exceptions import InvalidHashError, VerificationError
+
+        try:
+            return self._hasher.verify(digest, f"{discord_id}{self._pepper}")
+        except (InvalidHashError, VerificationError):
+            return False
+
+
+class HMACIDHasher:
+    """Deterministic keyed hash using HMAC-SHA256."""
+
+    scheme = HASH_SCHEME_HMAC_SHA256
+
+    def __init__(self, key: bytes):
+        self._key = key
+
+    def hash(self, discord_id: str) -> str:
+        """Hash an ID to 64 hex characters."""
+        return hmac.new(self._key, discord_id.encode(), hashlib.sha256).hexdigest()
+
+    def verify(self, discord_id: str, digest: str) -> bool:
+        """Timing-safe check of a stored digest."""
+        return secrets.compare_digest(self.hash(discord_id), digest)
+
+
+class Blake2bIDHasher:
+    """Deterministic keyed hash using BLAKE2b in keyed mode."""
+
+    scheme = HASH_SCHEME_BLAKE2B
+
+    def __init__(self, key: bytes):
+        self._key = key
+
+    def hash(self, discord_id: str) -> str:
+        """Hash an ID to 64 hex characters."""
+        return hashlib.blake2b(
+            discord_id.encode(),
+            key=self._key,
+            digest_size=32,
+        ).hexdigest()
+
+    def verify(self, discord_id: str, digest: str) -> bool:
+        """Timing-safe check of a stored digest."""
+        return secrets.compare_digest(self.hash(discord_id), digest)
+
+
+class AnonymizedId:
+    """Log argument that anonymizes a Discord ID only when a record is emitted.
+
+    Pass it as a %-style logging argument: logging calls ``__str__`` only for
+    records that pass the level check, so dropped records cost no hashing.
+    """
+
+    __slots__ = ("_discord_id", "_manager")
+
+    def __init__(self, manager: "SecurityManager", discord_id: str):
+        self._manager = manager
+        self._discord_id = discord_id
+
+    def __str__(self) -> str:
+        return self._manager.anonymize_for_logs(self._discord_id)
+
+
+def _read_key_cache(path: str, fingerprint: str) -> bytes | None:
+    """Return the cached derived key if the cache file is private and current."""
+    cache_file = Path(path)
+    try:
+        stat = cache_file.stat()
+    except FileNotFoundError:
+        return None
+    foreign_owner = hasattr(os, "getuid") and stat.st_uid != os.getuid()
+    if stat.st_mode & 0o077 or foreign_owner:
+        logger.warning("Ignoring KEY_CACHE_FILE: it must be private (mode 0600)")
+        return None
+    try:
+        with cache_file.open() as f:
+            cached = json.load(f)
+        if not hmac.compare_digest(cached["fingerprint"], fingerprint):
+            return None
+        key = cached["key"].encode()
+        Fernet(key)
+    except Exception:
+        logger.warning("Ignoring unreadable KEY_CACHE_FILE")
+        return None
+    return key
+
+
+def _write_key_cache(path: str, fingerprint: str, key: bytes) -> None:
+    """Atomically write the derived key to a 0600 cache file."""
+    tmp_path = Path(f"{path}.{os.getpid()}.tmp")
+    try:
+        # Created private and exclusively before the key is written into it
+        tmp_path.touch(mode=0o600, exist_ok=False)
+        with tmp_path.open("w") as f:
+            json.dump({"fingerprint": fingerprint, "key": key.decode()}, f)
+        tmp_path.replace(path)
+    except OSError:
+        logger.warning("Could not write KEY_CACHE_FILE", exc_info=True)
+        with contextlib.suppress(OSError):
+            tmp_path.unlink(missing_ok=True)
+
 
 class SecurityManager:
     """Manages encryption and hashing for sensitive data with enterprise-grade security."""
 
     def __init__(self):
         """Initialize security manager with keys from environment."""
-        self._encryption_key = self._get_encryption_key()
+        self._keyring = self._load_keyring()
+        self._primary_key_id = self._get_primary_key_id()
         self._salt = self._get_salt()
         self._pepper = self._get_pepper()  # Additional security layer
+        self._id_hash_key = self._derive_id_hash_key()
+        self._id_hasher = self._get_id_hasher()
+        # Deterministic hashes can be memoized; bounded to keep memory flat
+        self._hash_id_cached = lru_cache(maxsize=self._get_id_hash_cache_size())(
+            self._id_hasher.hash,
+        )
+        self._anonymize_cached = lru_cache(maxsize=self._get_id_hash_cache_size())(
+            self._anonymize,
+        )
         try:
-            self._cipher = Fernet(self._encryption_key)
+            # Primary key first: MultiFernet encrypts with it and tries all keys
+            self._cipher = MultiFernet(
+                [Fernet(key) for _key_id, key in self._keys_primary_first()],
+            )
         except Exception as e:
             logger.exception("Invalid encryption key format")
             raise ValueError(
                 "Invalid encryption key. Please ensure ENCRYPTION_KEY is a valid Fernet key.",
             ) from e
+        self._aeads = {
+            key_id: AESGCM(self._derive_storage_key(key))
+            for key_id, key in self._keyring.items()
+        }
+
+    def _load_keyring(self) -> dict[int, bytes]:
+        """Load encryption keys by key ID.
+
+        ENCRYPTION_KEYS holds comma-separated ``id:fernet_key`` entries; without
+        it, ENCRYPTION_KEY becomes the only key with ID 0.
+        """
+        keys_str = os.getenv("ENCRYPTION_KEYS")
+        if not keys_str:
+            return {0: self._get_encryption_key()}
+
+        keyring = {}
+        for entry in keys_str.split(","):
+            key_id_str, _, key_str = entry.strip().partition(":")
+            try:
+                key_id = int(key_id_str)
+                Fernet(key_str.encode())
+            except Exception:
+                msg = "ENCRYPTION_KEYS entries must be 'id:fernet_key'"
+                raise ValueError(msg) from None
+            if not 0 <= key_id <= MAX_KEY_ID:
+                raise ValueError(f"Encryption key IDs must be 0-{MAX_KEY_ID}")
+            keyring[key_id] = key_str.encode()
+        return keyring
+
+    def _get_primary_key_id(self) -> int:
+        """Get the ID of the key new ciphertexts are encrypted with."""
+        key_id_str = os.getenv("ENCRYPTION_KEY_ID")
+        key_id = int(key_id_str) if key_id_str else max(self._keyring)
+        if key_id not in self._keyring:
+            raise ValueError(f"ENCRYPTION_KEY_ID {key_id} is not in the keyring")
+        return key_id
+
+    def _keys_primary_first(self) -> list[tuple[int, bytes]]:
+        """Keyring entries ordered with the primary key first."""
+        return sorted(
+            self._keyring.items(),
+            key=lambda item: item[0] != self._primary_key_id,
+        )
+
+    @property
+    def primary_key_id(self) -> int:
+        """ID of the key used for new ciphertexts."""
+        return self._primary_key_id
 
     def _get_encryption_key(self) -> bytes:
         """Get or derive encryption key using PBKDF2."""
@@ -51,14 +269,43 @@ class SecurityManager:
             if not salt_str:
                 msg = "KEY_DERIVATION_SALT must be set when using password-based encryption"
                 raise ValueError(msg) from None
-            salt = salt_str.encode()
-            kdf = PBKDF2HMAC(
-                algorithm=hashes.SHA256(),
-                length=32,
-                salt=salt,
-                iterations=100000,  # OWASP recommended minimum
-            )
-            return base64.urlsafe_b64encode(kdf.derive(key_str.encode()))
+            return self._derive_password_key(key_str.encode(), salt_str.encode())
+
+    def _derive_password_key(self, password: bytes, salt: bytes) -> bytes:
+        """Derive a Fernet key from a password, reusing KEY_CACHE_FILE if set."""
+        cache_path = os.getenv("KEY_CACHE_FILE")
+        fingerprint = hmac.new(
+            password,
+            salt + str(KEY_DERIVATION_ITERATIONS).encode(),
+            hashlib.sha256,
+        ).hexdigest()
+
+        if cache_path:
+            cached = _read_key_cache(cache_path, fingerprint)
+            if cached:
+                return cached
+
+        kdf = PBKDF2HMAC(
+            algorithm=hashes.SHA256(),
+            length=32,
+            salt=salt,
+            iterations=KEY_DERIVATION_ITERATIONS,
+        )
+        key = base64.urlsafe_b64encode(kdf.derive(password))
+
+        if cache_path:
+            _write_key_cache(cache_path, fingerprint, key)
+        return key
+
+    @staticmethod
+    def _derive_storage_key(fernet_key: bytes) -> bytes:
+        """Derive the AES-256-GCM key for binary storage from a Fernet key."""
+        return HKDF(
+            algorithm=hashes.SHA256(),
+            length=32,
+            salt=None,
+            info=b"ciphertext-storage-v1",
+        ).derive(base64.urlsafe_b64decode(fernet_key))
 
     def _get_salt(self) -> str:
         """Get or generate cryptographically secure salt."""
@@ -71,14 +318,56 @@ class SecurityManager:
             logger.warning("Please set SALT_KEY in your .env file")
         return salt
 
+    def _derive_id_hash_key(self) -> bytes:
+        """Derive a dedicated ID hashing key so it never collides with lookup keys."""
+        return hmac.new(
+            self._pepper.encode(),
+            b"discord-id-hash",
+            hashlib.sha256,
+        ).digest()
+
+    def _get_id_hasher(self) -> HMACIDHasher | Blake2bIDHasher:
+        """Build the ID hasher selected by ID_HASH_ALGORITHM."""
+        algorithm = os.getenv("ID_HASH_ALGORITHM", "hmac-sha256").lower()
+        if algorithm not in ID_HASH_ALGORITHMS:
+            raise ValueError(
+                f"Invalid ID_HASH_ALGORITHM: {algorithm}. "
+                f"Must be one of {set(ID_HASH_ALGORITHMS)}",
+            )
+
+        if ID_HASH_ALGORITHMS[algorithm] == HASH_SCHEME_BLAKE2B:
+            return Blake2bIDHasher(self._id_hash_key)
+        return HMACIDHasher(self._id_hash_key)
+
+    @staticmethod
+    def _get_id_hash_cache_size() -> int:
+        """Get the size of the in-memory ID hash memo."""
+        return int(os.getenv("ID_HASH_CACHE_SIZE", str(DEFAULT_ID_HASH_CACHE_SIZE)))
+
+    @property
+    def hash_scheme(self) -> int:
+        """Scheme version recorded on rows hashed by this manager."""
+        return self._id_hasher.scheme
+
     def hash_discord_id(self, discord_id: str) -> str:
-        """Hash a Discord ID with salt and pepper for maximum privacy."""
-        from argon2 import PasswordHasher
+        """Hash a Discord ID with a deterministic keyed hash.
+
+        The same ID always produces the same digest, so hashes can be used
+        in equality filters and indexes.
+        """
+        return self._hash_id_cached(str(discord_id))
 
-        ph = PasswordHasher()
-        # Combine ID with pepper (salt is handled by Argon2)
-        combined = f"{discord_id}{self._pepper}"
-        return ph.hash(combined)
+    def verify_discord_id(self, discord_id: str, digest: str, scheme: int) -> bool:
+        """Check whether a stored digest was produced from this Discord ID."""
+        if scheme == self.hash_scheme:
+            return secrets.compare_digest(self.hash_discord_id(discord_id), digest)
+        if scheme == HASH_SCHEME_ARGON2:
+            return Argon2IDHasher(self._pepper).verify(discord_id, digest)
+        if scheme == HASH_SCHEME_BLAKE2B:
+            return Blake2bIDHasher(self._id_hash_key).verify(discord_id, digest)
+        if scheme == HASH_SCHEME_HMAC_SHA256:
+            return HMACIDHasher(self._id_hash_key).verify(discord_id, digest)
+        raise ValueError(f"Unknown hash scheme: {scheme}")
 
     def _get_pepper(self) -> str:
         """Get or generate pepper (server-side secret for additional security)."""
@@ -91,7 +380,11 @@ class SecurityManager:
         return pepper
 
     def encrypt_text(self, text: str) -> str:
-        """Encrypt sensitive text data with authenticated encryption."""
+        """Encrypt text into the legacy base64 Fernet format.
+
+        New rows are stored with encrypt_to_bytes; this is kept for callers
+        that need a text-safe ciphertext.
+        """
         if not text:
             return ""
         try:
@@ -102,24 +395,172 @@ class SecurityManager:
             logger.exception("Encryption failed")
             raise ValueError("Failed to encrypt data") from e
 
-    def decrypt_text(self, encrypted_text: str) -> str:
-        """Decrypt sensitive text data with integrity verification."""
+    def encrypt_to_bytes(self, text: str) -> bytes:
+        """Encrypt text into the compact binary storage format."""
+        if not text:
+            return b""
+        try:
+            return self._encrypt(text)
+        except Exception as e:
+            logger.exception("Encryption failed")
+            raise ValueError("Failed to encrypt data") from e
+
+    def decrypt_text(self, encrypted_text: str | bytes) -> str:
+        """Decrypt a binary or legacy text ciphertext with integrity verification."""
         if not encrypted_text:
             return ""
         try:
-            encrypted_bytes = base64.urlsafe_b64decode(encrypted_text.encode("ascii"))
-            decrypted_bytes = self._cipher.decrypt(encrypted_bytes)
-            return decrypted_bytes.decode("utf-8")
+            return self._decrypt(encrypted_text)
         except Exception as e:
             logger.exception("Decryption failed")
             # Don't return partial data on failure
             raise ValueError("Failed to decrypt data - data may be corrupted") from e
 
+    @staticmethod
+    def is_legacy_ciphertext(value: str | bytes | None) -> bool:
+        """Check whether a stored value still uses the base64 Fernet format."""
+        if not value:
+            return False
+        return isinstance(value, str) or value[0] not in (
+            CIPHERTEXT_FORMAT_V1,
+            CIPHERTEXT_FORMAT_V2,
+        )
+
+    def ciphertext_key_id(self, value: str | bytes | None) -> int | None:
+        """Get the key ID a stored value is tagged with (None if untagged)."""
+        if not value or self.is_legacy_ciphertext(value):
+            return None
+        if value[0] == CIPHERTEXT_FORMAT_V2:
+            return value[1]
+        return None
+
+    def needs_reencryption(self, value: str | bytes | None) -> bool:
+        """Check whether a value is not in the current format under the primary key."""
+        if not value:
+            return False
+        return self.ciphertext_key_id(value) != self._primary_key_id
+
+    def _encrypt(self, text: str) -> bytes:
+        """Encrypt without logging, raising on failure."""
+        header = bytes([CIPHERTEXT_FORMAT_V2, self._primary_key_id])
+        nonce = os.urandom(NONCE_SIZE)
+        # The header is authenticated so the version and key ID cannot be swapped
+        return (
+            header
+            + nonce
+            + self._aeads[self._primary_key_id].encrypt(
+                nonce,
+                text.encode("utf-8"),
+                header,
+            )
+        )
+
+    def _decrypt(self, encrypted: str | bytes) -> str:
+        """Decrypt without logging, raising on failure."""
+        if self.is_legacy_ciphertext(encrypted):
+            if not isinstance(encrypted, str):
+                # Legacy text converted in place to a binary column
+                encrypted = bytes(encrypted).decode("ascii")
+            encrypted_bytes = base64.urlsafe_b64decode(encrypted.encode("ascii"))
+            return self._cipher.decrypt(encrypted_bytes).decode("utf-8")
+
+        encrypted = bytes(encrypted)
+        if encrypted[0] == CIPHERTEXT_FORMAT_V2:
+            header, body = encrypted[:2], encrypted[2:]
+            aead = self._aeads.get(encrypted[1])
+            if aead is None:
+                raise ValueError(f"Unknown encryption key ID: {encrypted[1]}")
+            return aead.decrypt(body[:NONCE_SIZE], body[NONCE_SIZE:], header).decode(
+                "utf-8",
+            )
+
+        # v1 ciphertexts carry no key ID, so try every key (primary first)
+        header, body = encrypted[:1], encrypted[1:]
+        for key_id, _key in self._keys_primary_first():
+            with contextlib.suppress(InvalidTag):
+                return (
+                    self._aeads[key_id]
+                    .decrypt(body[:NONCE_SIZE], body[NONCE_SIZE:], header)
+                    .decode("utf-8")
+                )
+        raise InvalidTag
+
+    def encrypt_many(
+        self,
+        texts: Iterable[str | None],
+        default: bytes | None = None,
+    ) -> list[bytes | None]:
+        """Encrypt a batch of texts, continuing past per-item failures.
+
+        Empty texts map to b"" like encrypt_to_bytes; items that fail to
+        encrypt map to ``default``.
+        """
+        results: list[bytes | None] = []
+        failures = 0
+        for text in texts:
+            if not text:
+                results.append(b"")
+                continue
+            try:
+                results.append(self._encrypt(text))
+            except Exception:
+                failures += 1
+                results.append(default)
+
+        if failures:
+            logger.error("Encryption failed for %s/%s items", failures, len(results))
+        return results
+
+    def decrypt_many(
+        self,
+        encrypted_texts: Iterable[str | bytes | None],
+        default: str | None = None,
+    ) -> list[str | None]:
+        """Decrypt a batch of ciphertexts, continuing past per-item failures.
+
+        Binary and legacy text ciphertexts may be mixed. Empty ciphertexts map
+        to "" like decrypt_text; items that fail integrity verification map to
+        ``default`` rather than aborting the batch.
+        """
+        results: list[str | None] = []
+        failures = 0
+        for encrypted_text in encrypted_texts:
+            if not encrypted_text:
+                results.append("")
+                continue
+            try:
+                results.append(self._decrypt(encrypted_text))
+            except Exception:
+                failures += 1
+                results.append(default)
+
+        if failures:
+            logger.error("Decryption failed for %s/%s items", failures, len(results))
+        return results
+
+    async def encrypt_many_async(
+        self,
+        texts: Iterable[str | None],
+        default: bytes | None = None,
+    ) -> list[bytes | None]:
+        """Encrypt a batch in a worker thread to keep the event loop free."""
+        return await asyncio.to_thread(self.encrypt_many, list(texts), default)
+
+    async def decrypt_many_async(
+        self,
+        encrypted_texts: Iterable[str | bytes | None],
+        default: str | None = None,
+    ) -> list[str | None]:
+        """Decrypt a batch in a worker thread to keep the event loop free."""
+        return await asyncio.to_thread(
+            self.decrypt_many,
+            list(encrypted_texts),
+            default,
+        )
+
     def create_lookup_key(self, guild_id: str, user_id: str) -> str:
         """Create a unique lookup key for guild+user combination."""
         # Use HMAC for lookup keys to prevent length extension attacks
-        import hmac
-
         combined = f"{guild_id}:{user_id}"
         lookup_hash = hmac.new(
             self._pepper.encode(),
@@ -134,11 +575,44 @@ class SecurityManager:
 
     def anonymize_for_logs(self, discord_id: str) -> str:
         """Create a consistent but anonymous ID for logging purposes."""
+        return self._anonymize_cached(str(discord_id))
+
+    def anonymized(self, discord_id: str) -> AnonymizedId:
+        """Wrap an ID for lazy anonymization in log arguments."""
+        return AnonymizedId(self, discord_id)
+
+    def _anonymize(self, discord_id: str) -> str:
+        """Compute the anonymized log ID (uncached)."""
         # Different from main hash to prevent correlation
         log_salt = "logging_salt_" + self._salt
         combined = f"{discord_id}{log_salt}"
         return hashlib.sha256(combined.encode()).hexdigest()[:16]
 
 
-# Global security manager instance
-security_manager = SecurityManager()
+_security_manager: SecurityManager | None = None
+_security_manager_lock = threading.Lock()
+
+
+def get_security_manager() -> SecurityManager:
+    """Return the global security manager, constructing it on first use."""
+    global _security_manager
+    if _security_manager is None:
+        with _security_manager_lock:
+            if _security_manager is None:
+                _security_manager = SecurityManager()
+    return _security_manager
+
+
+class _LazySecurityManager:
+    """Proxy for the global security manager.
+
+    Importing this module (and so the models, services and cogs) must not pay
+    for key derivation; the manager is built on the first attribute access.
+    """
+
+    def __getattr__(self, name: str):
+        return getattr(get_security_manager(), name)
+
+
+# Global security manager instance, constructed lazily
+security_manager = _LazySecurityManager()
@@ -1,19 +1,994 @@
 """Database services for warning and moderation management."""
 
+import base64
+import gzip
+import json
 import logging
+import os
+import tempfile
+from collections import Counter
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass
 from datetime import UTC, datetime
-from typing import Any
+from functools import partial
+from pathlib import Path
+from typing import Any, TypeVar
 
-from sqlalchemy import and_, desc
+from sqlalchemy import and_, desc, insert, select, tuple_, update
 from sqlalchemy.exc import SQLAlchemyError
-
-from .connection import get_db_session
-from .models import GDPRRequest, ModerationLog, SecureWarning
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.orm import Session
+
+from .audit_queue import audit_queue
+from .cache import invalidate_reasons, invalidate_summaries, summary_cache
+from .connection import get_async_session_factory
+from .executor import run_db
+from .models import (
+    GDPRRequest,
+    ModerationLog,
+    ModerationRollup,
+    SecureWarning,
+    WarningCounter,
+)
+from .partitions import update_logs
 from .security import security_manager
+from .unit_of_work import (
+    commit,
+    current_async_unit_of_work,
+    has_pending_writes,
+    rollback,
+    run_in_session,
+    session_scope,
+)
 
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
+# Rows fetched and decrypted per batch by the streaming GDPR export
+EXPORT_BATCH_SIZE = 1000
+
+# Warning history page sizes; embeds are limited to 25 fields
+DEFAULT_PAGE_SIZE = 10
+MAX_PAGE_SIZE = 25
+
+
+@dataclass
+class WarningPage:
+    """One page of a member's warning history."""
+
+    warnings: list[SecureWarning]
+    next_cursor: str | None = None
+
+
+@dataclass(frozen=True)
+class WarningSummary:
+    """IDs and creation times of a member's active warnings, newest first."""
+
+    warning_ids: tuple[int, ...]
+    created_at: tuple[datetime, ...]
+
+    @property
+    def count(self) -> int:
+        """Number of active warnings."""
+        return len(self.warning_ids)
+
+
+def encode_cursor(created_at: datetime, warning_id: int) -> str:
+    """Encode the (created_at, id) keyset position after a page."""
+    raw = f"{created_at.isoformat()}|{warning_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """Decode a cursor produced by encode_cursor."""
+    try:
+        created_at, warning_id = (
+            base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        )
+        return datetime.fromisoformat(created_at), int(warning_id)
+    except ValueError:
+        raise ValueError("Invalid pagination cursor") from None
+
+
+def _write_audit_logs(db: Session, rows: list[dict[str, Any]]) -> None:
+    """Insert audit rows and count them in the analytics rollups.
+
+    With the write-behind queue enabled (AUDIT_QUEUE_ENABLED=true) the rows
+    are instead queued once the transaction commits and written in batches.
+    """
+    if audit_queue is None:
+        db.execute(insert(ModerationLog.__table__), rows)
+        ModerationRollup.record(db, rows)
+    else:
+        audit_queue.defer(db, rows)
+
+
+# Operations shared by WarningService and AsyncWarningService. Each one runs
+# inside the session it is given: a plain Session, or the sync facade of an
+# AsyncSession through run_sync.
+
+
+def _add_warning(
+    db: Session,
+    guild_id: str,
+    user_id: str,
+    moderator_id: str,
+    reason: str,
+) -> SecureWarning:
+    """Add a new warning to the database."""
+    warning, _active_count = _add_warning_with_count(
+        db,
+        guild_id,
+        user_id,
+        moderator_id,
+        reason,
+    )
+    return warning
+
+
+def _add_warning_with_count(
+    db: Session,
+    guild_id: str,
+    user_id: str,
+    moderator_id: str,
+    reason: str,
+) -> tuple[SecureWarning, int]:
+    """Add a warning and its audit log in one transaction and count active warnings."""
+    try:
+        # Create warning
+        warning = SecureWarning.create_warning(
+            guild_id=guild_id,
+            user_id=user_id,
+            moderator_id=moderator_id,
+            reason=reason,
+        )
+
+        db.add(warning)
+        db.flush()
+
+        # Create audit log
+        _write_audit_logs(
+            db,
+            ModerationLog.bulk_values(
+                guild_id=guild_id,
+                user_id=user_id,
+                moderator_id=moderator_id,
+                action_type="warn",
+                warning_ids=[warning.id],
+                reason=reason,
+            ),
+        )
+
+        # Counted inside the same transaction, so it includes this warning
+        active_count = WarningCounter.adjust(db, warning.lookup_key, 1)
+
+        # SQLite may reuse IDs of hard-deleted rows
+        commit(
+            db,
+            partial(invalidate_reasons, [warning.id]),
+            partial(invalidate_summaries, [warning.lookup_key]),
+        )
+
+        logger.info("Warning %s added successfully", warning.id)
+        return warning, active_count
+
+    except Exception:
+        rollback(db)
+        logger.exception("Failed to add warning")
+        raise
+
+
+def _get_user_warnings(
+    db: Session,
+    guild_id: str,
+    user_id: str,
+    include_deleted: bool = False,
+) -> list[SecureWarning]:
+    """Get all warnings for a user in a specific guild."""
+    try:
+        guild_hash = security_manager.hash_discord_id(guild_id)
+        user_hash = security_manager.hash_discord_id(user_id)
+
+        query = db.query(SecureWarning).filter(
+            and_(
+                SecureWarning.guild_id_hash == guild_hash,
+                SecureWarning.user_id_hash == user_hash,
+            ),
+        )
+
+        if not include_deleted:
+            query = query.filter(SecureWarning.is_deleted.is_(False))
+
+        warnings = query.order_by(desc(SecureWarning.created_at)).all()
+
+        logger.info(
+            "Retrieved %s warnings for user %s",
+            len(warnings),
+            security_manager.anonymized(user_id),
+        )
+        return warnings
+
+    except Exception:
+        logger.exception("Failed to get user warnings")
+        raise
+
+
+def _get_user_warnings_page(
+    db: Session,
+    guild_id: str,
+    user_id: str,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: str | None = None,
+    include_deleted: bool = False,
+) -> WarningPage:
+    """Get one page of a user's warnings, newest first."""
+    if not 0 < limit <= MAX_PAGE_SIZE:
+        raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+    try:
+        guild_hash = security_manager.hash_discord_id(guild_id)
+        user_hash = security_manager.hash_discord_id(user_id)
+
+        query = select(SecureWarning).where(
+            SecureWarning.guild_id_hash == guild_hash,
+            SecureWarning.user_id_hash == user_hash,
+        )
+        if not include_deleted:
+            query = query.where(SecureWarning.is_deleted.is_(False))
+        if cursor is not None:
+            query = query.where(
+                tuple_(SecureWarning.created_at, SecureWarning.id)
+                < decode_cursor(cursor),
+            )
+
+        # One extra row tells whether another page follows
+        warnings = list(
+            db.scalars(
+                query.order_by(
+                    SecureWarning.created_at.desc(),
+                    SecureWarning.id.desc(),
+                ).limit(limit + 1),
+            ),
+        )
+        next_cursor = None
+        if len(warnings) > limit:
+            warnings = warnings[:limit]
+            next_cursor = encode_cursor(warnings[-1].created_at, warnings[-1].id)
+
+        logger.debug(
+            "Retrieved page of %s warnings for user %s",
+            len(warnings),
+            security_manager.anonymized(user_id),
+        )
+        return WarningPage(warnings=warnings, next_cursor=next_cursor)
+
+    except Exception:
+        logger.exception("Failed to get user warnings page")
+        raise
+
+
+def _get_warning_count(
+    db: Session,
+    guild_id: str,
+    user_id: str,
+) -> int:
+    """Get the count of active warnings for a user."""
+    try:
+        if summary_cache is not None:
+            return _get_warning_summary(db, guild_id, user_id).count
+        lookup_key = security_manager.create_lookup_key(guild_id, user_id)
+        return WarningCounter.get_count(db, lookup_key)
+    except Exception:
+        logger.exception("Failed to get warning count")
+        raise
+
+
+def _cached_summary(guild_id: str, user_id: str) -> WarningSummary | None:
+    """Return a member's cached summary without touching the database."""
+    if summary_cache is None:
+        return None
+    return summary_cache.get(security_manager.create_lookup_key(guild_id, user_id))
+
+
+def _get_warning_summary(
+    db: Session,
+    guild_id: str,
+    user_id: str,
+) -> WarningSummary:
+    """Get a member's active warning summary, through the summary cache."""
+    # A unit of work with uncommitted writes must see its own changes
+    if not has_pending_writes(db):
+        cached = _cached_summary(guild_id, user_id)
+        if cached is not None:
+            return cached
+    return _load_warning_summary(db, guild_id, user_id)
+
+
+def _load_warning_summary(
+    db: Session,
+    guild_id: str,
+    user_id: str,
+) -> WarningSummary:
+    """Read a member's active warning summary and cache it."""
+    generation = summary_cache.generation if summary_cache is not None else 0
+
+    # Index-only scan of the partial idx_active_guild_user
+    rows = db.execute(
+        select(SecureWarning.id, SecureWarning.created_at)
+        .where(
+            SecureWarning.guild_id_hash == security_manager.hash_discord_id(guild_id),
+            SecureWarning.user_id_hash == security_manager.hash_discord_id(user_id),
+            SecureWarning.is_deleted.is_(False),
+        )
+        .order_by(desc(SecureWarning.created_at), desc(SecureWarning.id)),
+    ).all()
+    summary = WarningSummary(
+        warning_ids=tuple(row.id for row in rows),
+        created_at=tuple(row.created_at for row in rows),
+    )
+
+    # Uncommitted state of a unit of work is never shared through the cache
+    if summary_cache is not None and not has_pending_writes(db):
+        summary_cache.put(
+            security_manager.create_lookup_key(guild_id, user_id),
+            summary,
+            generation,
+        )
+    return summary
+
+
+def _delete_warning(
+    db: Session,
+    warning_id: int,
+    guild_id: str,
+    moderator_id: str,
+) -> bool:
+    """Soft delete a warning with proper authorization checks."""
+    try:
+        guild_hash = security_manager.hash_discord_id(guild_id)
+
+        # Get warning with guild verification and optimistic locking
+        warning = (
+            db.query(SecureWarning)
+            .filter(
+                and_(
+                    SecureWarning.id == warning_id,
+                    SecureWarning.guild_id_hash == guild_hash,
+                    SecureWarning.is_deleted.is_(False),
+                ),
+            )
+            .with_for_update()  # Optimistic locking
+            .first()
+        )
+
+        if not warning:
+            logger.warning(
+                "Warning %s not found or not authorized for guild %s",
+                warning_id,
+                security_manager.anonymized(guild_id),
+            )
+            return False
+
+        # Store original version for optimistic locking check
+        original_version = warning.version
+
+        # Soft delete the warning
+        warning.soft_delete()
+        db.flush()
+        WarningCounter.adjust(db, warning.lookup_key, -1)
+
+        # Create audit log for deletion
+        _write_audit_logs(
+            db,
+            ModerationLog.bulk_values(
+                guild_id=guild_id,
+                user_id="unknown",  # We don't have user_id from warning directly
+                moderator_id=moderator_id,
+                action_type="warning_deleted",
+                warning_ids=[warning_id],
+                reason=f"Warning {warning_id} deleted",
+                context=(
+                    f"Original warning ID: {warning_id}, version: {original_version}"
+                ),
+            ),
+        )
+        commit(
+            db,
+            partial(invalidate_reasons, [warning_id]),
+            partial(invalidate_summaries, [warning.lookup_key]),
+        )
+
+        logger.info(
+            "Warning %s deleted by moderator %s in guild %s",
+            warning_id,
+            security_manager.anonymized(moderator_id),
+            security_manager.anonymized(guild_id),
+        )
+        return True
+
+    except SQLAlchemyError as e:
+        rollback(db)
+        # Check if it's a concurrency issue
+        if "version" in str(e).lower() or "concurrent" in str(e).lower():
+            logger.warning(
+                "Warning %s was modified by another process - "
+                "concurrent modification detected",
+                warning_id,
+            )
+        else:
+            logger.exception(
+                "Database error while deleting warning %s",
+                warning_id,
+            )
+        return False
+    except Exception:
+        rollback(db)
+        logger.exception("Failed to delete warning %s", warning_id)
+        return False
+
+
+def _get_warning_by_id(
+    db: Session,
+    warning_id: int,
+    guild_id: str,
+) -> SecureWarning | None:
+    """Get a specific warning by ID with guild authorization."""
+    try:
+        guild_hash = security_manager.hash_discord_id(guild_id)
+
+        warning = (
+            db.query(SecureWarning)
+            .filter(
+                and_(
+                    SecureWarning.id == warning_id,
+                    SecureWarning.guild_id_hash == guild_hash,
+                    SecureWarning.is_deleted.is_(False),
+                ),
+            )
+            .first()
+        )
+
+        if warning:
+            logger.debug("Retrieved warning %s", warning_id)
+        else:
+            logger.warning(
+                "Warning %s not found or not authorized for guild %s",
+                warning_id,
+                security_manager.anonymized(guild_id),
+            )
+
+        return warning
+
+    except Exception:
+        logger.exception("Failed to get warning %s", warning_id)
+        return None
+
+
+def _bulk_delete_warnings(
+    db: Session,
+    warning_ids: list[int],
+    guild_id: str,
+    moderator_id: str,
+) -> dict[str, Any]:
+    """Bulk soft delete warnings with authorization and concurrency handling."""
+    results = {
+        "total_requested": len(warning_ids),
+        "deleted": 0,
+        "failed": 0,
+        "not_found": 0,
+        "errors": [],
+    }
+
+    try:
+        guild_hash = security_manager.hash_discord_id(guild_id)
+        now = datetime.now(UTC)
+
+        # Soft delete every matching warning in one statement; rows of other
+        # guilds or already deleted ones are simply not matched
+        deleted = db.execute(
+            update(SecureWarning)
+            .where(
+                SecureWarning.id.in_(warning_ids),
+                SecureWarning.guild_id_hash == guild_hash,
+                SecureWarning.is_deleted.is_(False),
+            )
+            .values(
+                is_deleted=True,
+                deleted_at=now,
+                updated_at=now,
+                version=SecureWarning.version + 1,
+            )
+            .returning(SecureWarning.id, SecureWarning.lookup_key)
+            .execution_options(synchronize_session=False),
+        ).all()
+
+        deleted_ids = [row.id for row in deleted]
+        results["deleted"] = len(deleted_ids)
+        results["not_found"] = len(warning_ids) - len(deleted_ids)
+
+        if deleted_ids:
+            # One executemany insert for all audit rows
+            _write_audit_logs(
+                db,
+                ModerationLog.bulk_values(
+                    guild_id=guild_id,
+                    user_id="unknown",
+                    moderator_id=moderator_id,
+                    action_type="warning_deleted",
+                    warning_ids=deleted_ids,
+                    reason="Bulk deletion of warning",
+                    context=f"Bulk operation on {len(deleted_ids)} warnings",
+                ),
+            )
+            WarningCounter.adjust_many(
+                db,
+                {
+                    lookup_key: -count
+                    for lookup_key, count in Counter(
+                        row.lookup_key for row in deleted
+                    ).items()
+                },
+            )
+
+        commit(
+            db,
+            partial(invalidate_reasons, deleted_ids),
+            partial(invalidate_summaries, {row.lookup_key for row in deleted}),
+        )
+
+        logger.info(
+            "Bulk deletion completed by moderator %s in guild %s: "
+            "%s deleted, %s failed, %s not found",
+            security_manager.anonymized(moderator_id),
+            security_manager.anonymized(guild_id),
+            results["deleted"],
+            results["failed"],
+            results["not_found"],
+        )
+
+        return results
+
+    except Exception as e:
+        rollback(db)
+        logger.exception("Bulk delete operation failed")
+        results["deleted"] = 0
+        results["not_found"] = 0
+        results["errors"].append(f"Bulk operation failed: {e!s}")
+        return results
+
+
+def _clear_user_warnings(
+    db: Session,
+    guild_id: str,
+    user_id: str,
+    moderator_id: str,
+) -> int:
+    """Soft delete all active warnings of a user in one statement."""
+    try:
+        lookup_key = security_manager.create_lookup_key(guild_id, user_id)
+        now = datetime.now(UTC)
+
+        cleared_ids = db.scalars(
+            update(SecureWarning)
+            .where(
+                SecureWarning.lookup_key == lookup_key,
+                SecureWarning.guild_id_hash
+                == security_manager.hash_discord_id(guild_id),
+                SecureWarning.user_id_hash == security_manager.hash_discord_id(user_id),
+                SecureWarning.is_deleted.is_(False),
+            )
+            .values(
+                is_deleted=True,
+                deleted_at=now,
+                updated_at=now,
+                version=SecureWarning.version + 1,
+            )
+            .returning(SecureWarning.id)
+            .execution_options(synchronize_session=False),
+        ).all()
+
+        if cleared_ids:
+            # One audit entry summarizes the whole clear
+            _write_audit_logs(
+                db,
+                ModerationLog.bulk_values(
+                    guild_id=guild_id,
+                    user_id=user_id,
+                    moderator_id=moderator_id,
+                    action_type="warning_deleted",
+                    warning_ids=[None],
+                    reason=f"Cleared {len(cleared_ids)} warnings",
+                    context=f"Cleared warning IDs: {sorted(cleared_ids)}",
+                ),
+            )
+            WarningCounter.adjust(db, lookup_key, -len(cleared_ids))
+
+        commit(
+            db,
+            partial(invalidate_reasons, cleared_ids),
+            partial(invalidate_summaries, [lookup_key]),
+        )
+
+        logger.info(
+            "Cleared %s warnings for user %s in guild %s",
+            len(cleared_ids),
+            security_manager.anonymized(user_id),
+            security_manager.anonymized(guild_id),
+        )
+        return len(cleared_ids)
+
+    except Exception:
+        rollback(db)
+        logger.exception("Failed to clear user warnings")
+        raise
+
+
+def _warning_export_record(warning: SecureWarning, reason: str) -> dict[str, Any]:
+    """Build the export entry of a warning; deleted reasons are not exported."""
+    record = warning.to_dict(include_sensitive=False)
+    if not warning.is_deleted:
+        record["reason"] = reason
+    return record
+
+
+def _log_export_record(
+    log: ModerationLog,
+    reason: str,
+    context: str,
+) -> dict[str, Any]:
+    """Build the export entry of a moderation log."""
+    return {
+        "id": log.id,
+        "action_type": log.action_type,
+        "reason": reason,
+        "context": context,
+        "created_at": log.created_at.isoformat(),
+    }
+
+
+def _export_user_data(
+    db: Session,
+    user_id: str,
+    guild_id: str,
+) -> dict[str, Any]:
+    """Export all data for a user in a specific guild (GDPR compliance)."""
+    try:
+        user_hash = security_manager.hash_discord_id(user_id)
+        guild_hash = security_manager.hash_discord_id(guild_id)
+
+        # Get warnings for this guild only
+        warnings = (
+            db.query(SecureWarning)
+            .filter(
+                and_(
+                    SecureWarning.user_id_hash == user_hash,
+                    SecureWarning.guild_id_hash == guild_hash,
+                ),
+            )
+            .all()
+        )
+
+        # Get moderation logs for this guild only
+        logs = (
+            db.query(ModerationLog)
+            .filter(
+                and_(
+                    ModerationLog.user_id_hash == user_hash,
+                    ModerationLog.guild_id_hash == guild_hash,
+                ),
+            )
+            .all()
+        )
+
+        # Decrypt every field in one batch per table
+        export_data = {
+            "user_id_hash": user_hash,
+            "guild_id_hash": guild_hash,
+            "export_date": datetime.now(UTC).isoformat(),
+            "warnings": [
+                _warning_export_record(warning, reason)
+                for warning, reason in zip(
+                    warnings,
+                    SecureWarning.decrypt_reasons(warnings),
+                    strict=True,
+                )
+            ],
+            "moderation_logs": [
+                _log_export_record(log, reason, context)
+                for log, (reason, context) in zip(
+                    logs,
+                    ModerationLog.decrypt_fields(logs),
+                    strict=True,
+                )
+            ],
+        }
+
+        # Create GDPR request record
+        gdpr_request = GDPRRequest.create_request(user_id, "export")
+        gdpr_request.status = "completed"
+        gdpr_request.completed_at = datetime.now(UTC)
+        db.add(gdpr_request)
+        commit(db)
+
+        logger.info(
+            "Data exported for user %s in guild %s",
+            security_manager.anonymized(user_id),
+            security_manager.anonymized(guild_id),
+        )
+        return export_data
+
+    except Exception:
+        logger.exception("Failed to export user data")
+        raise
+
+
+def _export_user_data_to_file(
+    db: Session,
+    user_id: str,
+    guild_id: str,
+    batch_size: int = EXPORT_BATCH_SIZE,
+) -> Path:
+    """Stream a user's data in a guild to a gzip-compressed NDJSON file."""
+    user_hash = security_manager.hash_discord_id(user_id)
+    guild_hash = security_manager.hash_discord_id(guild_id)
+    fd, name = tempfile.mkstemp(prefix="gdpr-export-", suffix=".ndjson.gz")
+    path = Path(name)
+
+    try:
+        with (
+            os.fdopen(fd, "wb") as raw,
+            gzip.open(raw, "wt", encoding="utf-8") as out,
+        ):
+
+            def write(record_type: str, record: dict[str, Any]) -> None:
+                out.write(json.dumps({"type": record_type, **record}) + "\n")
+
+            write(
+                "export",
+                {
+                    "user_id_hash": user_hash,
+                    "guild_id_hash": guild_hash,
+                    "export_date": datetime.now(UTC).isoformat(),
+                },
+            )
+
+            # yield_per streams rows in batches; each batch is decrypted and
+            # written before the next is fetched, so memory stays bounded
+            warnings = db.scalars(
+                select(SecureWarning)
+                .where(
+                    SecureWarning.user_id_hash == user_hash,
+                    SecureWarning.guild_id_hash == guild_hash,
+                )
+                .order_by(SecureWarning.id)
+                .execution_options(yield_per=batch_size),
+            )
+            for batch in warnings.partitions():
+                for warning, reason in zip(
+                    batch,
+                    SecureWarning.decrypt_reasons(batch),
+                    strict=True,
+                ):
+                    write("warning", _warning_export_record(warning, reason))
+
+            logs = db.scalars(
+                select(ModerationLog)
+                .where(
+                    ModerationLog.user_id_hash == user_hash,
+                    ModerationLog.guild_id_hash == guild_hash,
+                )
+                .order_by(ModerationLog.id)
+                .execution_options(yield_per=batch_size),
+            )
+            for batch in logs.partitions():
+                for log, (reason, context) in zip(
+                    batch,
+                    ModerationLog.decrypt_fields(batch),
+                    strict=True,
+                ):
+                    write("moderation_log", _log_export_record(log, reason, context))
+
+        # Create GDPR request record
+        gdpr_request = GDPRRequest.create_request(user_id, "export")
+        gdpr_request.status = "completed"
+        gdpr_request.completed_at = datetime.now(UTC)
+        db.add(gdpr_request)
+        commit(db)
+
+        logger.info(
+            "Data exported to file for user %s in guild %s",
+            security_manager.anonymized(user_id),
+            security_manager.anonymized(guild_id),
+        )
+        return path
+
+    except Exception:
+        rollback(db)
+        path.unlink(missing_ok=True)
+        logger.exception("Failed to export user data to file")
+        raise
+
+
+def _delete_user_data(
+    db: Session,
+    user_id: str,
+    guild_id: str,
+) -> bool:
+    """Delete all data for a user in a specific guild (GDPR right to be forgotten)."""
+    try:
+        user_hash = security_manager.hash_discord_id(user_id)
+        guild_hash = security_manager.hash_discord_id(guild_id)
+
+        # Soft delete warnings for this guild only
+        warnings = (
+            db.query(SecureWarning)
+            .filter(
+                and_(
+                    SecureWarning.user_id_hash == user_hash,
+                    SecureWarning.guild_id_hash == guild_hash,
+                    SecureWarning.is_deleted.is_(False),
+                ),
+            )
+            .with_for_update()  # Prevent concurrent modifications
+            .all()
+        )
+
+        deleted_count = 0
+        for warning in warnings:
+            warning.soft_delete()
+            deleted_count += 1
+        if deleted_count:
+            db.flush()
+            WarningCounter.adjust(
+                db,
+                security_manager.create_lookup_key(guild_id, user_id),
+                -deleted_count,
+            )
+
+        # Note: We keep moderation logs for audit purposes but could anonymize them further
+        # In a real implementation, you might want to anonymize rather than delete logs
+
+        # Create GDPR request record
+        gdpr_request = GDPRRequest.create_request(user_id, "delete")
+        gdpr_request.status = "completed"
+        gdpr_request.completed_at = datetime.now(UTC)
+        db.add(gdpr_request)
+
+        commit(
+            db,
+            partial(invalidate_reasons, [warning.id for warning in warnings]),
+            partial(
+                invalidate_summaries,
+                [security_manager.create_lookup_key(guild_id, user_id)],
+            ),
+        )
+
+        logger.info(
+            "Data deleted for user %s in guild %s (%s warnings deleted)",
+            security_manager.anonymized(user_id),
+            security_manager.anonymized(guild_id),
+            deleted_count,
+        )
+        return True
+
+    except Exception:
+        rollback(db)
+        logger.exception("Failed to delete user data")
+        return False
+
+
+def _rekey_id_hash(
+    digest: str,
+    scheme: int,
+    candidates: Iterable[str],
+) -> str | None:
+    """Current-scheme hash of the candidate ID that produced ``digest``.
+
+    Returns:
+        The new digest, or None if no candidate verifies against ``digest``
+    """
+    for candidate in candidates:
+        if security_manager.verify_discord_id(candidate, digest, scheme):
+            return security_manager.hash_discord_id(candidate)
+    return None
+
+
+def _rekey_legacy_hashes(
+    db: Session,
+    guild_id: str,
+    user_id: str,
+    moderator_ids: Iterable[str] = (),
+) -> int:
+    """Re-key a member's rows that were hashed with an older ID hash scheme."""
+    try:
+        current_scheme = security_manager.hash_scheme
+        lookup_key = security_manager.create_lookup_key(guild_id, user_id)
+        moderator_ids = [str(moderator_id) for moderator_id in moderator_ids]
+
+        legacy_warnings = (
+            db.query(SecureWarning)
+            .filter(
+                and_(
+                    SecureWarning.lookup_key == lookup_key,
+                    SecureWarning.hash_scheme != current_scheme,
+                ),
+            )
+            .all()
+        )
+
+        rekeyed = 0
+        log_updates = []
+        rekeyed_logs = []
+        for warning in legacy_warnings:
+            old_scheme = warning.hash_scheme
+            guild_hash = _rekey_id_hash(warning.guild_id_hash, old_scheme, [guild_id])
+            user_hash = _rekey_id_hash(warning.user_id_hash, old_scheme, [user_id])
+            if guild_hash is None or user_hash is None:
+                # Lookup key collision, not this member's row
+                continue
+
+            # A row takes the new scheme only once all of its hashes have it
+            moderator_hash = _rekey_id_hash(
+                warning.moderator_id_hash,
+                old_scheme,
+                moderator_ids,
+            )
+            if moderator_hash is not None:
+                warning.guild_id_hash = guild_hash
+                warning.user_id_hash = user_hash
+                warning.moderator_id_hash = moderator_hash
+                warning.hash_scheme = current_scheme
+                rekeyed += 1
+
+            for log in warning.logs:
+                if log.hash_scheme == current_scheme:
+                    continue
+                values = {
+                    "guild_id_hash": _rekey_id_hash(
+                        log.guild_id_hash,
+                        log.hash_scheme,
+                        [guild_id],
+                    ),
+                    # Deletion logs were written with a placeholder user ID
+                    "user_id_hash": _rekey_id_hash(
+                        log.user_id_hash,
+                        log.hash_scheme,
+                        [user_id, "unknown"],
+                    ),
+                    "moderator_id_hash": _rekey_id_hash(
+                        log.moderator_id_hash,
+                        log.hash_scheme,
+                        moderator_ids,
+                    ),
+                }
+                if None in values.values():
+                    continue
+                log_updates.append(
+                    {"id": log.id, "hash_scheme": current_scheme, **values},
+                )
+                rekeyed_logs.append(log)
+
+        update_logs(db, log_updates)
+        for log in rekeyed_logs:
+            db.expire(log)
+
+        # Summaries are matched by ID hash, which has just changed
+        after_commit = [partial(invalidate_summaries, [lookup_key])] if rekeyed else []
+        commit(db, *after_commit)
+
+        logger.info(
+            "Re-keyed %s legacy warnings for user %s",
+            rekeyed,
+            security_manager.anonymized(user_id),
+        )
+        return rekeyed
+
+    except Exception:
+        rollback(db)
+        logger.exception("Failed to re-key legacy hashes")
+        raise
+
 
 class WarningService:
     """Service for managing warnings with security and GDPR compliance."""
@@ -26,40 +1001,30 @@ class WarningService:
         reason: str,
     ) -> SecureWarning:
         """Add a new warning to the database."""
-        with get_db_session() as db:
-            try:
-                # Create warning
-                warning = SecureWarning.create_warning(
-                    guild_id=guild_id,
-                    user_id=user_id,
-                    moderator_id=moderator_id,
-                    reason=reason,
-                )
-
-                # Save to database
-                db.add(warning)
-                db.commit()
-                db.refresh(warning)
+        with session_scope() as db:
+            return _add_warning(db, guild_id, user_id, moderator_id, reason)
 
-                # Create audit log
-                log = ModerationLog.create_log(
-                    guild_id=guild_id,
-                    user_id=user_id,
-                    moderator_id=moderator_id,
-                    action_type="warn",
-                    reason=reason,
-                    warning_id=warning.id,
-                )
-                db.add(log)
-                db.commit()
-
-                logger.info(f"Warning {warning.id} added successfully")
-                return warning
+    def add_warning_with_count(
+        self,
+        guild_id: str,
+        user_id: str,
+        moderator_id: str,
+        reason: str,
+    ) -> tuple[SecureWarning, int]:
+        """Add a warning and return it with the member's new active warning count.
 
-            except Exception:
-                db.rollback()
-                logger.exception("Failed to add warning")
-                raise
+        The warning and its audit log are written in a single transaction
+        with one commit, and the count is read inside that transaction, so
+        it always reflects this warning and no concurrent gap.
+        """
+        with session_scope() as db:
+            return _add_warning_with_count(
+                db,
+                guild_id,
+                user_id,
+                moderator_id,
+                reason,
+            )
 
     def get_user_warnings(
         self,
@@ -68,54 +1033,59 @@ class WarningService:
         include_deleted: bool = False,
     ) -> list[SecureWarning]:
         """Get all warnings for a user in a specific guild."""
-        with get_db_session() as db:
-            try:
-                guild_hash = security_manager.hash_discord_id(guild_id)
-                user_hash = security_manager.hash_discord_id(user_id)
-
-                query = db.query(SecureWarning).filter(
-                    and_(
-                        SecureWarning.guild_id_hash == guild_hash,
-                        SecureWarning.user_id_hash == user_hash,
-                    ),
-                )
+        with session_scope(read_only=True) as db:
+            return _get_user_warnings(db, guild_id, user_id, include_deleted)
 
-                if not include_deleted:
-                    query = query.filter(SecureWarning.is_deleted is False)
+    def get_user_warnings_page(
+        self,
+        guild_id: str,
+        user_id: str,
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: str | None = None,
+        include_deleted: bool = False,
+    ) -> WarningPage:
+        """Get one page of a user's warnings, newest first.
 
-                warnings = query.order_by(desc(SecureWarning.created_at)).all()
+        Pages are keyset-paginated on (created_at, id), so each page costs
+        the same whatever the length of the member's history.
 
-                logger.info(
-                    f"Retrieved {len(warnings)} warnings for user "
-                    f"{security_manager.anonymize_for_logs(user_id)}",
-                )
-                return warnings
+        Args:
+            guild_id: Guild ID
+            user_id: Discord user ID
+            limit: Page size (at most MAX_PAGE_SIZE)
+            cursor: ``next_cursor`` of the previous page, None for the first
+            include_deleted: Whether to include soft-deleted warnings
 
-            except Exception:
-                logger.exception("Failed to get user warnings")
-                raise
+        Returns:
+            The page and the cursor of the next one (None on the last page)
+        """
+        with session_scope(read_only=True) as db:
+            return _get_user_warnings_page(
+                db,
+                guild_id,
+                user_id,
+                limit,
+                cursor,
+                include_deleted,
+            )
 
     def get_warning_count(self, guild_id: str, user_id: str) -> int:
         """Get the count of active warnings for a user."""
-        with get_db_session() as db:
-            try:
-                guild_hash = security_manager.hash_discord_id(guild_id)
-                user_hash = security_manager.hash_discord_id(user_id)
-
-                return (
-                    db.query(SecureWarning)
-                    .filter(
-                        and_(
-                            SecureWarning.guild_id_hash == guild_hash,
-                            SecureWarning.user_id_hash == user_hash,
-                            SecureWarning.is_deleted is False,
-                        ),
-                    )
-                    .count()
-                )
-            except Exception:
-                logger.exception("Failed to get warning count")
-                raise
+        # With the summary cache the count comes from a summary; see below
+        with session_scope(read_only=summary_cache is None) as db:
+            return _get_warning_count(db, guild_id, user_id)
+
+    def get_warning_summary(self, guild_id: str, user_id: str) -> WarningSummary:
+        """Get IDs and timestamps of a user's active warnings, newest first.
+
+        Served from the per-member summary cache when
+        WARNING_SUMMARY_CACHE_ENABLED is set; every write through this
+        service invalidates the member's entry. Summaries are read from the
+        primary, never the read replica, so a lagging replica cannot put a
+        stale summary back in the cache after a write invalidated it.
+        """
+        with session_scope() as db:
+            return _get_warning_summary(db, guild_id, user_id)
 
     def delete_warning(self, warning_id: int, guild_id: str, moderator_id: str) -> bool:
         """Soft delete a warning with proper authorization checks.
@@ -128,74 +1098,8 @@ class WarningService:
         Returns:
             True if warning was deleted, False if not found or unauthorized
         """
-        with get_db_session() as db:
-            try:
-                guild_hash = security_manager.hash_discord_id(guild_id)
-
-                # Get warning with guild verification and optimistic locking
-                warning = (
-                    db.query(SecureWarning)
-                    .filter(
-                        and_(
-                            SecureWarning.id == warning_id,
-                            SecureWarning.guild_id_hash == guild_hash,
-                            SecureWarning.is_deleted is False,
-                        ),
-                    )
-                    .with_for_update()  # Optimistic locking
-                    .first()
-                )
-
-                if not warning:
-                    logger.warning(
-                        f"Warning {warning_id} not found or not authorized for guild "
-                        f"{security_manager.anonymize_for_logs(guild_id)}",
-                    )
-                    return False
-
-                # Store original version for optimistic locking check
-                original_version = warning.version
-
-                # Soft delete the warning
-                warning.soft_delete()
-
-                # Create audit log for deletion
-                log = ModerationLog.create_log(
-                    guild_id=guild_id,
-                    user_id="unknown",  # We don't have user_id from warning directly
-                    moderator_id=moderator_id,
-                    action_type="warning_deleted",
-                    reason=f"Warning {warning_id} deleted",
-                    context=f"Original warning ID: {warning_id}, version: {original_version}",
-                    warning_id=warning_id,
-                )
-                db.add(log)
-                db.commit()
-
-                logger.info(
-                    f"Warning {warning_id} deleted by moderator "
-                    f"{security_manager.anonymize_for_logs(moderator_id)} "
-                    f"in guild {security_manager.anonymize_for_logs(guild_id)}",
-                )
-                return True
-
-            except SQLAlchemyError as e:
-                db.rollback()
-                # Check if it's a concurrency issue
-                if "version" in str(e).lower() or "concurrent" in str(e).lower():
-                    logger.warning(
-                        f"Warning {warning_id} was modified by another process - "
-                        "concurrent modification detected",
-                    )
-                else:
-                    logger.exception(
-                        f"Database error while deleting warning {warning_id}",
-                    )
-                return False
-            except Exception:
-                db.rollback()
-                logger.exception(f"Failed to delete warning {warning_id}")
-                return False
+        with session_scope() as db:
+            return _delete_warning(db, warning_id, guild_id, moderator_id)
 
     def get_warning_by_id(self, warning_id: int, guild_id: str) -> SecureWarning | None:
         """Get a specific warning by ID with guild authorization.
@@ -207,35 +1111,8 @@ class WarningService:
         Returns:
             Warning if found and authorized, None otherwise
         """
-        with get_db_session() as db:
-            try:
-                guild_hash = security_manager.hash_discord_id(guild_id)
-
-                warning = (
-                    db.query(SecureWarning)
-                    .filter(
-                        and_(
-                            SecureWarning.id == warning_id,
-                            SecureWarning.guild_id_hash == guild_hash,
-                            SecureWarning.is_deleted is False,
-                        ),
-                    )
-                    .first()
-                )
-
-                if warning:
-                    logger.debug(f"Retrieved warning {warning_id}")
-                else:
-                    logger.warning(
-                        f"Warning {warning_id} not found or not authorized for guild "
-                        f"{security_manager.anonymize_for_logs(guild_id)}",
-                    )
-
-                return warning
-
-            except Exception:
-                logger.exception(f"Failed to get warning {warning_id}")
-                return None
+        with session_scope(read_only=True) as db:
+            return _get_warning_by_id(db, warning_id, guild_id)
 
     def bulk_delete_warnings(
         self,
@@ -253,78 +1130,30 @@ class WarningService:
         Returns:
             Dictionary with success/failure counts and details
         """
-        with get_db_session() as db:
-            results = {
-                "total_requested": len(warning_ids),
-                "deleted": 0,
-                "failed": 0,
-                "not_found": 0,
-                "errors": [],
-            }
-
-            try:
-                guild_hash = security_manager.hash_discord_id(guild_id)
-
-                # Get all warnings that exist and belong to this guild
-                warnings = (
-                    db.query(SecureWarning)
-                    .filter(
-                        and_(
-                            SecureWarning.id.in_(warning_ids),
-                            SecureWarning.guild_id_hash == guild_hash,
-                            SecureWarning.is_deleted is False,
-                        ),
-                    )
-                    .with_for_update()  # Lock all warnings for update
-                    .all()
-                )
+        with session_scope() as db:
+            return _bulk_delete_warnings(db, warning_ids, guild_id, moderator_id)
 
-                found_ids = {w.id for w in warnings}
-                results["not_found"] = len(warning_ids) - len(found_ids)
-
-                # Delete each warning
-                for warning in warnings:
-                    try:
-                        original_version = warning.version
-                        warning.soft_delete()
-
-                        # Create audit log
-                        log = ModerationLog.create_log(
-                            guild_id=guild_id,
-                            user_id="unknown",
-                            moderator_id=moderator_id,
-                            action_type="warning_deleted",
-                            reason=f"Bulk deletion of warning {warning.id}",
-                            context=f"Bulk operation, original version: {original_version}",
-                            warning_id=warning.id,
-                        )
-                        db.add(log)
-                        results["deleted"] += 1
-
-                    except Exception as e:
-                        results["failed"] += 1
-                        results["errors"].append(f"Warning {warning.id}: {e!s}")
-                        logger.exception(
-                            f"Failed to delete warning {warning.id} in bulk operation",
-                        )
-
-                db.commit()
-
-                logger.info(
-                    f"Bulk deletion completed by moderator "
-                    f"{security_manager.anonymize_for_logs(moderator_id)} "
-                    f"in guild {security_manager.anonymize_for_logs(guild_id)}: "
-                    f"{results['deleted']} deleted, {results['failed']} failed, "
-                    f"{results['not_found']} not found",
-                )
+    def clear_user_warnings(
+        self,
+        guild_id: str,
+        user_id: str,
+        moderator_id: str,
+    ) -> int:
+        """Soft delete all active warnings of a user in a guild.
 
-                return results
+        Runs a single UPDATE by lookup key and writes one audit log entry
+        summarizing the clear, all in one transaction.
 
-            except Exception as e:
-                db.rollback()
-                logger.exception("Bulk delete operation failed")
-                results["errors"].append(f"Bulk operation failed: {e!s}")
-                return results
+        Args:
+            guild_id: Guild ID
+            user_id: Discord user ID whose warnings are cleared
+            moderator_id: ID of the moderator performing the clear
+
+        Returns:
+            Number of warnings cleared
+        """
+        with session_scope() as db:
+            return _clear_user_warnings(db, guild_id, user_id, moderator_id)
 
     def export_user_data(self, user_id: str, guild_id: str) -> dict[str, Any]:
         """Export all data for a user in a specific guild (GDPR compliance).
@@ -336,68 +1165,33 @@ class WarningService:
         Returns:
             Dictionary containing user's data for the specified guild
         """
-        with get_db_session() as db:
-            try:
-                user_hash = security_manager.hash_discord_id(user_id)
-                guild_hash = security_manager.hash_discord_id(guild_id)
-
-                # Get warnings for this guild only
-                warnings = (
-                    db.query(SecureWarning)
-                    .filter(
-                        and_(
-                            SecureWarning.user_id_hash == user_hash,
-                            SecureWarning.guild_id_hash == guild_hash,
-                        ),
-                    )
-                    .all()
-                )
+        with session_scope() as db:
+            return _export_user_data(db, user_id, guild_id)
 
-                # Get moderation logs for this guild only
-                logs = (
-                    db.query(ModerationLog)
-                    .filter(
-                        and_(
-                            ModerationLog.user_id_hash == user_hash,
-                            ModerationLog.guild_id_hash == guild_hash,
-                        ),
-                    )
-                    .all()
-                )
-
-                export_data = {
-                    "user_id_hash": user_hash,
-                    "guild_id_hash": guild_hash,
-                    "export_date": datetime.now(UTC).isoformat(),
-                    "warnings": [w.to_dict() for w in warnings],
-                    "moderation_logs": [
-                        {
-                            "id": log.id,
-                            "action_type": log.action_type,
-                            "reason": log.get_decrypted_reason(),
-                            "context": log.get_decrypted_context(),
-                            "created_at": log.created_at.isoformat(),
-                        }
-                        for log in logs
-                    ],
-                }
+    def export_user_data_to_file(
+        self,
+        user_id: str,
+        guild_id: str,
+        batch_size: int = EXPORT_BATCH_SIZE,
+    ) -> Path:
+        """Stream all data for a user in a guild to a compressed file (GDPR).
 
-                # Create GDPR request record
-                gdpr_request = GDPRRequest.create_request(user_id, "export")
-                gdpr_request.status = "completed"
-                gdpr_request.completed_at = datetime.now(UTC)
-                db.add(gdpr_request)
-                db.commit()
+        Rows are fetched with ``yield_per`` and decrypted and written one
+        batch at a time, so peak memory does not depend on the size of the
+        user's history. The file holds one JSON object per line with a
+        ``type`` of ``export``, ``warning`` or ``moderation_log``.
 
-                logger.info(
-                    f"Data exported for user {security_manager.anonymize_for_logs(user_id)} "
-                    f"in guild {security_manager.anonymize_for_logs(guild_id)}",
-                )
-                return export_data
+        Args:
+            user_id: Discord user ID
+            guild_id: Guild ID to limit export scope
+            batch_size: Rows fetched and decrypted per batch
 
-            except Exception:
-                logger.exception("Failed to export user data")
-                raise
+        Returns:
+            Path of a gzip-compressed NDJSON temp file; the caller deletes it
+            once it has been sent
+        """
+        with session_scope() as db:
+            return _export_user_data_to_file(db, user_id, guild_id, batch_size)
 
     def delete_user_data(self, user_id: str, guild_id: str) -> bool:
         """Delete all data for a user in a specific guild (GDPR right to be forgotten).
@@ -409,55 +1203,228 @@ class WarningService:
         Returns:
             True if data was deleted successfully, False otherwise
         """
-        with get_db_session() as db:
-            try:
-                user_hash = security_manager.hash_discord_id(user_id)
-                guild_hash = security_manager.hash_discord_id(guild_id)
-
-                # Soft delete warnings for this guild only
-                warnings = (
-                    db.query(SecureWarning)
-                    .filter(
-                        and_(
-                            SecureWarning.user_id_hash == user_hash,
-                            SecureWarning.guild_id_hash == guild_hash,
-                            SecureWarning.is_deleted is False,
-                        ),
-                    )
-                    .with_for_update()  # Prevent concurrent modifications
-                    .all()
-                )
+        with session_scope() as db:
+            return _delete_user_data(db, user_id, guild_id)
 
-                deleted_count = 0
-                for warning in warnings:
-                    warning.soft_delete()
-                    deleted_count += 1
+    def rekey_legacy_hashes(
+        self,
+        guild_id: str,
+        user_id: str,
+        moderator_ids: Iterable[str] = (),
+    ) -> int:
+        """Re-key a member's rows that were hashed with an older ID hash scheme.
 
-                # Note: We keep moderation logs for audit purposes but could anonymize them further
-                # In a real implementation, you might want to anonymize rather than delete logs
+        Legacy Argon2 hashes are salted, so rows are located through their
+        deterministic lookup key and every hash is confirmed against the raw
+        IDs before being rewritten. A row whose moderator is not among
+        ``moderator_ids`` keeps its old scheme, so a later call with the
+        right moderator can still re-key it.
 
-                # Create GDPR request record
-                gdpr_request = GDPRRequest.create_request(user_id, "delete")
-                gdpr_request.status = "completed"
-                gdpr_request.completed_at = datetime.now(UTC)
-                db.add(gdpr_request)
+        Args:
+            guild_id: Discord guild ID
+            user_id: Discord user ID
+            moderator_ids: Discord IDs to try for the rows' moderators
 
-                db.commit()
+        Returns:
+            Number of warnings re-keyed
+        """
+        with session_scope() as db:
+            return _rekey_legacy_hashes(db, guild_id, user_id, moderator_ids)
 
-                logger.info(
-                    f"Data deleted for user {security_manager.anonymize_for_logs(user_id)} "
-                    f"in guild {security_manager.anonymize_for_logs(guild_id)} "
-                    f"({deleted_count} warnings deleted)",
-                )
-                return True
 
-            except Exception:
-                db.rollback()
-                logger.exception("Failed to delete user data")
-                return False
+class AsyncWarningService:
+    """Asyncio counterpart of WarningService with the same API.
+
+    Operations run on an AsyncSession (aiosqlite for SQLite, asyncpg for
+    PostgreSQL), so waiting on the database yields to the event loop instead
+    of stalling every guild the bot serves.
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession] | None = None,
+    ):
+        self._session_factory = session_factory or get_async_session_factory()
+
+    async def _run(self, operation: Callable[..., T], *args: Any) -> T:
+        """Run a shared operation in the unit of work's or a fresh session."""
+        return await run_in_session(self._session_factory, operation, *args)
+
+    async def _read(self, operation: Callable[..., T], *args: Any) -> T:
+        """Like _run(), but the operation's queries may use the read replica."""
+        return await run_in_session(
+            self._session_factory,
+            operation,
+            *args,
+            read_only=True,
+        )
+
+    async def add_warning(
+        self,
+        guild_id: str,
+        user_id: str,
+        moderator_id: str,
+        reason: str,
+    ) -> SecureWarning:
+        """Add a new warning to the database."""
+        return await self._run(_add_warning, guild_id, user_id, moderator_id, reason)
+
+    async def add_warning_with_count(
+        self,
+        guild_id: str,
+        user_id: str,
+        moderator_id: str,
+        reason: str,
+    ) -> tuple[SecureWarning, int]:
+        """Add a warning and return it with the member's new active warning count."""
+        return await self._run(
+            _add_warning_with_count,
+            guild_id,
+            user_id,
+            moderator_id,
+            reason,
+        )
+
+    async def get_user_warnings(
+        self,
+        guild_id: str,
+        user_id: str,
+        include_deleted: bool = False,
+    ) -> list[SecureWarning]:
+        """Get all warnings for a user in a specific guild."""
+        return await self._read(_get_user_warnings, guild_id, user_id, include_deleted)
+
+    async def get_user_warnings_page(
+        self,
+        guild_id: str,
+        user_id: str,
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: str | None = None,
+        include_deleted: bool = False,
+    ) -> WarningPage:
+        """Get one page of a user's warnings, newest first."""
+        return await self._read(
+            _get_user_warnings_page,
+            guild_id,
+            user_id,
+            limit,
+            cursor,
+            include_deleted,
+        )
+
+    async def get_warning_count(self, guild_id: str, user_id: str) -> int:
+        """Get the count of active warnings for a user."""
+        if summary_cache is not None:
+            summary = await self.get_warning_summary(guild_id, user_id)
+            return summary.count
+        return await self._read(_get_warning_count, guild_id, user_id)
+
+    async def get_warning_summary(
+        self,
+        guild_id: str,
+        user_id: str,
+    ) -> WarningSummary:
+        """Get IDs and timestamps of a user's active warnings, newest first."""
+        # Cache hits skip the trip to the database thread
+        unit = current_async_unit_of_work()
+        if unit is None or not unit.has_pending_writes:
+            cached = _cached_summary(guild_id, user_id)
+            if cached is not None:
+                return cached
+        return await self._run(_load_warning_summary, guild_id, user_id)
+
+    async def delete_warning(
+        self,
+        warning_id: int,
+        guild_id: str,
+        moderator_id: str,
+    ) -> bool:
+        """Soft delete a warning with proper authorization checks."""
+        return await self._run(_delete_warning, warning_id, guild_id, moderator_id)
+
+    async def get_warning_by_id(
+        self,
+        warning_id: int,
+        guild_id: str,
+    ) -> SecureWarning | None:
+        """Get a specific warning by ID with guild authorization."""
+        return await self._read(_get_warning_by_id, warning_id, guild_id)
+
+    async def bulk_delete_warnings(
+        self,
+        warning_ids: list[int],
+        guild_id: str,
+        moderator_id: str,
+    ) -> dict[str, Any]:
+        """Bulk soft delete warnings with authorization and concurrency handling."""
+        return await self._run(
+            _bulk_delete_warnings,
+            warning_ids,
+            guild_id,
+            moderator_id,
+        )
+
+    async def clear_user_warnings(
+        self,
+        guild_id: str,
+        user_id: str,
+        moderator_id: str,
+    ) -> int:
+        """Soft delete all active warnings of a user in a guild."""
+        return await self._run(_clear_user_warnings, guild_id, user_id, moderator_id)
+
+    async def export_user_data(self, user_id: str, guild_id: str) -> dict[str, Any]:
+        """Export all data for a user in a specific guild (GDPR compliance)."""
+        return await self._run(_export_user_data, user_id, guild_id)
+
+    async def export_user_data_to_file(
+        self,
+        user_id: str,
+        guild_id: str,
+        batch_size: int = EXPORT_BATCH_SIZE,
+    ) -> Path:
+        """Stream all data for a user in a guild to a compressed file (GDPR).
+
+        Decrypting and gzip-writing the rows is blocking work, so the export
+        runs on the database executor with a sync session from the main
+        engine rather than on the event loop. It does not join an open
+        async unit of work.
+
+        Raises:
+            DatabaseBusyError: The database executor's queue is full
+        """
+        return await run_db(
+            WarningService().export_user_data_to_file,
+            user_id,
+            guild_id,
+            batch_size,
+        )
+
+    async def delete_user_data(self, user_id: str, guild_id: str) -> bool:
+        """Delete all data for a user in a guild (GDPR right to be forgotten)."""
+        return await self._run(_delete_user_data, user_id, guild_id)
+
+    async def rekey_legacy_hashes(
+        self,
+        guild_id: str,
+        user_id: str,
+        moderator_ids: Iterable[str] = (),
+    ) -> int:
+        """Re-key a member's rows that were hashed with an older ID hash scheme."""
+        return await self._run(
+            _rekey_legacy_hashes,
+            guild_id,
+            user_id,
+            moderator_ids,
+        )
 
 
 # Convenience function for getting a warning service
 def get_warning_service() -> WarningService:
     """Get a new warning service instance."""
     return WarningService()
+
+
+def get_async_warning_service() -> AsyncWarningService:
+    """Get a new async warning service instance."""
+    return AsyncWarningService()
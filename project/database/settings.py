@@ -0,0 +1,125 @@
+"""Database settings read from the environment.
+
+The database package reads these once, when it is imported; BOT_TOKEN and
+the other bot settings are not needed to use it (scripts, tests).
+"""
+
+import os
+from dataclasses import dataclass
+
+
+@dataclass
+class DatabasePoolConfig:
+    """Connection pool settings for the database engines.
+
+    Ignored for in-memory SQLite, which always uses a single shared
+    connection.
+    """
+
+    # Connections kept open, and extra ones opened under load
+    pool_size: int = 5
+    max_overflow: int = 10
+    # Seconds before a connection is replaced, -1 to keep connections forever
+    pool_recycle: int = 1800
+    # Seconds to wait for a free connection before raising
+    pool_timeout: float = 30.0
+    # Test connections on checkout; None enables it for server databases only
+    pool_pre_ping: bool | None = None
+
+    @classmethod
+    def from_env(cls) -> "DatabasePoolConfig":
+        """Create pool settings from DB_POOL_* environment variables."""
+        pre_ping = os.getenv("DB_POOL_PRE_PING")
+        return cls(
+            pool_size=int(os.getenv("DB_POOL_SIZE", "5")),
+            max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "10")),
+            pool_recycle=int(os.getenv("DB_POOL_RECYCLE", "1800")),
+            pool_timeout=float(os.getenv("DB_POOL_TIMEOUT", "30")),
+            pool_pre_ping=None if pre_ping is None else pre_ping.lower() == "true",
+        )
+
+
+@dataclass
+class DatabaseExecutorConfig:
+    """Thread pool that runs blocking database work off the event loop."""
+
+    # Threads running database work at once; keep at or below pool_size
+    max_workers: int = 4
+    # Jobs allowed to wait for a thread before new ones are rejected
+    max_queue: int = 64
+    # Async service operations running at once, and allowed to wait, before
+    # new ones are rejected
+    max_async_active: int = 10
+    max_async_queue: int = 64
+
+    @classmethod
+    def from_env(cls) -> "DatabaseExecutorConfig":
+        """Create executor settings from DB_EXECUTOR_* environment variables."""
+        return cls(
+            max_workers=int(os.getenv("DB_EXECUTOR_WORKERS", "4")),
+            max_queue=int(os.getenv("DB_EXECUTOR_MAX_QUEUE", "64")),
+            max_async_active=int(os.getenv("DB_EXECUTOR_ASYNC_ACTIVE", "10")),
+            max_async_queue=int(os.getenv("DB_EXECUTOR_ASYNC_MAX_QUEUE", "64")),
+        )
+
+
+@dataclass
+class SQLiteConfig:
+    """Pragmas applied to every new SQLite connection.
+
+    The defaults suit a single bot process with cleanup running alongside
+    commands: WAL lets readers proceed during writes, NORMAL sync is durable
+    across application crashes in WAL mode, and busy_timeout makes writers
+    wait for the lock instead of failing with "database is locked".
+    """
+
+    enabled: bool = True
+    journal_mode: str = "WAL"
+    synchronous: str = "NORMAL"
+    busy_timeout_ms: int = 5000
+    # Page cache per connection, in KiB
+    cache_size_kib: int = 16384
+    # Bytes of the database file memory-mapped for reads, 0 to disable
+    mmap_size: int = 134_217_728
+    temp_store: str = "MEMORY"
+
+    @classmethod
+    def from_env(cls) -> "SQLiteConfig":
+        """Create SQLite settings from SQLITE_* environment variables."""
+        return cls(
+            enabled=os.getenv("SQLITE_TUNING_ENABLED", "true").lower() == "true",
+            journal_mode=os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+            synchronous=os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+            busy_timeout_ms=int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000")),
+            cache_size_kib=int(os.getenv("SQLITE_CACHE_SIZE_KIB", "16384")),
+            mmap_size=int(os.getenv("SQLITE_MMAP_SIZE", "134217728")),
+            temp_store=os.getenv("SQLITE_TEMP_STORE", "MEMORY"),
+        )
+
+    def pragmas(self, *, in_memory: bool = False) -> list[str]:
+        """PRAGMA statements for a new connection, in the order to run them.
+
+        In-memory databases have no file to journal or map, so only the
+        per-connection pragmas apply to them.
+        """
+        if not self.enabled:
+            return []
+        pragmas = [
+            f"PRAGMA busy_timeout = {int(self.busy_timeout_ms)}",
+            f"PRAGMA cache_size = -{int(self.cache_size_kib)}",
+            f"PRAGMA temp_store = {_identifier(self.temp_store)}",
+        ]
+        if not in_memory:
+            pragmas[:0] = [
+                f"PRAGMA journal_mode = {_identifier(self.journal_mode)}",
+                f"PRAGMA synchronous = {_identifier(self.synchronous)}",
+            ]
+            pragmas.append(f"PRAGMA mmap_size = {int(self.mmap_size)}")
+        return pragmas
+
+
+def _identifier(value: str) -> str:
+    """Validate a pragma keyword such as WAL or NORMAL."""
+    if not value.isalnum():
+        raise ValueError(f"Invalid SQLite pragma value: {value!r}")
+    return value.upper()
@@ -0,0 +1,321 @@
+"""Context-local unit of work shared by the database services.
+
+Inside ``unit_of_work()`` (or ``async_unit_of_work()`` for the asyncio
+services) every service call uses the same session. It is opened on the
+first call and committed once when the block exits, so a command that makes
+several service calls checks out one connection and commits one
+transaction. Outside a unit, each service call keeps its own session and
+commits on its own.
+"""
+
+from collections.abc import AsyncIterator, Callable, Iterator
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import Any, TypeVar
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+
+from .connection import get_async_session_factory, get_db_session, route_reads
+from .executor import db_admission
+
+
+T = TypeVar("T")
+
+# Session.info key pointing back to the unit of work that owns the session
+UNIT_KEY = "unit_of_work"
+
+
+class UnitOfWork:
+    """State of one unit of work: its session and deferred commit work."""
+
+    def __init__(self):
+        # Set when a service call flushed writes that are not committed yet
+        self.dirty = False
+        # Set when a service call rolled back; the unit then rolls back too
+        self.failed = False
+        # Run after the unit commits, e.g. cache invalidation
+        self.after_commit: list[Callable[[], object]] = []
+
+    @property
+    def has_pending_writes(self) -> bool:
+        """Whether the session holds writes that are not committed yet."""
+        return self.dirty or self.failed
+
+    def _own(self, session: Session) -> None:
+        session.info[UNIT_KEY] = self
+
+    def _reset(self) -> list[Callable[[], object]]:
+        callbacks, self.after_commit = self.after_commit, []
+        self.dirty = self.failed = False
+        return callbacks
+
+
+class SyncUnitOfWork(UnitOfWork):
+    """Unit of work over a sync Session."""
+
+    def __init__(self, session_factory: Callable[[], Session] = get_db_session):
+        super().__init__()
+        self._session_factory = session_factory
+        self._session: Session | None = None
+
+    @property
+    def session(self) -> Session:
+        """The unit's session, opened on first use."""
+        if self._session is None:
+            self._session = self._session_factory()
+            self._own(self._session)
+        return self._session
+
+    def commit(self) -> None:
+        """Commit work done so far, or roll it back if a service call failed."""
+        if self._session is None:
+            return
+        if self.failed:
+            self.rollback()
+            return
+        self._session.commit()
+        for callback in self._reset():
+            callback()
+
+    def rollback(self) -> None:
+        """Discard work done so far."""
+        if self._session is not None:
+            self._session.rollback()
+        self._reset()
+
+    def close(self) -> None:
+        """Release the session and its connection."""
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+
+
+class AsyncUnitOfWork(UnitOfWork):
+    """Unit of work over an AsyncSession."""
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession] | None = None,
+    ):
+        super().__init__()
+        self._session_factory = session_factory or get_async_session_factory()
+        self._session: AsyncSession | None = None
+        # ContextVar token of begin_async_unit_of_work()
+        self.token = None
+
+    @property
+    def session(self) -> AsyncSession:
+        """The unit's session, opened on first use."""
+        if self._session is None:
+            self._session = self._session_factory()
+            self._own(self._session.sync_session)
+        return self._session
+
+    async def commit(self) -> None:
+        """Commit work done so far, or roll it back if a service call failed."""
+        if self._session is None:
+            return
+        if self.failed:
+            await self.rollback()
+            return
+        await self._session.commit()
+        for callback in self._reset():
+            callback()
+
+    async def rollback(self) -> None:
+        """Discard work done so far."""
+        if self._session is not None:
+            await self._session.rollback()
+        self._reset()
+
+    async def close(self) -> None:
+        """Release the session and its connection."""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+
+_sync_unit: ContextVar[SyncUnitOfWork | None] = ContextVar(
+    "sync_unit_of_work",
+    default=None,
+)
+_async_unit: ContextVar[AsyncUnitOfWork | None] = ContextVar(
+    "async_unit_of_work",
+    default=None,
+)
+
+
+def current_unit_of_work() -> SyncUnitOfWork | None:
+    """The sync unit of work active in this context, if any."""
+    return _sync_unit.get()
+
+
+def current_async_unit_of_work() -> AsyncUnitOfWork | None:
+    """The async unit of work active in this context, if any."""
+    return _async_unit.get()
+
+
+@contextmanager
+def unit_of_work(
+    session_factory: Callable[[], Session] | sessionmaker = get_db_session,
+) -> Iterator[SyncUnitOfWork]:
+    """Share one session across sync service calls, committing on exit.
+
+    An exception rolls the unit back. Nested units join the outer one.
+    """
+    if _sync_unit.get() is not None:
+        yield _sync_unit.get()
+        return
+    unit = SyncUnitOfWork(session_factory)
+    token = _sync_unit.set(unit)
+    try:
+        yield unit
+        unit.commit()
+    except BaseException:
+        unit.rollback()
+        raise
+    finally:
+        _sync_unit.reset(token)
+        unit.close()
+
+
+@asynccontextmanager
+async def async_unit_of_work(
+    session_factory: async_sessionmaker[AsyncSession] | None = None,
+) -> AsyncIterator[AsyncUnitOfWork]:
+    """Share one session across async service calls, committing on exit.
+
+    An exception rolls the unit back. Nested units join the outer one.
+    """
+    if _async_unit.get() is not None:
+        yield _async_unit.get()
+        return
+    unit = AsyncUnitOfWork(session_factory)
+    token = _async_unit.set(unit)
+    try:
+        yield unit
+        await unit.commit()
+    except BaseException:
+        await unit.rollback()
+        raise
+    finally:
+        _async_unit.reset(token)
+        await unit.close()
+
+
+def begin_async_unit_of_work(
+    session_factory: async_sessionmaker[AsyncSession] | None = None,
+) -> AsyncUnitOfWork:
+    """Start an async unit of work in this context without a ``with`` block.
+
+    For split hooks such as a cog's before/after invoke; finish it with
+    end_async_unit_of_work() from the same task.
+    """
+    unit = AsyncUnitOfWork(session_factory)
+    unit.token = _async_unit.set(unit)
+    return unit
+
+
+async def end_async_unit_of_work(*, failed: bool = False) -> None:
+    """Commit (or, when ``failed``, roll back) and close the current unit."""
+    unit = _async_unit.get()
+    if unit is None:
+        return
+    try:
+        if failed:
+            await unit.rollback()
+        else:
+            await unit.commit()
+    finally:
+        _async_unit.reset(unit.token)
+        await unit.close()
+
+
+@contextmanager
+def session_scope(read_only: bool = False) -> Iterator[Session]:
+    """The current unit of work's session, or a new session closed on exit.
+
+    With ``read_only`` the block's queries may go to the read replica; see
+    RoutingSession.
+    """
+    unit = _sync_unit.get()
+    if unit is not None:
+        if read_only:
+            with route_reads(unit.session) as db:
+                yield db
+        else:
+            yield unit.session
+        return
+    with get_db_session() as db:
+        if read_only:
+            with route_reads(db):
+                yield db
+        else:
+            yield db
+
+
+def _read_only(operation: Callable[..., T]) -> Callable[..., T]:
+    """Wrap a sync operation so its session routes reads to the replica."""
+
+    def run(db: Session, *args: Any) -> T:
+        with route_reads(db):
+            return operation(db, *args)
+
+    return run
+
+
+async def run_in_session(
+    session_factory: async_sessionmaker[AsyncSession],
+    operation: Callable[..., T],
+    *args: Any,
+    read_only: bool = False,
+) -> T:
+    """Run a sync operation in the current async unit's session or a new one.
+
+    The operation first takes a slot from ``db_admission``, so a burst of
+    commands is shed instead of queueing on the connection pool.
+
+    Raises:
+        DatabaseBusyError: Too many operations are already waiting
+    """
+    if read_only:
+        operation = _read_only(operation)
+    async with db_admission.admit():
+        unit = _async_unit.get()
+        if unit is not None:
+            return await unit.session.run_sync(operation, *args)
+        async with session_factory() as db:
+            return await db.run_sync(operation, *args)
+
+
+def commit(db: Session, *after_commit: Callable[[], object]) -> None:
+    """Commit a service call's work, or defer it to the session's unit of work.
+
+    Inside a unit of work the changes are only flushed, so later calls in
+    the unit see them, and the ``after_commit`` callbacks run once the unit
+    commits. Otherwise they run right after this commit.
+    """
+    unit = db.info.get(UNIT_KEY)
+    if unit is None:
+        db.commit()
+        for callback in after_commit:
+            callback()
+        return
+    db.flush()
+    unit.dirty = True
+    unit.after_commit.extend(after_commit)
+
+
+def rollback(db: Session) -> None:
+    """Roll back a failed service call, failing its unit of work if any."""
+    db.rollback()
+    unit = db.info.get(UNIT_KEY)
+    if unit is not None:
+        unit.failed = True
+
+
+def has_pending_writes(db: Session) -> bool:
+    """Whether ``db`` belongs to a unit of work with uncommitted writes."""
+    unit = db.info.get(UNIT_KEY)
+    return unit is not None and unit.has_pending_writes
@@ -5,6 +5,10 @@ from datetime import datetime, timedelta
 
 import discord
 
+from project.database.audit_queue import get_audit_queue_stats
+from project.database.connection import get_pool_stats
+from project.database.executor import get_admission_stats, get_executor_stats
+
 
 logger = logging.getLogger(__name__)
 
@@ -51,6 +55,10 @@ class HealthChecker:
             "users": sum(guild.member_count for guild in self.bot.guilds),
             "latency": round(self.bot.latency * 1000, 2),  # ms
             "last_errors": self.last_errors[-5:],  # Last 5 errors
+            "database_pool": get_pool_stats(),
+            "database_executor": get_executor_stats(),
+            "database_admission": get_admission_stats(),
+            "audit_queue": get_audit_queue_stats(),
         }
 
     async def create_health_embed(self) -> discord.Embed:
@@ -89,6 +97,62 @@ class HealthChecker:
             inline=True,
         )
 
+        for engine_name, pool in status["database_pool"].items():
+            embed.add_field(
+                name=f"DB Pool ({engine_name})",
+                value=(
+                    f"In use: {pool['checked_out']}/{pool['pool_size']}"
+                    f" (+{pool['overflow']} overflow)\n"
+                    f"Peak: {pool['peak_checked_out']}"
+                    f" · Timeouts: {pool['timeouts']}\n"
+                    f"Wait p95: {pool['p95_wait_ms']}ms"
+                ),
+                inline=True,
+            )
+
+        executor = status["database_executor"]
+        embed.add_field(
+            name="DB Executor",
+            value=(
+                f"Running: {executor['running']}/{executor['max_workers']}"
+                f" · Queued: {executor['queued']}/{executor['max_queue']}\n"
+                f"Peak queued: {executor['peak_queued']}"
+                f" · Rejected: {executor['rejected']}\n"
+                f"Wait p95: {executor['queue_wait']['p95_ms']}ms"
+                f" · Run p95: {executor['execution']['p95_ms']}ms"
+            ),
+            inline=True,
+        )
+
+        admission = status["database_admission"]
+        embed.add_field(
+            name="DB Admission",
+            value=(
+                f"Active: {admission['active']}/{admission['max_active']}"
+                f" · Waiting: {admission['waiting']}/{admission['max_queue']}\n"
+                f"Peak waiting: {admission['peak_waiting']}"
+                f" · Rejected: {admission['rejected']}\n"
+                f"Wait p95: {admission['queue_wait']['p95_ms']}ms"
+            ),
+            inline=True,
+        )
+
+        audit = status["audit_queue"]
+        if audit is not None:
+            embed.add_field(
+                name="Audit Queue",
+                value=(
+                    f"Depth: {audit['queue_depth']}"
+                    f" · Flushed: {audit['flushed']}\n"
+                    f"Spooled: {audit['spooled']}"
+                    f" · Quarantined: {audit['quarantined']}"
+                    f" · Failed flushes: {audit['failed_flushes']}\n"
+                    f"Last flush: {audit['last_flush_ms']}ms"
+                    f" · Max: {audit['max_flush_ms']}ms"
+                ),
+                inline=True,
+            )
+
         if status["errors"] > 0:
             embed.add_field(name="Errors", value=str(status["errors"]), inline=True)
 
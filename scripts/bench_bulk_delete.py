@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""Benchmark bulk warning deletion.
+
+Compares the previous per-row ORM approach (load, soft_delete() and one
+create_log() per warning) with the set-based WarningService.bulk_delete_warnings
+on a temporary SQLite database. Run from the repository root:
+
+    python scripts/bench_bulk_delete.py [id_count]
+"""
+
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+
+# Add project to path
+sys.path.append(str(Path(__file__).resolve().parent.parent / "project"))
+
+# The service uses the global engine, so point it at a scratch database
+_tmp = tempfile.TemporaryDirectory()
+os.environ["DATABASE_URL"] = f"sqlite:///{_tmp.name}/bench.db"
+
+from database.connection import Base, SessionLocal, engine  # noqa: E402
+from database.models import ModerationLog, SecureWarning  # noqa: E402
+from database.security import security_manager  # noqa: E402
+from database.services import WarningService  # noqa: E402
+from sqlalchemy import insert  # noqa: E402
+
+
+GUILD_ID = "123456789012345678"
+MODERATOR_ID = "555666777888999000"
+
+
+def seed(count: int) -> list[int]:
+    """Insert ``count`` active warnings and return their IDs."""
+    with SessionLocal() as db:
+        rows = [
+            {
+                "guild_id_hash": security_manager.hash_discord_id(GUILD_ID),
+                "user_id_hash": security_manager.hash_discord_id(str(i % 50)),
+                "moderator_id_hash": security_manager.hash_discord_id(MODERATOR_ID),
+                "hash_scheme": security_manager.hash_scheme,
+                "reason_encrypted": security_manager.encrypt_to_bytes(f"Reason {i}"),
+                "lookup_key": security_manager.create_lookup_key(GUILD_ID, str(i % 50)),
+            }
+            for i in range(count)
+        ]
+        ids = db.scalars(insert(SecureWarning).returning(SecureWarning.id), rows).all()
+        db.commit()
+        return list(ids)
+
+
+def per_row_delete(warning_ids: list[int]) -> None:
+    """The previous implementation: one ORM object and audit log per warning."""
+    with SessionLocal() as db:
+        warnings = (
+            db.query(SecureWarning)
+            .filter(
+                SecureWarning.id.in_(warning_ids),
+                SecureWarning.guild_id_hash
+                == security_manager.hash_discord_id(GUILD_ID),
+                SecureWarning.is_deleted.is_(False),
+            )
+            .all()
+        )
+        for warning in warnings:
+            original_version = warning.version
+            warning.soft_delete()
+            db.add(
+                ModerationLog.create_log(
+                    guild_id=GUILD_ID,
+                    user_id="unknown",
+                    moderator_id=MODERATOR_ID,
+                    action_type="warning_deleted",
+                    reason=f"Bulk deletion of warning {warning.id}",
+                    context=f"Bulk operation, original version: {original_version}",
+                    warning_id=warning.id,
+                ),
+            )
+        db.commit()
+
+
+def timed(label: str, func, warning_ids: list[int]) -> None:
+    """Run one delete strategy and print its wall time."""
+    start = time.perf_counter()
+    func(warning_ids)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<12}{len(warning_ids):>8} ids{elapsed * 1000:>12.1f} ms")
+
+
+def main():
+    id_count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    Base.metadata.create_all(bind=engine)
+    service = WarningService()
+
+    # Warm up statement caches so both strategies are timed steady-state
+    per_row_delete(seed(10))
+    service.bulk_delete_warnings(seed(10), GUILD_ID, MODERATOR_ID)
+
+    timed("per-row", per_row_delete, seed(id_count))
+    timed(
+        "set-based",
+        lambda ids: service.bulk_delete_warnings(ids, GUILD_ID, MODERATOR_ID),
+        seed(id_count),
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""Compare legacy base64 Fernet and binary ciphertext storage.
+
+Seeds a temporary SQLite database with legacy text ciphertexts, measures
+file size and full-table decrypt latency, converts it in place with
+migrate_ciphertexts and measures again. Run from the repository root:
+
+    python scripts/bench_ciphertext_storage.py [row_count]
+"""
+
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+
+# Add project to path
+sys.path.append(str(Path(__file__).resolve().parent.parent / "project"))
+
+from database.connection import Base
+from database.models import SecureWarning
+from database.reencrypt import migrate_ciphertexts
+from database.security import security_manager
+from sqlalchemy import create_engine, select, text
+from sqlalchemy.orm import sessionmaker
+
+
+REASON = "Repeated spam in #general after two verbal warnings from staff"
+
+
+def measure(engine, label: str) -> None:
+    """Print on-disk size and decrypt latency for the warnings table."""
+    with engine.connect() as conn:
+        conn.execute(text("VACUUM"))
+        column_bytes = conn.execute(
+            text("SELECT SUM(LENGTH(reason_encrypted)) FROM warnings"),
+        ).scalar()
+        start = time.perf_counter()
+        ciphertexts = conn.execute(select(SecureWarning.reason_encrypted)).scalars()
+        plaintexts = security_manager.decrypt_many(ciphertexts)
+        elapsed = time.perf_counter() - start
+
+    if any(plaintext != REASON for plaintext in plaintexts):
+        raise SystemExit(f"{label}: reasons did not decrypt to the seeded text")
+    file_bytes = Path(engine.url.database).stat().st_size
+    print(
+        f"{label:<8} file={file_bytes / 1024:>9.0f} KiB  "
+        f"reason column={column_bytes / len(plaintexts):>6.1f} B/row  "
+        f"read+decrypt={elapsed / len(plaintexts) * 1_000_000:>6.2f} us/row",
+    )
+
+
+def main():
+    row_count = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{tmp}/bench.db")
+        Base.metadata.create_all(bind=engine)
+
+        rows = [
+            {
+                "guild_id_hash": "0" * 64,
+                "user_id_hash": f"{i:064x}",
+                "moderator_id_hash": "1" * 64,
+                "hash_scheme": security_manager.hash_scheme,
+                "reason_encrypted": security_manager.encrypt_text(REASON),
+                "lookup_key": f"{i:016x}",
+            }
+            for i in range(row_count)
+        ]
+        # Raw SQL so the legacy text ciphertexts bypass binary type processing
+        with engine.begin() as conn:
+            conn.execute(
+                text(
+                    "INSERT INTO warnings (guild_id_hash, user_id_hash, "
+                    "moderator_id_hash, hash_scheme, reason_encrypted, lookup_key, "
+                    "created_at, is_deleted, version) VALUES (:guild_id_hash, "
+                    ":user_id_hash, :moderator_id_hash, :hash_scheme, "
+                    ":reason_encrypted, :lookup_key, CURRENT_TIMESTAMP, 0, 1)",
+                ),
+                rows,
+            )
+
+        print(f"{row_count} warnings, reason length {len(REASON)} chars")
+        measure(engine, "legacy")
+        migrate_ciphertexts(session_factory=sessionmaker(bind=engine))
+        measure(engine, "binary")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""Benchmark Discord ID hashing cost per lookup.
+
+Compares the legacy salted Argon2 hash against the deterministic keyed
+hashes (cold and memoized). Run from the repository root:
+
+    python scripts/bench_id_hashing.py
+"""
+
+import itertools
+import os
+import sys
+import timeit
+from pathlib import Path
+
+
+# Add project to path
+sys.path.append(str(Path(__file__).resolve().parent.parent / "project"))
+
+os.environ.setdefault("PEPPER_KEY", "benchmark_pepper_not_for_production")
+os.environ.setdefault("SALT_KEY", "benchmark_salt_not_for_production")
+
+from database.security import Argon2IDHasher, SecurityManager
+
+
+SAMPLE_IDS = [str(100000000000000000 + i) for i in range(1000)]
+
+
+def per_call_us(func, number: int) -> float:
+    """Return the mean cost of one call in microseconds."""
+    return timeit.timeit(func, number=number) / number * 1_000_000
+
+
+def main():
+    pepper = os.environ["PEPPER_KEY"]
+    argon2 = Argon2IDHasher(pepper)
+
+    results = {
+        "argon2 (legacy, per call)": per_call_us(
+            lambda: argon2.hash(SAMPLE_IDS[0]),
+            number=20,
+        ),
+    }
+
+    for algorithm in ("hmac-sha256", "blake2b"):
+        os.environ["ID_HASH_ALGORITHM"] = algorithm
+        manager = SecurityManager()
+        # IDs never hashed before, so every call misses the memo
+        ids = (str(200000000000000000 + i) for i in itertools.count())
+        results[f"{algorithm} (cold)"] = per_call_us(
+            lambda m=manager, i=ids: m.hash_discord_id(next(i)),
+            number=50_000,
+        )
+        results[f"{algorithm} (memoized)"] = per_call_us(
+            lambda m=manager: m.hash_discord_id(SAMPLE_IDS[0]),
+            number=200_000,
+        )
+
+    baseline = results["argon2 (legacy, per call)"]
+    print(f"{'scheme':<28}{'us/lookup':>14}{'speedup':>12}")
+    for name, cost in results.items():
+        print(f"{name:<28}{cost:>14.2f}{baseline / cost:>11.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""Benchmark the SQLite connection profile.
+
+Runs the same concurrent workload against two temporary SQLite databases:
+one with SQLite's defaults (rollback journal, synchronous=FULL) and one with
+the tuned profile applied on connect (WAL, synchronous=NORMAL, busy_timeout,
+cache_size, mmap_size, temp_store=MEMORY). Writer threads add warnings
+through WarningService while a reader thread counts warnings, the way
+commands and cleanup share the database. Run from the repository root:
+
+    python scripts/bench_sqlite_profile.py [writers] [warnings_per_writer]
+"""
+
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+
+# Add project to path
+sys.path.append(str(Path(__file__).resolve().parent.parent / "project"))
+
+from database.connection import Base, SessionLocal, create_db_engine
+from database.services import WarningService
+from database.settings import DatabasePoolConfig, SQLiteConfig
+
+
+GUILD_ID = "123456789012345678"
+MODERATOR_ID = "555666777888999000"
+
+
+def run_workload(writers: int, per_writer: int) -> tuple[float, float, int]:
+    """Run concurrent writers and one reader against the bound engine.
+
+    Returns:
+        Writes per second, reader p95 latency in ms and failed operations
+    """
+    service = WarningService()
+    errors = 0
+    errors_lock = threading.Lock()
+    done = threading.Event()
+    read_ms: list[float] = []
+
+    def write(writer: int) -> None:
+        nonlocal errors
+        for n in range(per_writer):
+            try:
+                service.add_warning(
+                    GUILD_ID,
+                    str(writer * 1000 + n % 20),
+                    MODERATOR_ID,
+                    f"Benchmark warning {n}",
+                )
+            except Exception:
+                with errors_lock:
+                    errors += 1
+
+    def read() -> None:
+        nonlocal errors
+        while not done.is_set():
+            start = time.perf_counter()
+            try:
+                service.get_warning_count(GUILD_ID, "0")
+            except Exception:
+                with errors_lock:
+                    errors += 1
+            read_ms.append((time.perf_counter() - start) * 1000)
+
+    reader = threading.Thread(target=read)
+    threads = [threading.Thread(target=write, args=(w,)) for w in range(writers)]
+    reader.start()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    done.set()
+    reader.join()
+
+    read_ms.sort()
+    p95 = read_ms[int(len(read_ms) * 0.95)] if read_ms else 0.0
+    return writers * per_writer / elapsed, p95, errors
+
+
+def bench(label: str, sqlite: SQLiteConfig, writers: int, per_writer: int) -> None:
+    """Bind the services to a fresh database using ``sqlite`` and time it."""
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{tmp}/bench.db"
+        engine = create_db_engine(
+            url,
+            DatabasePoolConfig(pool_size=writers + 1),
+            sqlite=sqlite,
+        )
+        Base.metadata.create_all(bind=engine)
+        SessionLocal.configure(bind=engine)
+        try:
+            run_workload(writers, 5)  # warm up connections and statement caches
+            writes_per_s, read_p95, errors = run_workload(writers, per_writer)
+        finally:
+            engine.dispose()
+    print(
+        f"{label:<10}{writers:>4} writers{writes_per_s:>12.0f} writes/s"
+        f"{read_p95:>10.1f} ms read p95{errors:>6} errors",
+    )
+
+
+def main():
+    writers = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    per_writer = int(sys.argv[2]) if len(sys.argv) > 2 else 250
+
+    bench("default", SQLiteConfig(enabled=False), writers, per_writer)
+    bench("tuned", SQLiteConfig(), writers, per_writer)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""Tests for moderation analytics rollups."""
+
+from datetime import UTC, datetime, timedelta
+
+from sqlalchemy import insert, select
+from sqlalchemy.orm import sessionmaker
+
+from project.database.analytics import AnalyticsService
+from project.database.cleanup import DatabaseCleanup
+from project.database.connection import Base, engine
+from project.database.models import (
+    ModerationLog,
+    ModerationRollup,
+    SecureWarning,
+    WarningCounter,
+)
+from project.database.security import security_manager
+from project.database.services import WarningService
+
+
+GUILD_ID = "123456789012345678"
+
+
+class TestModerationAnalytics:
+    """Test rollup maintenance and the analytics queries."""
+
+    @classmethod
+    def setup_class(cls):
+        """Setup test database."""
+        cls.Session = sessionmaker(bind=engine)
+        Base.metadata.create_all(bind=engine)
+
+    def teardown_method(self):
+        """Cleanup after each test."""
+        with self.Session() as session:
+            session.query(ModerationRollup).delete()
+            session.query(WarningCounter).delete()
+            session.query(ModerationLog).delete()
+            session.query(SecureWarning).delete()
+            session.commit()
+
+    def rollups(self) -> list[tuple]:
+        """Return every rollup row in a stable order."""
+        with self.Session() as session:
+            return session.execute(
+                select(
+                    ModerationRollup.guild_id_hash,
+                    ModerationRollup.metric,
+                    ModerationRollup.day,
+                    ModerationRollup.key,
+                    ModerationRollup.total,
+                ).order_by(
+                    ModerationRollup.metric,
+                    ModerationRollup.day,
+                    ModerationRollup.key,
+                ),
+            ).all()
+
+    def test_stats_are_maintained_on_insert(self):
+        """Test that moderation writes update the rollups as they happen."""
+        service = WarningService()
+        first = service.add_warning(GUILD_ID, "2", "10", "First")
+        service.add_warning(GUILD_ID, "2", "10", "Second")
+        service.add_warning(GUILD_ID, "3", "11", "Third")
+        service.add_warning("999", "2", "10", "Other guild")
+        service.bulk_delete_warnings([first.id], GUILD_ID, "11")
+
+        stats = AnalyticsService().get_guild_stats(GUILD_ID, days=7)
+
+        today = datetime.now(UTC).date()
+        assert stats.actions_per_day == {today: {"warn": 3, "warning_deleted": 1}}
+        assert stats.total_actions == 4
+        assert stats.top_moderators == sorted(
+            [
+                (security_manager.hash_discord_id("10"), 2),
+                (security_manager.hash_discord_id("11"), 2),
+            ],
+        )
+        # Deletions are not offences and one warning is not a repeat
+        assert stats.repeat_offenders == [(security_manager.hash_discord_id("2"), 2)]
+
+    def test_compaction_rebuilds_recent_days(self):
+        """Test that compaction matches incremental rollups and keeps old days."""
+        service = WarningService()
+        service.add_warning(GUILD_ID, "2", "10", "First")
+        service.add_warning(GUILD_ID, "2", "10", "Second")
+        incremental = self.rollups()
+
+        cleanup = DatabaseCleanup()
+        try:
+            assert cleanup.compact_moderation_rollups() == len(incremental)
+            assert self.rollups() == incremental
+
+            # A log written behind the service's back, and an old purged day
+            old_day = datetime.now(UTC).date() - timedelta(days=400)
+            with self.Session() as session:
+                session.execute(
+                    insert(ModerationLog.__table__),
+                    ModerationLog.bulk_values(
+                        guild_id=GUILD_ID,
+                        user_id="4",
+                        moderator_id="10",
+                        action_type="kick",
+                        warning_ids=[None],
+                    ),
+                )
+                session.add(
+                    ModerationRollup(
+                        guild_id_hash=security_manager.hash_discord_id(GUILD_ID),
+                        metric="action",
+                        day=old_day,
+                        key="ban",
+                        total=7,
+                    ),
+                )
+                session.commit()
+
+            # New rows: the kick action and its offender
+            assert cleanup.compact_moderation_rollups() == len(incremental) + 2
+        finally:
+            cleanup.close()
+
+        rows = self.rollups()
+        assert (
+            security_manager.hash_discord_id(GUILD_ID),
+            "action",
+            old_day,
+            "ban",
+            7,
+        ) in rows
+        stats = AnalyticsService().get_guild_stats(GUILD_ID, days=1)
+        assert stats.actions_per_day[datetime.now(UTC).date()] == {
+            "kick": 1,
+            "warn": 2,
+        }
+        assert stats.top_moderators == [(security_manager.hash_discord_id("10"), 3)]
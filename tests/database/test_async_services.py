@@ -0,0 +1,174 @@
+"""Tests for the asyncio warning service."""
+
+import asyncio
+import gzip
+import json
+import tempfile
+import threading
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from project.database.connection import Base, SessionLocal, engine, to_async_url
+from project.database.models import ModerationLog, SecureWarning
+from project.database.services import AsyncWarningService, WarningService
+
+
+class TestAsyncWarningService:
+    """Test AsyncWarningService against a file-backed SQLite database."""
+
+    # How long the slow-insert trigger holds the database driver thread
+    SLOW_INSERT_SECONDS = 0.5
+
+    def setup_method(self):
+        """Create a fresh database file for each test."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.url = f"sqlite:///{Path(self.tmp.name) / 'async.db'}"
+        self.engine = create_engine(self.url)
+        Base.metadata.create_all(bind=self.engine)
+        self.Session = sessionmaker(bind=self.engine)
+
+    def teardown_method(self):
+        """Dispose engines and remove the database file."""
+        SessionLocal.configure(bind=engine)
+        self.engine.dispose()
+        self.tmp.cleanup()
+
+    def run(self, test_coro_fn, slow_inserts: bool = False):
+        """Run a coroutine function with a service bound to the test database."""
+
+        async def runner():
+            async_engine = create_async_engine(to_async_url(self.url))
+            if slow_inserts:
+                # The sleep runs on the aiosqlite worker thread, like real I/O
+                @event.listens_for(async_engine.sync_engine, "connect")
+                def register_slow_down(dbapi_connection, _record):
+                    dbapi_connection.create_function(
+                        "slow_down",
+                        0,
+                        lambda: time.sleep(self.SLOW_INSERT_SECONDS),
+                    )
+
+            service = AsyncWarningService(
+                async_sessionmaker(bind=async_engine, expire_on_commit=False),
+            )
+            try:
+                return await test_coro_fn(service)
+            finally:
+                await async_engine.dispose()
+
+        return asyncio.run(runner())
+
+    def test_add_warning_matches_sync_api(self):
+        """Test that warnings written asynchronously are stored as usual."""
+
+        async def scenario(service):
+            return await service.add_warning(
+                guild_id="123456789012345678",
+                user_id="987654321098765432",
+                moderator_id="555666777888999000",
+                reason="Async reason",
+            )
+
+        warning = self.run(scenario)
+
+        assert warning.id is not None
+        assert warning.get_decrypted_reason() == "Async reason"
+        with self.Session() as db:
+            assert db.get(SecureWarning, warning.id) is not None
+            assert db.query(ModerationLog).count() == 1
+
+    def test_export_user_data(self):
+        """Test a multi-query operation through the async session."""
+
+        async def scenario(service):
+            await service.add_warning("1", "2", "3", "Exported reason")
+            return await service.export_user_data("2", "1")
+
+        export = self.run(scenario)
+
+        assert [w["reason"] for w in export["warnings"]] == ["Exported reason"]
+        assert len(export["moderation_logs"]) == 1
+
+    def test_export_to_file_runs_off_the_event_loop(self):
+        """Test that the blocking file export runs on a worker thread."""
+        # The file export uses a sync session from the main session factory
+        SessionLocal.configure(bind=self.engine)
+        export = WarningService.export_user_data_to_file
+        threads = []
+
+        def recording_export(*args):
+            threads.append(threading.current_thread())
+            return export(*args)
+
+        async def scenario(service):
+            await service.add_warning("1", "2", "3", "Exported reason")
+            with patch.object(
+                WarningService,
+                "export_user_data_to_file",
+                autospec=True,
+                side_effect=recording_export,
+            ):
+                return await service.export_user_data_to_file("2", "1")
+
+        path = self.run(scenario)
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as export_file:
+                records = [json.loads(line) for line in export_file]
+        finally:
+            path.unlink()
+
+        assert threads[0].name.startswith("db")
+        assert [r["reason"] for r in records if r["type"] == "warning"] == [
+            "Exported reason",
+        ]
+
+    def test_concurrent_commands_interleave(self):
+        """Test that a slow command does not block other commands or the loop."""
+        with self.engine.begin() as conn:
+            conn.execute(
+                text(
+                    "CREATE TRIGGER slow_warning_insert AFTER INSERT ON warnings "
+                    "BEGIN SELECT slow_down(); END",
+                ),
+            )
+
+        async def scenario(service):
+            finished = []
+            ticks = 0
+
+            async def heartbeat():
+                nonlocal ticks
+                while True:
+                    await asyncio.sleep(0.01)
+                    ticks += 1
+
+            async def slow_warn():
+                await service.add_warning("1", "2", "3", "Slow reason")
+                finished.append("warn")
+
+            async def quick_read(user_id: str):
+                await service.get_user_warnings("4", user_id)
+                finished.append(f"read-{user_id}")
+
+            beat = asyncio.create_task(heartbeat())
+            warn = asyncio.create_task(slow_warn())
+            await asyncio.sleep(0.05)
+            start = time.perf_counter()
+            await asyncio.gather(*(quick_read(str(n)) for n in range(5)))
+            reads_elapsed = time.perf_counter() - start
+            await warn
+            beat.cancel()
+            return finished, ticks, reads_elapsed
+
+        finished, ticks, reads_elapsed = self.run(scenario, slow_inserts=True)
+
+        # The reads completed while the slow write was still in flight
+        assert finished[-1] == "warn"
+        assert reads_elapsed < self.SLOW_INSERT_SECONDS
+        # The event loop kept running throughout the slow write
+        assert ticks >= 10
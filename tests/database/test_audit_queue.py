@@ -0,0 +1,235 @@
+"""Tests for the write-behind audit log queue."""
+
+import stat
+import tempfile
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from project.database.audit_queue import (
+    MAX_SPOOL_ATTEMPTS,
+    AuditLogQueue,
+    get_audit_queue_stats,
+)
+from project.database.connection import Base, SessionLocal, engine
+from project.database.models import ModerationLog, SecureWarning, WarningCounter
+from project.database.services import WarningService
+
+
+def audit_rows(count: int, reason: str = "Queued reason") -> list[dict]:
+    """Build ``count`` audit rows for one member."""
+    return ModerationLog.bulk_values(
+        guild_id="1",
+        user_id="2",
+        moderator_id="3",
+        action_type="warn",
+        warning_ids=[None] * count,
+        reason=reason,
+    )
+
+
+class TestAuditLogQueue:
+    """Test batching, shutdown flush and spooling on a scratch database."""
+
+    def setup_method(self):
+        """Create a fresh database file for each test."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.engine = create_engine(f"sqlite:///{Path(self.tmp.name) / 'audit.db'}")
+        Base.metadata.create_all(bind=self.engine)
+        self.Session = sessionmaker(bind=self.engine)
+        self.spool_path = Path(self.tmp.name) / "audit_spool.ndjson"
+        self.queue = AuditLogQueue(
+            flush_interval_ms=60_000,
+            max_batch=10,
+            spool_path=self.spool_path,
+            session_factory=self.Session,
+        )
+
+    def teardown_method(self):
+        """Stop the queue and remove the database file."""
+        self.queue.close()
+        self.engine.dispose()
+        self.tmp.cleanup()
+
+    def log_count(self) -> int:
+        """Count stored audit rows."""
+        with self.Session() as session:
+            return session.query(ModerationLog).count()
+
+    def test_deferred_rows_follow_the_transaction(self):
+        """Test that rows are queued on commit and dropped on rollback."""
+        with self.Session() as session:
+            self.queue.defer(session, audit_rows(2))
+            session.rollback()
+            self.queue.defer(session, audit_rows(3))
+            session.commit()
+
+        assert self.queue.stats()["queue_depth"] == 3
+        assert self.log_count() == 0
+
+    def test_flush_is_one_bulk_insert(self):
+        """Test that queued rows are written by a single INSERT statement."""
+        self.queue.enqueue(audit_rows(5))
+        statements = []
+
+        def record(_conn, _cursor, statement, *_args):
+            statements.append(" ".join(statement.split()[:3]))
+
+        event.listen(self.engine, "before_cursor_execute", record)
+        try:
+            assert self.queue.flush() == 5
+        finally:
+            event.remove(self.engine, "before_cursor_execute", record)
+
+        # One insert for the logs, one upsert for the analytics rollups
+        assert statements == [
+            "INSERT INTO moderation_logs",
+            "INSERT INTO moderation_rollups",
+        ]
+        assert self.log_count() == 5
+        stats = self.queue.stats()
+        assert stats["queue_depth"] == 0
+        assert stats["flushed"] == 5
+        assert stats["flushes"] == 1
+        assert stats["last_flush_ms"] > 0
+
+    def test_full_batch_flushes_early(self):
+        """Test that reaching max_batch wakes the flush thread."""
+        self.queue.enqueue(audit_rows(10))
+
+        deadline = time.monotonic() + 5
+        while self.log_count() < 10 and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        assert self.log_count() == 10
+
+    def test_close_flushes_pending_rows(self):
+        """Test that shutdown writes rows still waiting for the interval."""
+        self.queue.enqueue(audit_rows(3))
+        self.queue.close()
+
+        assert self.log_count() == 3
+
+    def test_failed_flush_spools_and_replays(self):
+        """Test that rows survive a failed flush and are written later."""
+        self.queue.enqueue(audit_rows(2, reason="Spooled reason"))
+        with patch.object(
+            self.queue,
+            "session_factory",
+            side_effect=OperationalError("INSERT", {}, Exception("database is down")),
+        ):
+            assert self.queue.flush() == 0
+
+        assert stat.S_IMODE(self.spool_path.stat().st_mode) == 0o600
+        assert self.queue.stats()["spooled"] == 2
+        assert self.queue.stats()["failed_flushes"] == 1
+        assert self.log_count() == 0
+
+        self.queue.enqueue(audit_rows(1))
+        assert self.queue.flush() == 3
+
+        assert not self.spool_path.exists()
+        with self.Session() as session:
+            reasons = sorted(
+                log.get_decrypted_reason() for log in session.query(ModerationLog)
+            )
+        assert reasons == ["Queued reason", "Spooled reason", "Spooled reason"]
+
+    def test_bad_spooled_row_is_quarantined(self):
+        """Test that a row the database rejects does not block other rows."""
+        rows = audit_rows(2, reason="Spooled reason")
+        rows[1]["action_type"] = None  # Violates NOT NULL on every attempt
+        self.queue.enqueue(rows)
+        assert self.queue.flush() == 0
+        assert self.queue.stats()["spooled"] == 2
+
+        # The new batch and the good spooled row go in; the bad row stays
+        self.queue.enqueue(audit_rows(1))
+        assert self.queue.flush() == 2
+        assert self.spool_path.exists()
+
+        for _ in range(MAX_SPOOL_ATTEMPTS - 1):
+            self.queue.enqueue(audit_rows(1))
+            assert self.queue.flush() == 1
+
+        assert not self.spool_path.exists()
+        quarantine = self.queue.quarantine_path.read_text().splitlines()
+        assert len(quarantine) == 1
+        assert stat.S_IMODE(self.queue.quarantine_path.stat().st_mode) == 0o600
+        assert self.queue.stats()["quarantined"] == 1
+        assert self.log_count() == 2 + MAX_SPOOL_ATTEMPTS - 1
+
+    def test_stats_are_reported_only_when_enabled(self):
+        """Test the stats behind !health for an enabled and disabled queue."""
+        self.queue.enqueue(audit_rows(2))
+        with patch("project.database.audit_queue.audit_queue", self.queue):
+            assert get_audit_queue_stats()["queue_depth"] == 2
+        with patch("project.database.audit_queue.audit_queue", None):
+            assert get_audit_queue_stats() is None
+
+
+class TestServiceWriteBehind:
+    """Test WarningService with the write-behind queue enabled."""
+
+    @classmethod
+    def setup_class(cls):
+        """Setup test database."""
+        cls.Session = sessionmaker(bind=engine)
+        Base.metadata.create_all(bind=engine)
+
+    def setup_method(self):
+        """Enable a queue that only flushes when asked."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.queue = AuditLogQueue(
+            flush_interval_ms=60_000,
+            max_batch=1000,
+            spool_path=Path(self.tmp.name) / "audit_spool.ndjson",
+            session_factory=SessionLocal,
+        )
+        self.queue_patch = patch("project.database.services.audit_queue", self.queue)
+        self.queue_patch.start()
+
+    def teardown_method(self):
+        """Cleanup after each test."""
+        self.queue_patch.stop()
+        self.queue.close()
+        self.tmp.cleanup()
+        with self.Session() as session:
+            session.query(WarningCounter).delete()
+            session.query(ModerationLog).delete()
+            session.query(SecureWarning).delete()
+            session.commit()
+
+    def test_logs_are_written_behind(self):
+        """Test that audit rows reach the database only when flushed."""
+        service = WarningService()
+        first = service.add_warning("1", "2", "3", "First")
+        second = service.add_warning("1", "2", "3", "Second")
+        service.clear_user_warnings("1", "2", "3")
+
+        with self.Session() as session:
+            assert session.query(ModerationLog).count() == 0
+            assert session.query(SecureWarning).count() == 2
+
+        assert self.queue.flush() == 3
+        with self.Session() as session:
+            logs = session.query(ModerationLog).order_by(ModerationLog.id).all()
+            assert [log.warning_id for log in logs] == [first.id, second.id, None]
+            assert logs[2].get_decrypted_reason() == "Cleared 2 warnings"
+
+    def test_failed_action_queues_nothing(self):
+        """Test that a rolled back action leaves no queued audit rows."""
+        service = WarningService()
+        with (
+            patch.object(WarningCounter, "adjust", side_effect=RuntimeError("boom")),
+            pytest.raises(RuntimeError),
+        ):
+            service.add_warning("1", "2", "3", "Never stored")
+
+        assert self.queue.stats()["queue_depth"] == 0
+        assert self.queue.stats()["enqueued"] == 0
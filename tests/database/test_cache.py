@@ -0,0 +1,141 @@
+"""Tests for in-memory database caches."""
+
+import threading
+from unittest.mock import patch
+
+from project.database.cache import (
+    DecryptedReasonCache,
+    TTLCache,
+    WarningSummaryCache,
+)
+
+
+class TestTTLCache:
+    """Test the generic TTL + LRU cache."""
+
+    def test_lru_eviction(self):
+        """Test that the least recently used entry is evicted first."""
+        cache = TTLCache(max_entries=2, ttl_seconds=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert cache.stats()["evictions"] == 1
+
+    def test_ttl_expiry(self):
+        """Test that expired entries are misses."""
+        cache = TTLCache(max_entries=10, ttl_seconds=60)
+        with patch("project.database.cache.time.monotonic", return_value=0):
+            cache.set("a", 1)
+        with patch("project.database.cache.time.monotonic", return_value=61):
+            assert cache.get("a") is None
+
+        assert cache.stats()["entries"] == 0
+
+    def test_byte_budget(self):
+        """Test that the size budget evicts entries."""
+        cache = TTLCache(max_entries=10, ttl_seconds=60, max_bytes=10, sizeof=len)
+        cache.set("a", "x" * 6)
+        cache.set("b", "y" * 6)
+
+        assert cache.get("a") is None
+        assert cache.stats()["bytes"] == 6
+
+    def test_hit_miss_counters(self):
+        """Test hit ratio reporting."""
+        cache = TTLCache(max_entries=10, ttl_seconds=60)
+        cache.set("a", 1)
+        cache.get("a")
+        cache.get("missing")
+
+        stats = cache.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["hit_ratio"] == 0.5
+
+
+class TestDecryptedReasonCache:
+    """Test the decrypted reason cache."""
+
+    def test_version_mismatch_is_miss(self):
+        """Test that a newer warning version does not see the old entry."""
+        cache = DecryptedReasonCache()
+        cache.put(1, 1, "reason")
+
+        assert cache.get(1, 1) == "reason"
+        assert cache.get(1, 2) is None
+        assert cache.stats()["misses"] == 1
+
+    def test_eviction_wipes_plaintext(self):
+        """Test that invalidated plaintexts are zeroed in memory."""
+        stored = []
+
+        class RecordedPlaintext(bytearray):
+            def __init__(self, *args):
+                super().__init__(*args)
+                stored.append(self)
+
+        cache = DecryptedReasonCache()
+        with patch("project.database.cache.bytearray", RecordedPlaintext, create=True):
+            cache.put(1, 1, "secret reason")
+
+        cache.invalidate(1)
+
+        assert stored == [bytearray(len("secret reason"))]
+        assert cache.get(1, 1) is None
+
+    def test_get_decodes_under_the_lock(self):
+        """Test that a hit is decoded before an eviction can wipe it."""
+        cache = DecryptedReasonCache()
+        evictions = []
+        blocked = []
+
+        class CheckedPlaintext(bytearray):
+            def decode(self, *args):
+                # An invalidation racing the read has to wait for the decode
+                eviction = threading.Thread(target=cache.invalidate, args=(1,))
+                eviction.start()
+                eviction.join(0.1)
+                blocked.append(eviction.is_alive())
+                evictions.append(eviction)
+                return super().decode(*args)
+
+        with patch("project.database.cache.bytearray", CheckedPlaintext, create=True):
+            cache.put(1, 1, "secret reason")
+
+        assert cache.get(1, 1) == "secret reason"
+        assert blocked == [True]
+        evictions[0].join()
+        assert cache.get(1, 1) is None
+
+    @patch.dict("os.environ", {"REASON_CACHE_ENABLED": "false"})
+    def test_disabled_by_default(self):
+        """Test that the cache is opt-in."""
+        assert DecryptedReasonCache.from_env() is None
+
+
+class TestWarningSummaryCache:
+    """Test the per-member summary cache."""
+
+    def test_read_through_and_invalidate(self):
+        """Test that summaries are cached until their member is invalidated."""
+        cache = WarningSummaryCache()
+        cache.put("a", "summary-a", cache.generation)
+        cache.put("b", "summary-b", cache.generation)
+        cache.invalidate(["a"])
+
+        assert cache.get("a") is None
+        assert cache.get("b") == "summary-b"
+        assert cache.stats()["hit_ratio"] == 0.5
+
+    def test_stale_load_is_not_cached(self):
+        """Test that a summary loaded before a write is discarded."""
+        cache = WarningSummaryCache()
+        generation = cache.generation
+        cache.invalidate(["a"])
+        cache.put("a", "stale", generation)
+
+        assert cache.get("a") is None
@@ -0,0 +1,190 @@
+"""Tests for engine creation and connection pool metrics."""
+
+import tempfile
+from pathlib import Path
+
+import pytest
+from sqlalchemy import exc, text
+from sqlalchemy.pool import StaticPool
+
+from project.database.cleanup import DatabaseCleanup
+from project.database.connection import (
+    MeteredAsyncQueuePool,
+    MeteredQueuePool,
+    PoolMetrics,
+    create_db_engine,
+    engine_options,
+)
+from project.database.settings import DatabasePoolConfig, SQLiteConfig
+
+
+class TestEngineOptions:
+    """Test how pool settings are applied per backend."""
+
+    def test_server_database_uses_configured_pool(self):
+        """Test that pool settings reach a server database engine."""
+        pool = DatabasePoolConfig(
+            pool_size=20,
+            max_overflow=5,
+            pool_recycle=600,
+            pool_timeout=2.5,
+        )
+
+        options = engine_options("postgresql://db/bot", pool, is_async=True)
+
+        assert options["poolclass"] is MeteredAsyncQueuePool
+        assert options["pool_size"] == 20
+        assert options["max_overflow"] == 5
+        assert options["pool_recycle"] == 600
+        assert options["pool_timeout"] == 2.5
+        assert options["pool_pre_ping"] is True
+
+    def test_sqlite_pre_ping_defaults_off(self):
+        """Test that pre-ping is only enabled by default for servers."""
+        options = engine_options("sqlite:///bot.db", DatabasePoolConfig())
+        forced = engine_options(
+            "sqlite:///bot.db",
+            DatabasePoolConfig(pool_pre_ping=True),
+        )
+
+        assert options["poolclass"] is MeteredQueuePool
+        assert options["pool_pre_ping"] is False
+        assert forced["pool_pre_ping"] is True
+
+    def test_memory_and_async_sqlite_keep_their_pools(self):
+        """Test that in-memory and aiosqlite engines ignore pool sizing."""
+        memory = engine_options("sqlite:///:memory:", DatabasePoolConfig())
+        async_file = engine_options(
+            "sqlite:///bot.db",
+            DatabasePoolConfig(),
+            is_async=True,
+        )
+
+        assert memory["poolclass"] is StaticPool
+        assert "pool_size" not in memory
+        assert async_file == {"echo": False}
+
+
+class TestPoolMetrics:
+    """Test metrics collected from a small pool on a scratch database."""
+
+    def setup_method(self):
+        """Create a pool of two connections plus one overflow."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.metrics = PoolMetrics()
+        self.engine = create_db_engine(
+            f"sqlite:///{Path(self.tmp.name) / 'pool.db'}",
+            DatabasePoolConfig(pool_size=2, max_overflow=1, pool_timeout=0.05),
+            self.metrics,
+        )
+
+    def teardown_method(self):
+        """Remove the scratch database."""
+        self.engine.dispose()
+        self.tmp.cleanup()
+
+    def test_checkouts_overflow_and_timeouts(self):
+        """Test occupancy, overflow and timeout counters under exhaustion."""
+        connections = [self.engine.connect() for _ in range(3)]
+
+        stats = self.metrics.stats()
+        assert stats["pool_size"] == 2
+        assert stats["checked_out"] == 3
+        assert stats["overflow"] == 1
+        assert stats["overflow_events"] == 1
+
+        with pytest.raises(exc.TimeoutError):
+            self.engine.connect()
+        for connection in connections:
+            connection.close()
+
+        stats = self.metrics.stats()
+        assert stats["checked_out"] == 0
+        assert stats["peak_checked_out"] == 3
+        assert stats["checkouts"] == 3
+        assert stats["timeouts"] == 1
+        assert 0 < stats["p95_wait_ms"] <= stats["max_wait_ms"]
+
+    def test_metrics_survive_dispose(self):
+        """Test that the recreated pool keeps reporting checkout waits."""
+        self.engine.dispose()
+        with self.engine.connect():
+            pass
+
+        assert self.engine.pool.metrics is self.metrics
+        assert self.metrics.stats()["checkouts"] == 1
+        assert self.metrics.stats()["avg_wait_ms"] > 0
+
+
+class TestSQLiteProfile:
+    """Test the pragmas applied to new SQLite connections."""
+
+    def setup_method(self):
+        """Create a scratch database file."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.url = f"sqlite:///{Path(self.tmp.name) / 'profile.db'}"
+
+    def teardown_method(self):
+        """Remove the scratch database."""
+        self.tmp.cleanup()
+
+    def pragma(self, engine, name: str):
+        """Read one pragma on a pooled connection."""
+        with engine.connect() as conn:
+            return conn.execute(text(f"PRAGMA {name}")).scalar()
+
+    def test_profile_is_applied_on_connect(self):
+        """Test that every new connection gets the tuned settings."""
+        engine = create_db_engine(
+            self.url,
+            sqlite=SQLiteConfig(busy_timeout_ms=1234, cache_size_kib=2048),
+        )
+        try:
+            assert self.pragma(engine, "journal_mode") == "wal"
+            assert self.pragma(engine, "synchronous") == 1  # NORMAL
+            assert self.pragma(engine, "busy_timeout") == 1234
+            assert self.pragma(engine, "cache_size") == -2048
+            assert self.pragma(engine, "temp_store") == 2  # MEMORY
+            assert self.pragma(engine, "mmap_size") == SQLiteConfig().mmap_size
+        finally:
+            engine.dispose()
+
+    def test_profile_can_be_disabled(self):
+        """Test that disabling the profile keeps SQLite's defaults."""
+        engine = create_db_engine(self.url, sqlite=SQLiteConfig(enabled=False))
+        try:
+            assert self.pragma(engine, "journal_mode") == "delete"
+        finally:
+            engine.dispose()
+
+    def test_in_memory_skips_file_pragmas(self):
+        """Test that in-memory databases only get per-connection pragmas."""
+        pragmas = SQLiteConfig().pragmas(in_memory=True)
+
+        assert [pragma.split()[1] for pragma in pragmas] == [
+            "busy_timeout",
+            "cache_size",
+            "temp_store",
+        ]
+
+    def test_invalid_keyword_is_rejected(self):
+        """Test that pragma keywords cannot carry extra SQL."""
+        with pytest.raises(ValueError, match="Invalid SQLite pragma"):
+            SQLiteConfig(journal_mode="WAL; DROP TABLE warnings").pragmas()
+
+    def test_optimize_checkpoints_the_wal(self):
+        """Test that maintenance empties the write-ahead log."""
+        engine = create_db_engine(self.url)
+        wal = Path(self.tmp.name) / "profile.db-wal"
+        with engine.begin() as conn:
+            conn.execute(text("CREATE TABLE t (x)"))
+            conn.execute(text("INSERT INTO t VALUES (1)"))
+        assert wal.stat().st_size > 0
+        cleanup = DatabaseCleanup()
+        cleanup.db.bind = engine
+        try:
+            assert cleanup.optimize_sqlite() == {"checkpoint_busy": False}
+            assert wal.stat().st_size == 0
+        finally:
+            cleanup.close()
+            engine.dispose()
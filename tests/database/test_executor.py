@@ -0,0 +1,181 @@
+"""Tests for the bounded database executor."""
+
+import asyncio
+import threading
+import time
+from contextvars import ContextVar
+
+import pytest
+
+from project.database.executor import (
+    AdmissionLimiter,
+    DatabaseBusyError,
+    DatabaseExecutor,
+    LatencyHistogram,
+)
+
+
+request_id: ContextVar[str | None] = ContextVar("request_id", default=None)
+
+
+class TestLatencyHistogram:
+    """Test bucketed latency recording."""
+
+    def test_buckets_and_percentiles(self):
+        """Test that samples land in their buckets and p95 uses the bounds."""
+        histogram = LatencyHistogram()
+        for _ in range(19):
+            histogram.observe(0.5)
+        histogram.observe(80)
+
+        stats = histogram.stats()
+
+        assert stats["count"] == 20
+        assert stats["buckets"]["le_1ms"] == 19
+        assert stats["buckets"]["le_100ms"] == 1
+        assert stats["p95_ms"] == 1.0
+        assert stats["max_ms"] == 80.0
+        assert histogram.percentile(1.0) == 80.0
+
+
+class TestDatabaseExecutor:
+    """Test running work, load shedding and metrics."""
+
+    def setup_method(self):
+        """Create a one-thread executor with room for one waiting job."""
+        self.executor = DatabaseExecutor(max_workers=1, max_queue=1)
+        self.release = threading.Event()
+
+    def teardown_method(self):
+        """Unblock workers and stop the executor."""
+        self.release.set()
+        self.executor.shutdown()
+
+    def block(self) -> str:
+        """Hold a worker until the test releases it."""
+        self.release.wait(5)
+        return "done"
+
+    def test_runs_in_callers_context(self):
+        """Test results, exceptions and context variables reach the caller."""
+
+        def operation(value: int) -> tuple[int, str | None]:
+            return value * 2, request_id.get()
+
+        async def scenario():
+            request_id.set("cmd-1")
+            assert await self.executor.run(operation, 21) == (42, "cmd-1")
+            with pytest.raises(ZeroDivisionError):
+                await self.executor.run(lambda: 1 / 0)
+
+        asyncio.run(scenario())
+
+        stats = self.executor.stats()
+        assert stats["completed"] == 2
+        assert stats["execution"]["count"] == 2
+        assert stats["queued"] == stats["running"] == 0
+
+    def test_rejects_work_when_queue_is_full(self):
+        """Test that jobs beyond the queue bound fail fast and are counted."""
+        running = self.executor.submit(self.block)
+        waiting = self.executor.submit(self.block)
+
+        with pytest.raises(DatabaseBusyError):
+            self.executor.submit(self.block)
+
+        self.release.set()
+        assert running.result(5) == waiting.result(5) == "done"
+        stats = self.executor.stats()
+        assert stats["rejected"] == 1
+        assert stats["completed"] == 2
+        assert stats["peak_queued"] >= 1
+        assert stats["queue_wait"]["count"] == 2
+
+    def test_cancelled_job_frees_its_queue_slot(self):
+        """Test that a job cancelled while waiting stops counting as queued."""
+        self.executor.submit(self.block)
+        waiting = self.executor.submit(self.block)
+
+        assert waiting.cancel()
+        assert self.executor.stats()["queued"] == 0
+        self.executor.submit(self.block)
+
+    def test_event_loop_stays_responsive_under_burst(self):
+        """Test that a saturated executor neither blocks nor stalls the loop."""
+
+        async def scenario() -> tuple[list, float]:
+            jobs = [
+                asyncio.ensure_future(self.executor.run(self.block))
+                for _ in range(20)
+            ]
+            start = time.perf_counter()
+            await asyncio.sleep(0.01)
+            lag = time.perf_counter() - start
+            self.release.set()
+            return await asyncio.gather(*jobs, return_exceptions=True), lag
+
+        results, lag = asyncio.run(scenario())
+
+        assert results.count("done") == 2
+        assert sum(isinstance(r, DatabaseBusyError) for r in results) == 18
+        assert lag < 0.5
+
+
+class TestAdmissionLimiter:
+    """Test bounded admission of async database operations."""
+
+    def test_waits_in_order_then_rejects(self):
+        """Test that operations past the active and queue bounds fail fast."""
+        limiter = AdmissionLimiter(max_active=1, max_queue=1)
+        order = []
+
+        async def operation(name: str, release: asyncio.Event) -> str:
+            async with limiter.admit():
+                order.append(name)
+                await release.wait()
+            return name
+
+        async def scenario():
+            release = asyncio.Event()
+            running = asyncio.create_task(operation("running", release))
+            waiting = asyncio.create_task(operation("waiting", release))
+            await asyncio.sleep(0)
+            with pytest.raises(DatabaseBusyError):
+                await operation("rejected", release)
+            stats = limiter.stats()
+            release.set()
+            return await asyncio.gather(running, waiting), stats
+
+        results, busy = asyncio.run(scenario())
+
+        assert results == order == ["running", "waiting"]
+        assert busy["active"] == busy["waiting"] == 1
+        stats = limiter.stats()
+        assert stats["active"] == stats["waiting"] == 0
+        assert stats["admitted"] == 2
+        assert stats["rejected"] == 1
+        assert stats["queue_wait"]["count"] == 2
+
+    def test_cancelled_waiter_frees_its_queue_slot(self):
+        """Test that a cancelled waiter neither waits nor keeps a slot."""
+        limiter = AdmissionLimiter(max_active=1, max_queue=1)
+
+        async def hold(release: asyncio.Event) -> None:
+            async with limiter.admit():
+                await release.wait()
+
+        async def scenario():
+            release = asyncio.Event()
+            running = asyncio.create_task(hold(release))
+            waiting = asyncio.create_task(hold(release))
+            await asyncio.sleep(0)
+            waiting.cancel()
+            await asyncio.sleep(0)
+            assert limiter.stats()["waiting"] == 0
+            release.set()
+            await running
+            async with limiter.admit():
+                return limiter.stats()["active"]
+
+        assert asyncio.run(scenario()) == 1
+        assert limiter.stats()["active"] == 0
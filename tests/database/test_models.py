@@ -7,8 +7,15 @@ from unittest.mock import patch
 import pytest
 from sqlalchemy.orm import sessionmaker
 
+from project.database.cache import DecryptedReasonCache
 from project.database.connection import Base, engine
-from project.database.models import GDPRRequest, ModerationLog, SecureWarning
+from project.database.models import (
+    GDPRRequest,
+    ModerationLog,
+    SecureWarning,
+    WarningCounter,
+)
+from project.database.security import security_manager
 
 
 class TestDatabaseModels:
@@ -221,3 +228,119 @@ class TestDatabaseModels:
         assert request.status == "pending"
         assert request.created_at is not None
         assert request.completed_at is None
+
+    def test_decrypt_reasons_uses_cache(self):
+        """Test that cached reasons skip decryption on repeated reads."""
+        warnings = [
+            SecureWarning.create_warning(
+                guild_id="123456789012345678",
+                user_id="987654321098765432",
+                moderator_id="555666777888999000",
+                reason=f"Cached reason {i}",
+            )
+            for i in range(3)
+        ]
+        self.session.add_all(warnings)
+        self.session.commit()
+
+        with patch("project.database.cache.reason_cache", DecryptedReasonCache()):
+            first = SecureWarning.decrypt_reasons(warnings)
+            with patch.object(
+                security_manager,
+                "decrypt_many",
+                return_value=[],
+            ) as decrypt_many:
+                second = SecureWarning.decrypt_reasons(warnings)
+
+        assert first == second == [f"Cached reason {i}" for i in range(3)]
+        assert list(decrypt_many.call_args.args[0]) == []
+
+
+class TestWarningCounter:
+    """Test materialized active-warning counters."""
+
+    @classmethod
+    def setup_class(cls):
+        """Setup test database."""
+        cls.Session = sessionmaker(bind=engine)
+        Base.metadata.create_all(bind=engine)
+
+    def setup_method(self):
+        """Setup for each test."""
+        self.session = self.Session()
+
+    def teardown_method(self):
+        """Cleanup after each test."""
+        self.session.query(WarningCounter).delete()
+        self.session.query(SecureWarning).delete()
+        self.session.commit()
+        self.session.close()
+
+    def add_warnings(self, user_id: str, count: int, deleted: int = 0) -> str:
+        """Insert warnings for a member and return their lookup key."""
+        warnings = [
+            SecureWarning.create_warning("1", user_id, "3", f"Reason {i}")
+            for i in range(count)
+        ]
+        self.session.add_all(warnings)
+        self.session.flush()
+        for warning in warnings[:deleted]:
+            warning.soft_delete()
+        self.session.flush()
+        return security_manager.create_lookup_key("1", user_id)
+
+    def test_adjust_seeds_from_base_table(self):
+        """Test that the first adjustment seeds the counter from history."""
+        lookup_key = self.add_warnings("2", 3, deleted=1)
+
+        assert WarningCounter.adjust(self.session, lookup_key, 1) == 2
+        assert WarningCounter.adjust(self.session, lookup_key, 1) == 3
+        assert WarningCounter.adjust(self.session, lookup_key, -2) == 1
+        assert WarningCounter.get_count(self.session, lookup_key) == 1
+
+    def test_seeding_adds_to_a_concurrently_seeded_counter(self):
+        """Test that seeds racing another transaction's seed add their delta."""
+        single = self.add_warnings("2", 2)
+        first, second = self.add_warnings("4", 1), self.add_warnings("5", 1)
+        # The race only exists between the missed update and the seed insert
+        seed = WarningCounter._seed.__func__  # noqa: SLF001
+
+        def seeded_meanwhile(cls, db, deltas):
+            # Another transaction seeds the counters after our update missed
+            db.add_all(cls(lookup_key=key, active_count=5) for key in deltas)
+            db.flush()
+            return seed(cls, db, deltas)
+
+        with patch.object(WarningCounter, "_seed", classmethod(seeded_meanwhile)):
+            assert WarningCounter.adjust(self.session, single, 1) == 6
+            WarningCounter.adjust_many(self.session, {first: 1, second: -1})
+
+        self.session.expire_all()
+        counts = dict(
+            self.session.query(WarningCounter.lookup_key, WarningCounter.active_count),
+        )
+        assert counts == {single: 6, first: 6, second: 4}
+
+    def test_get_count_without_counter(self):
+        """Test that members without a counter are counted from the base table."""
+        lookup_key = self.add_warnings("2", 2)
+
+        assert WarningCounter.get_count(self.session, lookup_key) == 2
+        assert self.session.get(WarningCounter, lookup_key) is None
+
+    def test_rebuild_repairs_drift(self):
+        """Test that rebuild fixes wrong, missing and stale counters."""
+        drifted = self.add_warnings("2", 2)
+        missing = self.add_warnings("4", 3, deleted=1)
+        self.session.add(WarningCounter(lookup_key=drifted, active_count=7))
+        self.session.add(WarningCounter(lookup_key="f" * 16, active_count=1))
+        self.session.flush()
+
+        assert WarningCounter.rebuild(self.session) == 3
+        self.session.flush()
+
+        counts = dict(
+            self.session.query(WarningCounter.lookup_key, WarningCounter.active_count),
+        )
+        assert counts == {drifted: 2, missing: 2, "f" * 16: 0}
+        assert WarningCounter.rebuild(self.session) == 0
@@ -0,0 +1,305 @@
+"""Tests for the monthly partitions of moderation_logs on SQLite."""
+
+import tempfile
+from datetime import UTC, date, datetime, timedelta
+from pathlib import Path
+
+from alembic import command
+from sqlalchemy import create_engine, insert, inspect, select, text, update
+from sqlalchemy.orm import Session
+
+from project.database.cleanup import DatabaseCleanup
+from project.database.connection import Base, SessionLocal, engine
+from project.database.models import ModerationLog, SecureWarning
+from project.database.partitions import (
+    DEFAULT_PARTITION,
+    Partition,
+    add_months,
+    ensure_partitions,
+    is_partitioned,
+    list_partitions,
+    purge_before,
+)
+from project.database.schema import alembic_config, upgrade_database
+from project.database.security import (
+    HASH_SCHEME_ARGON2,
+    Argon2IDHasher,
+    security_manager,
+)
+from project.database.services import WarningService
+
+
+GUILD_ID = "123456789012345678"
+USER_ID = "987654321098765432"
+MODERATOR_ID = "555666777888999000"
+
+
+def log_row(created_at: datetime, warning_id: int | None = None) -> dict:
+    """One audit row written at ``created_at``."""
+    row = ModerationLog.bulk_values(
+        guild_id=GUILD_ID,
+        user_id=USER_ID,
+        moderator_id=MODERATOR_ID,
+        action_type="warn",
+        warning_ids=[warning_id],
+        reason="Partitioned reason",
+    )[0]
+    row["created_at"] = created_at
+    return row
+
+
+class TestLogPartitions:
+    """Test routing, partition upkeep and retention on a migrated database."""
+
+    def setup_method(self):
+        """Migrate a scratch database, which partitions moderation_logs."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.engine = create_engine(f"sqlite:///{Path(self.tmp.name) / 'logs.db'}")
+        upgrade_database(self.engine)
+        self.current = Partition.of(datetime.now(UTC))
+
+    def teardown_method(self):
+        """Restore the default bind and remove the database file."""
+        SessionLocal.configure(bind=engine)
+        self.engine.dispose()
+        self.tmp.cleanup()
+
+    def write(self, *rows: dict) -> None:
+        """Insert rows through the moderation_logs view."""
+        with self.engine.begin() as connection:
+            connection.execute(insert(ModerationLog.__table__), list(rows))
+
+    def count(self, table_name: str) -> int:
+        """Rows stored in one table."""
+        # Table names are the tests' own constants and partition names
+        with self.engine.connect() as connection:
+            return connection.scalar(text(f"SELECT count(*) FROM {table_name}"))  # noqa: S608
+
+    def test_partitions_match_the_model(self):
+        """Test that every month table has the model's columns and indexes."""
+        reference = create_engine("sqlite://")
+        Base.metadata.create_all(bind=reference)
+        expected = inspect(reference)
+        actual = inspect(self.engine)
+
+        def describe(inspector, table_name: str, suffix: str = "") -> tuple:
+            columns = [
+                (c["name"], str(c["type"]), c["nullable"])
+                for c in inspector.get_columns(table_name)
+            ]
+            indexes = {
+                (index["name"].removesuffix(suffix), tuple(index["column_names"]))
+                for index in inspector.get_indexes(table_name)
+            }
+            return columns, indexes
+
+        for name in (self.current.name, DEFAULT_PARTITION):
+            suffix = "_" + name.removeprefix("moderation_logs_")
+            assert describe(actual, name, suffix) == describe(
+                expected,
+                "moderation_logs",
+            )
+
+    def test_writes_go_to_their_month(self):
+        """Test that inserts land in their month and ids rise across months."""
+        with self.engine.connect() as connection:
+            assert is_partitioned(connection)
+            months = list_partitions(connection)
+        assert months[0] == self.current
+        assert months[-1].start == add_months(self.current.start, 3)
+
+        now = datetime.now(UTC)
+        next_month = datetime.combine(self.current.end, datetime.min.time(), UTC)
+        unpartitioned = datetime(2001, 1, 15, tzinfo=UTC)
+        self.write(log_row(now), log_row(next_month), log_row(unpartitioned))
+
+        assert self.count(self.current.name) == 1
+        assert self.count(months[1].name) == 1
+        assert self.count(DEFAULT_PARTITION) == 1
+
+        with self.engine.connect() as connection:
+            logs = connection.execute(
+                select(ModerationLog.id, ModerationLog.created_at).order_by(
+                    ModerationLog.id,
+                ),
+            ).all()
+        assert next(iter(logs)).created_at.year == 2001
+        assert logs[1].id > self.current.first_id
+        assert logs[2].id > months[1].first_id
+
+    def test_orm_inserts_read_back_their_ids(self):
+        """Test that logs added through the ORM get the ids they are stored with."""
+        with Session(self.engine) as session:
+            logs = [
+                ModerationLog.create_log(GUILD_ID, USER_ID, MODERATOR_ID, "warn")
+                for _ in range(2)
+            ]
+            for log in logs:
+                session.add(log)
+                session.flush()
+            session.commit()
+            ids = [log.id for log in logs]
+
+            stored = session.scalars(
+                select(ModerationLog.id).order_by(ModerationLog.id),
+            ).all()
+            assert ids == stored
+            assert ids[0] > self.current.first_id
+            assert session.get(ModerationLog, ids[1]) is logs[1]
+
+    def test_date_range_reads_search_each_month(self):
+        """Test that a created_at range is an index search in every table."""
+        with self.engine.connect() as connection:
+            plan = connection.execute(
+                text(
+                    "EXPLAIN QUERY PLAN SELECT count(*) FROM moderation_logs "
+                    "WHERE created_at < :cutoff",
+                ),
+                {"cutoff": "2001-01-01"},
+            ).all()
+
+        details = [row[-1] for row in plan]
+        assert not [d for d in details if d.startswith("SCAN moderation_logs_")]
+        assert any(
+            self.current.name in d and "idx_log_created_at" in d for d in details
+        )
+
+    def test_new_partition_takes_its_rows_from_the_default(self):
+        """Test that creating a late partition moves its rows out of default."""
+        later = Partition(add_months(self.current.start, 6))
+        self.write(log_row(datetime.combine(later.start, datetime.min.time(), UTC)))
+        assert self.count(DEFAULT_PARTITION) == 1
+
+        with self.engine.begin() as connection:
+            created = ensure_partitions(connection, 0, today=later.start)
+            assert ensure_partitions(connection, 0, today=later.start) == []
+
+        assert created == [later.name]
+        assert self.count(DEFAULT_PARTITION) == 0
+        assert self.count(later.name) == 1
+        assert self.count("moderation_logs") == 1
+
+        # The view's triggers now route the month to the new table
+        self.write(log_row(datetime.combine(later.start, datetime.min.time(), UTC)))
+        assert self.count(later.name) == 2
+
+    def test_purge_drops_whole_months(self):
+        """Test that retention drops old months and deletes only the rest."""
+        old = Partition(add_months(self.current.start, -3))
+        with self.engine.begin() as connection:
+            ensure_partitions(connection, months_ahead=3, today=old.start)
+        start = datetime.combine(old.start, datetime.min.time(), UTC)
+        self.write(
+            *(log_row(start + timedelta(days=day)) for day in (0, 1)),
+            *(log_row(start + timedelta(days=40 + day)) for day in (0, 1, 10)),
+        )
+
+        # Cuts through the second month, after two of its three rows
+        cutoff = start + timedelta(days=45)
+        with self.engine.begin() as connection:
+            result = purge_before(connection, cutoff)
+
+        assert result.dropped == [old.name]
+        assert result.deleted == 2
+        assert self.count("moderation_logs") == 1
+        with self.engine.connect() as connection:
+            assert old not in list_partitions(connection)
+        # The view no longer reads the dropped table
+        self.write(log_row(datetime.now(UTC)))
+        assert self.count("moderation_logs") == 2
+
+    def test_services_update_logs_through_the_view(self):
+        """Test re-keying and hard deletes, which update logs by id."""
+        SessionLocal.configure(bind=self.engine)
+        # Rows must verify against the shared manager's pepper
+        legacy = Argon2IDHasher(security_manager._pepper)  # noqa: SLF001
+        with SessionLocal() as session:
+            warning = SecureWarning(
+                guild_id_hash=legacy.hash(GUILD_ID),
+                user_id_hash=legacy.hash(USER_ID),
+                moderator_id_hash=legacy.hash(MODERATOR_ID),
+                hash_scheme=HASH_SCHEME_ARGON2,
+                reason_encrypted=security_manager.encrypt_to_bytes("Legacy"),
+                lookup_key=security_manager.create_lookup_key(GUILD_ID, USER_ID),
+            )
+            session.add(warning)
+            session.commit()
+            row = log_row(datetime.now(UTC), warning.id)
+            row.update(
+                guild_id_hash=legacy.hash(GUILD_ID),
+                user_id_hash=legacy.hash(USER_ID),
+                moderator_id_hash=legacy.hash(MODERATOR_ID),
+                hash_scheme=HASH_SCHEME_ARGON2,
+            )
+            session.execute(insert(ModerationLog.__table__), [row])
+            session.commit()
+            warning_id = warning.id
+
+        rekeyed = WarningService().rekey_legacy_hashes(
+            GUILD_ID,
+            USER_ID,
+            [MODERATOR_ID],
+        )
+        assert rekeyed == 1
+        export = WarningService().export_user_data(USER_ID, GUILD_ID)
+        assert len(export["moderation_logs"]) == 1
+
+        with SessionLocal() as session:
+            session.execute(
+                update(SecureWarning)
+                .where(SecureWarning.id == warning_id)
+                .values(is_deleted=True, deleted_at=datetime(2001, 1, 1, tzinfo=UTC)),
+            )
+            session.commit()
+        cleanup = DatabaseCleanup()
+        try:
+            assert cleanup.hard_delete_old_soft_deleted(90) == 1
+        finally:
+            cleanup.close()
+
+        with SessionLocal() as session:
+            log = session.scalars(select(ModerationLog)).one()
+            assert log.hash_scheme == security_manager.hash_scheme
+            assert log.user_id_hash == security_manager.hash_discord_id(USER_ID)
+            assert log.warning_id is None
+
+    def test_downgrade_keeps_the_logs(self):
+        """Test that reverting the partitioning merges the rows back."""
+        self.write(
+            log_row(datetime.now(UTC)),
+            log_row(datetime(2001, 1, 1, tzinfo=UTC)),
+        )
+
+        config = alembic_config()
+        with self.engine.begin() as connection:
+            config.attributes["connection"] = connection
+            command.downgrade(config, "0003_partial_indexes")
+
+        with self.engine.connect() as connection:
+            assert not is_partitioned(connection)
+            assert not list_partitions(connection)
+        assert self.count("moderation_logs") == 2
+
+
+class TestUnpartitionedLogs:
+    """Test that a create_all() database keeps its single table."""
+
+    def test_purge_deletes_rows(self):
+        """Test that retention falls back to a DELETE."""
+        scratch = create_engine("sqlite://")
+        Base.metadata.create_all(bind=scratch)
+        with scratch.begin() as connection:
+            connection.execute(
+                insert(ModerationLog.__table__),
+                [
+                    log_row(datetime(2001, 1, 1, tzinfo=UTC)),
+                    log_row(datetime.now(UTC)),
+                ],
+            )
+
+            assert not is_partitioned(connection)
+            assert ensure_partitions(connection, today=date(2001, 1, 1)) == []
+            result = purge_before(connection, datetime(2002, 1, 1, tzinfo=UTC))
+
+        assert result.dropped == []
+        assert result.deleted == 1
@@ -0,0 +1,336 @@
+"""Query plan regression tests for WarningService and DatabaseCleanup.
+
+Every SELECT, UPDATE and DELETE the services issue is captured and run
+through SQLite's ``EXPLAIN QUERY PLAN`` on a seeded, analyzed database. A
+plain ``SCAN <table>`` step means a full table scan and fails the test.
+"""
+
+import re
+import tempfile
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.orm import sessionmaker
+
+from project.database.analytics import AnalyticsService
+from project.database.cleanup import DatabaseCleanup
+from project.database.connection import Base
+from project.database.models import ModerationLog, SecureWarning, WarningCounter
+from project.database.security import security_manager
+from project.database.services import WarningService
+
+
+# Any "SCAN <table>" step reads the whole table, directly or through an index
+# ("SCAN TABLE <table>" before SQLite 3.36); "SEARCH" steps are index lookups.
+# The schema table is small and is read to detect partitioned audit logs.
+FULL_SCAN = re.compile(r"^SCAN (?:TABLE )?(?!CONSTANT ROW|sqlite_master\b)(\w+)")
+
+# Statements worth planning; INSERTs without a SELECT have no access path
+PLANNED_STATEMENTS = ("SELECT", "UPDATE", "DELETE", "WITH")
+
+GUILD_ID = "123456789012345678"
+OTHER_GUILD_ID = "876543210987654321"
+MODERATOR_ID = "555666777888999000"
+MEMBERS = 20
+WARNINGS_PER_MEMBER = 10
+
+
+class QueryRecorder:
+    """Collect the SQL and parameters an engine executes."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.queries: list[tuple[str, tuple]] = []
+
+    def _record(self, _conn, _cursor, statement, parameters, _context, executemany):
+        if not executemany and statement.lstrip().upper().startswith(
+            PLANNED_STATEMENTS,
+        ):
+            self.queries.append((statement, parameters))
+
+    def __enter__(self):
+        event.listen(self.engine, "before_cursor_execute", self._record)
+        return self
+
+    def __exit__(self, *_exc):
+        event.remove(self.engine, "before_cursor_execute", self._record)
+
+
+class TestQueryPlans:
+    """Assert that no service or cleanup query falls back to a table scan."""
+
+    @classmethod
+    def setup_class(cls):
+        """Seed and analyze a scratch database shared by every test."""
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.engine = create_engine(f"sqlite:///{Path(cls.tmp.name) / 'plans.db'}")
+        Base.metadata.create_all(bind=cls.engine)
+        cls.Session = sessionmaker(
+            bind=cls.engine,
+            autoflush=False,
+            expire_on_commit=False,
+        )
+        cls._seed()
+
+    @classmethod
+    def teardown_class(cls):
+        """Remove the scratch database."""
+        cls.engine.dispose()
+        cls.tmp.cleanup()
+
+    @classmethod
+    def _seed(cls):
+        """Insert warnings and logs for several members in two guilds."""
+        now = datetime.now(UTC)
+        reason = security_manager.encrypt_to_bytes("Seeded reason")
+        warnings = []
+        for guild_id in (GUILD_ID, OTHER_GUILD_ID):
+            for member in range(MEMBERS):
+                user_id = str(1000 + member)
+                for n in range(WARNINGS_PER_MEMBER):
+                    deleted = n % 3 == 0
+                    warnings.append(
+                        {
+                            "guild_id_hash": security_manager.hash_discord_id(
+                                guild_id,
+                            ),
+                            "user_id_hash": security_manager.hash_discord_id(user_id),
+                            "moderator_id_hash": security_manager.hash_discord_id(
+                                MODERATOR_ID,
+                            ),
+                            "hash_scheme": security_manager.hash_scheme,
+                            "reason_encrypted": reason,
+                            "lookup_key": security_manager.create_lookup_key(
+                                guild_id,
+                                user_id,
+                            ),
+                            "created_at": now - timedelta(days=n * 40),
+                            "is_deleted": deleted,
+                            "deleted_at": now - timedelta(days=n * 20)
+                            if deleted
+                            else None,
+                        },
+                    )
+        with cls.Session() as db:
+            ids = db.scalars(
+                insert(SecureWarning).returning(SecureWarning.id),
+                warnings,
+            ).all()
+            # One audit log per warning, for the member who received it
+            logs = []
+            for n, warning_id in enumerate(ids):
+                guild, member = divmod(n // WARNINGS_PER_MEMBER, MEMBERS)
+                logs.extend(
+                    ModerationLog.bulk_values(
+                        guild_id=(GUILD_ID, OTHER_GUILD_ID)[guild],
+                        user_id=str(1000 + member),
+                        moderator_id=MODERATOR_ID,
+                        action_type="warn",
+                        warning_ids=[warning_id],
+                        reason="Seeded reason",
+                    ),
+                )
+                logs[-1]["created_at"] = now - timedelta(days=n * 7 % 1500)
+            db.execute(insert(ModerationLog.__table__), logs)
+            WarningCounter.rebuild(db)
+            db.commit()
+
+    def plans(self, recorder: QueryRecorder) -> list[tuple[str, list[str]]]:
+        """Return each captured query with the steps of its plan."""
+        assert recorder.queries, "no queries were captured"
+        with self.engine.connect() as conn:
+            return [
+                (
+                    statement,
+                    [
+                        row.detail
+                        for row in conn.exec_driver_sql(
+                            f"EXPLAIN QUERY PLAN {statement}",
+                            parameters,
+                        )
+                    ],
+                )
+                for statement, parameters in recorder.queries
+            ]
+
+    def full_scans(self, recorder: QueryRecorder) -> list[str]:
+        """Return every captured query whose plan contains a table scan."""
+        failures = []
+        for statement, plan in self.plans(recorder):
+            scans = [detail for detail in plan if FULL_SCAN.match(detail)]
+            if scans:
+                failures.append(f"{scans} in:\n{statement}")
+        return failures
+
+    def capture(self, operation) -> QueryRecorder:
+        """Run ``operation`` against the scratch database, rolling it back."""
+        with (
+            patch("project.database.connection.SessionLocal", self.Session),
+            QueryRecorder(self.engine) as recorder,
+        ):
+            operation()
+        return recorder
+
+    @pytest.mark.parametrize(
+        "operation",
+        (
+            pytest.param(
+                lambda service: service.add_warning_with_count(
+                    GUILD_ID,
+                    "1000",
+                    MODERATOR_ID,
+                    "Plan",
+                ),
+                id="add_warning_with_count",
+            ),
+            pytest.param(
+                lambda service: service.get_user_warnings(GUILD_ID, "1001"),
+                id="get_user_warnings",
+            ),
+            pytest.param(
+                lambda service: service.get_user_warnings(
+                    GUILD_ID,
+                    "1001",
+                    include_deleted=True,
+                ),
+                id="get_user_warnings_deleted",
+            ),
+            pytest.param(
+                lambda service: service.get_user_warnings_page(
+                    GUILD_ID,
+                    "1002",
+                    cursor=service.get_user_warnings_page(
+                        GUILD_ID,
+                        "1002",
+                        limit=2,
+                    ).next_cursor,
+                    limit=2,
+                ),
+                id="get_user_warnings_page",
+            ),
+            pytest.param(
+                lambda service: service.get_warning_count(GUILD_ID, "1003"),
+                id="get_warning_count",
+            ),
+            pytest.param(
+                lambda service: service.get_warning_summary(GUILD_ID, "1003"),
+                id="get_warning_summary",
+            ),
+            pytest.param(
+                lambda service: service.get_warning_by_id(5, GUILD_ID),
+                id="get_warning_by_id",
+            ),
+            pytest.param(
+                lambda service: service.delete_warning(8, GUILD_ID, MODERATOR_ID),
+                id="delete_warning",
+            ),
+            pytest.param(
+                lambda service: service.bulk_delete_warnings(
+                    [11, 12, 13],
+                    GUILD_ID,
+                    MODERATOR_ID,
+                ),
+                id="bulk_delete_warnings",
+            ),
+            pytest.param(
+                lambda service: service.clear_user_warnings(
+                    GUILD_ID,
+                    "1005",
+                    MODERATOR_ID,
+                ),
+                id="clear_user_warnings",
+            ),
+            pytest.param(
+                lambda service: service.export_user_data("1006", GUILD_ID),
+                id="export_user_data",
+            ),
+            pytest.param(
+                lambda service: service.export_user_data_to_file(
+                    "1006",
+                    GUILD_ID,
+                ).unlink(),
+                id="export_user_data_to_file",
+            ),
+            pytest.param(
+                lambda service: service.delete_user_data("1007", GUILD_ID),
+                id="delete_user_data",
+            ),
+            pytest.param(
+                lambda service: service.rekey_legacy_hashes(
+                    GUILD_ID,
+                    "1008",
+                    [MODERATOR_ID],
+                ),
+                id="rekey_legacy_hashes",
+            ),
+        ),
+    )
+    def test_warning_service_uses_indexes(self, operation):
+        """Test that WarningService queries never scan a whole table."""
+        recorder = self.capture(lambda: operation(WarningService()))
+
+        assert self.full_scans(recorder) == []
+
+    @pytest.mark.parametrize(
+        "operation",
+        (
+            pytest.param(
+                lambda cleanup: cleanup.get_cleanup_stats(),
+                id="get_cleanup_stats",
+            ),
+            pytest.param(
+                lambda cleanup: cleanup.hard_delete_old_soft_deleted(90),
+                id="hard_delete_old_soft_deleted",
+            ),
+            pytest.param(
+                lambda cleanup: cleanup.cleanup_old_logs(730),
+                id="cleanup_old_logs",
+            ),
+            pytest.param(
+                lambda cleanup: cleanup.compact_moderation_rollups(),
+                id="compact_moderation_rollups",
+            ),
+        ),
+    )
+    def test_cleanup_uses_indexes(self, operation):
+        """Test that DatabaseCleanup queries never scan a whole table."""
+
+        def run():
+            cleanup = DatabaseCleanup()
+            try:
+                operation(cleanup)
+            finally:
+                cleanup.close()
+
+        recorder = self.capture(run)
+
+        assert self.full_scans(recorder) == []
+
+    def test_analytics_uses_indexes(self):
+        """Test that guild stats are read from the rollups by primary key."""
+        recorder = self.capture(
+            lambda: AnalyticsService().get_guild_stats(GUILD_ID, days=30),
+        )
+
+        assert self.full_scans(recorder) == []
+
+    def test_active_reads_use_partial_index(self):
+        """Test that active-warning reads search only the active rows."""
+        recorder = self.capture(
+            lambda: WarningService().get_user_warnings_page(GUILD_ID, "1003"),
+        )
+
+        details = [step for _statement, plan in self.plans(recorder) for step in plan]
+        assert any("idx_active_guild_user" in step for step in details), details
+
+    def test_detector_flags_a_table_scan(self):
+        """Test that the harness reports a query without a usable index."""
+        recorder = QueryRecorder(self.engine)
+        recorder.queries.append(
+            ("SELECT id FROM warnings WHERE reason_encrypted IS NOT NULL", ()),
+        )
+
+        assert len(self.full_scans(recorder)) == 1
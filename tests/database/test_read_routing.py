@@ -0,0 +1,104 @@
+"""Tests for read replica routing with two SQLite files."""
+
+import asyncio
+import tempfile
+from pathlib import Path
+
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from project.database.analytics import AnalyticsService
+from project.database.connection import (
+    Base,
+    RoutingSession,
+    SessionLocal,
+    engine,
+    to_async_url,
+)
+from project.database.services import AsyncWarningService, WarningService
+from project.database.unit_of_work import async_unit_of_work, unit_of_work
+
+
+GUILD_ID = "123456789012345678"
+USER_ID = "2"
+
+
+class TestReadRouting:
+    """Test that reads use the replica and writes pin to the primary."""
+
+    def setup_method(self):
+        """Create a primary and a replica whose contents differ."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.primary_url = f"sqlite:///{Path(self.tmp.name) / 'primary.db'}"
+        self.replica_url = f"sqlite:///{Path(self.tmp.name) / 'replica.db'}"
+        self.primary = create_engine(self.primary_url)
+        self.replica = create_engine(self.replica_url)
+        for bind in (self.primary, self.replica):
+            Base.metadata.create_all(bind=bind)
+
+        # Only the replica knows these, so any read that finds them was routed
+        SessionLocal.configure(bind=self.replica, replica=None)
+        service = WarningService()
+        service.add_warning(GUILD_ID, USER_ID, "10", "Replica one")
+        service.add_warning(GUILD_ID, USER_ID, "10", "Replica two")
+
+        SessionLocal.configure(bind=self.primary, replica=self.replica)
+
+    def teardown_method(self):
+        """Restore the default binds and remove both files."""
+        SessionLocal.configure(bind=engine, replica=None)
+        self.primary.dispose()
+        self.replica.dispose()
+        self.tmp.cleanup()
+
+    def test_reads_use_replica_and_writes_use_primary(self):
+        """Test routing of service calls made outside a unit of work."""
+        service = WarningService()
+
+        assert len(service.get_user_warnings(GUILD_ID, USER_ID)) == 2
+        assert AnalyticsService().get_guild_stats(GUILD_ID).total_actions == 2
+
+        service.add_warning(GUILD_ID, USER_ID, "10", "Primary")
+
+        # The write went to the primary only; reads still see the replica
+        assert len(service.get_user_warnings(GUILD_ID, USER_ID)) == 2
+        SessionLocal.configure(replica=None)
+        assert len(service.get_user_warnings(GUILD_ID, USER_ID)) == 1
+
+    def test_unit_reads_its_own_writes_after_a_write(self):
+        """Test that a write pins the rest of the unit to the primary."""
+        service = WarningService()
+
+        with unit_of_work():
+            assert len(service.get_user_warnings(GUILD_ID, USER_ID)) == 2
+            service.add_warning(GUILD_ID, USER_ID, "10", "Primary")
+            page = service.get_user_warnings_page(GUILD_ID, USER_ID)
+            assert len(page.warnings) == 1
+
+        # A new command starts on the replica again
+        assert len(service.get_user_warnings(GUILD_ID, USER_ID)) == 2
+
+    def test_async_unit_reads_its_own_writes(self):
+        """Test the same routing and pinning for the asyncio services."""
+
+        async def scenario():
+            primary = create_async_engine(to_async_url(self.primary_url))
+            replica = create_async_engine(to_async_url(self.replica_url))
+            factory = async_sessionmaker(
+                bind=primary,
+                sync_session_class=RoutingSession,
+                replica=replica.sync_engine,
+                expire_on_commit=False,
+            )
+            service = AsyncWarningService(factory)
+            try:
+                assert await service.get_warning_count(GUILD_ID, USER_ID) == 2
+                async with async_unit_of_work(factory):
+                    await service.add_warning(GUILD_ID, USER_ID, "10", "Primary")
+                    assert await service.get_warning_count(GUILD_ID, USER_ID) == 1
+                assert await service.get_warning_count(GUILD_ID, USER_ID) == 2
+            finally:
+                await primary.dispose()
+                await replica.dispose()
+
+        asyncio.run(scenario())
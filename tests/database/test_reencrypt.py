@@ -0,0 +1,183 @@
+"""Tests for in-place ciphertext re-encryption."""
+
+from unittest.mock import patch
+
+from sqlalchemy import text, update
+from sqlalchemy.orm import sessionmaker
+
+from project.database.connection import Base, engine
+from project.database.models import (
+    MaintenanceCheckpoint,
+    ModerationLog,
+    SecureWarning,
+)
+from project.database.reencrypt import KeyRotationJob, migrate_ciphertexts
+from project.database.security import security_manager
+
+
+class TestCiphertextMigration:
+    """Test conversion of legacy text ciphertexts to the binary format."""
+
+    @classmethod
+    def setup_class(cls):
+        """Setup test database."""
+        cls.Session = sessionmaker(bind=engine)
+        Base.metadata.create_all(bind=engine)
+
+    def teardown_method(self):
+        """Cleanup after each test."""
+        with self.Session() as session:
+            session.query(ModerationLog).delete()
+            session.query(SecureWarning).delete()
+            session.commit()
+
+    def insert_legacy_warning(self, reason: str) -> int:
+        """Insert a warning whose reason uses the legacy text format."""
+        with self.Session() as session:
+            result = session.execute(
+                text(
+                    "INSERT INTO warnings (guild_id_hash, user_id_hash, "
+                    "moderator_id_hash, hash_scheme, reason_encrypted, lookup_key, "
+                    "created_at, is_deleted, version) VALUES ('g', 'u', 'm', 2, "
+                    ":reason, 'lookup', CURRENT_TIMESTAMP, 0, 1)",
+                ),
+                {"reason": security_manager.encrypt_text(reason)},
+            )
+            session.commit()
+            return result.lastrowid
+
+    def test_migrate_legacy_rows_in_batches(self):
+        """Test that legacy rows are converted and stay decryptable."""
+        ids = [self.insert_legacy_warning(f"Legacy reason {i}") for i in range(5)]
+
+        stats = migrate_ciphertexts(batch_size=2, session_factory=self.Session)
+
+        assert stats["warnings"] == {"converted": 5, "failed": 0}
+        with self.Session() as session:
+            for i, warning_id in enumerate(ids):
+                warning = session.get(SecureWarning, warning_id)
+                assert isinstance(warning.reason_encrypted, bytes)
+                assert warning.get_decrypted_reason() == f"Legacy reason {i}"
+
+    def test_migration_is_idempotent(self):
+        """Test that already converted rows are skipped on re-run."""
+        self.insert_legacy_warning("Legacy reason")
+
+        migrate_ciphertexts(session_factory=self.Session)
+        stats = migrate_ciphertexts(session_factory=self.Session)
+
+        assert stats["warnings"] == {"converted": 0, "failed": 0}
+
+    def test_edit_during_conversion_is_kept(self):
+        """Test that a reason edited after its row was read is not overwritten."""
+        warning_id = self.insert_legacy_warning("Legacy reason")
+        encrypt = security_manager.encrypt_to_bytes
+        edits = []
+
+        def edit_then_encrypt(plaintext: str) -> bytes:
+            # A moderator edits the reason between the batch's read and write
+            if not edits:
+                edits.append(warning_id)
+                with self.Session() as session:
+                    session.execute(
+                        update(SecureWarning)
+                        .where(SecureWarning.id == warning_id)
+                        .values(
+                            reason_encrypted=encrypt("Edited reason"),
+                            version=SecureWarning.version + 1,
+                        ),
+                    )
+                    session.commit()
+            return encrypt(plaintext)
+
+        with patch.object(
+            security_manager,
+            "encrypt_to_bytes",
+            side_effect=edit_then_encrypt,
+        ):
+            stats = migrate_ciphertexts(session_factory=self.Session)
+
+        assert stats["warnings"] == {"converted": 0, "failed": 0}
+        with self.Session() as session:
+            warning = session.get(SecureWarning, warning_id)
+            assert warning.get_decrypted_reason() == "Edited reason"
+            assert warning.version == 2
+
+    def test_conversion_bumps_the_version(self):
+        """Test that a converted warning's version moves on."""
+        warning_id = self.insert_legacy_warning("Legacy reason")
+
+        migrate_ciphertexts(session_factory=self.Session)
+
+        with self.Session() as session:
+            assert session.get(SecureWarning, warning_id).version == 2
+
+
+class TestKeyRotationJob:
+    """Test checkpointed online key rotation."""
+
+    @classmethod
+    def setup_class(cls):
+        """Setup test database."""
+        cls.Session = sessionmaker(bind=engine)
+        Base.metadata.create_all(bind=engine)
+
+    def teardown_method(self):
+        """Cleanup after each test."""
+        with self.Session() as session:
+            session.query(MaintenanceCheckpoint).delete()
+            session.query(SecureWarning).delete()
+            session.commit()
+
+    def test_rotation_resumes_from_checkpoint(self):
+        """Test that a rotation skips rows before its checkpoint."""
+        with self.Session() as session:
+            warnings = [
+                SecureWarning.create_warning("1", "2", "3", f"Reason {i}")
+                for i in range(4)
+            ]
+            session.add_all(warnings)
+            session.commit()
+            ids = [warning.id for warning in warnings]
+
+        job = KeyRotationJob(batch_size=2, duty_cycle=1.0, session_factory=self.Session)
+        with self.Session() as session:
+            session.add(
+                MaintenanceCheckpoint(
+                    job_name=job.job_name,
+                    table_name="warnings",
+                    last_id=ids[1],
+                ),
+            )
+            session.commit()
+
+        with patch.object(security_manager, "needs_reencryption", return_value=True):
+            stats = job.run()
+
+        assert stats["warnings"]["resumed_after"] == ids[1]
+        assert stats["warnings"]["converted"] == 2
+        with self.Session() as session:
+            # Finished rotations clear their checkpoints
+            assert session.query(MaintenanceCheckpoint).count() == 0
+            assert [
+                session.get(SecureWarning, warning_id).get_decrypted_reason()
+                for warning_id in ids
+            ] == [f"Reason {i}" for i in range(4)]
+
+    def test_stopped_rotation_keeps_checkpoint(self):
+        """Test that stopping mid-table leaves a checkpoint to resume from."""
+        with self.Session() as session:
+            session.add_all(
+                SecureWarning.create_warning("1", "2", "3", f"Reason {i}")
+                for i in range(4)
+            )
+            session.commit()
+
+        job = KeyRotationJob(batch_size=2, duty_cycle=1.0, session_factory=self.Session)
+        job.stop()
+        job.run()
+
+        with self.Session() as session:
+            checkpoint = session.get(MaintenanceCheckpoint, (job.job_name, "warnings"))
+            assert checkpoint is not None
+            assert checkpoint.last_id > 0
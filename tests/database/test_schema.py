@@ -0,0 +1,146 @@
+"""Tests for the Alembic migration chain and the startup schema check."""
+
+import tempfile
+from pathlib import Path
+
+import pytest
+from alembic import command
+from sqlalchemy import create_engine, select, text
+from sqlalchemy.orm import sessionmaker
+
+from project.database.connection import Base
+from project.database.models import SecureWarning
+from project.database.schema import (
+    BASELINE_REVISION,
+    SchemaVersionError,
+    alembic_config,
+    check_schema_version,
+    current_revision,
+    head_revision,
+    upgrade_database,
+)
+from project.database.security import (
+    HASH_SCHEME_ARGON2,
+    Argon2IDHasher,
+    security_manager,
+)
+
+
+SCHEMA_SQL = text(
+    "SELECT name, tbl_name, sql FROM sqlite_master "
+    "WHERE name NOT LIKE 'sqlite_%' AND name != 'alembic_version'",
+)
+
+
+def schema_of(engine, with_logs: bool = True) -> set[tuple[str, str]]:
+    """Every table and index of a SQLite database, with normalized DDL.
+
+    Tables recreated by batch migrations keep the quoted name SQLite gives a
+    renamed table, so quotes are dropped. ``with_logs=False`` leaves out
+    moderation_logs, which the migrations partition (see test_partitions.py).
+    """
+    with engine.connect() as connection:
+        return {
+            (name, " ".join(sql.replace('"', "").split()))
+            for name, table_name, sql in connection.execute(SCHEMA_SQL)
+            if with_logs or not table_name.startswith("moderation_logs")
+        }
+
+
+class TestMigrations:
+    """Test the migrations against the models on scratch SQLite files."""
+
+    def setup_method(self):
+        """Create an empty database file."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.engine = create_engine(f"sqlite:///{Path(self.tmp.name) / 'schema.db'}")
+        self.Session = sessionmaker(bind=self.engine)
+
+    def teardown_method(self):
+        """Remove the database file."""
+        self.engine.dispose()
+        self.tmp.cleanup()
+
+    def migrate(self, operation, revision: str) -> None:
+        """Run an Alembic command on the scratch database."""
+        config = alembic_config()
+        with self.engine.begin() as connection:
+            config.attributes["connection"] = connection
+            operation(config, revision)
+
+    def test_head_matches_models(self):
+        """Test that the migrations build exactly the models' schema."""
+        assert upgrade_database(self.engine) == head_revision()
+
+        models = create_engine("sqlite://")
+        Base.metadata.create_all(bind=models)
+        assert schema_of(self.engine, with_logs=False) == schema_of(
+            models,
+            with_logs=False,
+        )
+        with self.engine.connect() as connection:
+            assert check_schema_version(connection) == head_revision()
+
+    def test_downgrade_to_base_and_back(self):
+        """Test that every migration can be reverted."""
+        upgrade_database(self.engine)
+        self.migrate(command.downgrade, "base")
+        assert schema_of(self.engine) == set()
+
+        self.migrate(command.upgrade, "head")
+        with self.engine.connect() as connection:
+            assert current_revision(connection) == head_revision()
+
+    def test_unversioned_database_is_stamped_and_upgraded(self):
+        """Test that a pre-migration create_all() database keeps its data."""
+        # The baseline builds the schema create_all() did before migrations
+        self.migrate(command.upgrade, BASELINE_REVISION)
+        # Rows must verify against the shared manager's pepper
+        legacy = Argon2IDHasher(security_manager._pepper)  # noqa: SLF001
+        with self.engine.begin() as connection:
+            connection.exec_driver_sql("DROP TABLE alembic_version")
+            connection.execute(
+                text(
+                    "INSERT INTO warnings (guild_id_hash, user_id_hash, "
+                    "moderator_id_hash, reason_encrypted, lookup_key, created_at, "
+                    "is_deleted, version) VALUES (:guild, :user, :moderator, "
+                    ":reason, 'lookup', CURRENT_TIMESTAMP, 0, 1)",
+                ),
+                {
+                    "guild": legacy.hash("1"),
+                    "user": legacy.hash("2"),
+                    "moderator": legacy.hash("3"),
+                    "reason": security_manager.encrypt_text("Legacy reason"),
+                },
+            )
+
+        with (
+            self.engine.connect() as connection,
+            pytest.raises(SchemaVersionError, match="no schema version"),
+        ):
+            check_schema_version(connection)
+
+        assert upgrade_database(self.engine) == head_revision()
+        with self.Session() as session:
+            warning = session.scalars(select(SecureWarning)).one()
+            assert warning.hash_scheme == HASH_SCHEME_ARGON2
+            assert warning.get_decrypted_reason() == "Legacy reason"
+
+    def test_unversioned_database_unlike_the_baseline_is_not_stamped(self):
+        """Test that an unversioned database with a later schema is refused."""
+        Base.metadata.create_all(bind=self.engine)
+
+        with pytest.raises(SchemaVersionError, match="unexpected column"):
+            upgrade_database(self.engine)
+        with self.engine.connect() as connection:
+            assert current_revision(connection) is None
+
+    def test_outdated_database_fails_the_check(self):
+        """Test that the startup check rejects a database behind head."""
+        self.migrate(command.upgrade, BASELINE_REVISION)
+
+        with (
+            self.engine.connect() as connection,
+            pytest.raises(SchemaVersionError, match="alembic upgrade head"),
+        ):
+            check_schema_version(connection)
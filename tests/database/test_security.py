@@ -1,9 +1,29 @@
 """Tests for database security functionality."""
 
+import asyncio
+import hashlib
+import logging
 import pytest
 import os
+import stat
+import subprocess
+import sys
+from pathlib import Path
+from typing import ClassVar
 from unittest.mock import patch
-from project.database.security import SecurityManager
+
+from cryptography.fernet import Fernet
+
+from project.database import security as security_module
+from project.database.security import (
+    HASH_SCHEME_ARGON2,
+    HASH_SCHEME_BLAKE2B,
+    HASH_SCHEME_HMAC_SHA256,
+    CIPHERTEXT_FORMAT_V2,
+    Argon2IDHasher,
+    HMACIDHasher,
+    SecurityManager,
+)
 
 
 class TestSecurityManager:
@@ -12,7 +32,6 @@ class TestSecurityManager:
     def setup_method(self):
         """Setup for each test."""
         # Use valid base64 test keys
-        from cryptography.fernet import Fernet
         test_key = Fernet.generate_key().decode()
         
         with patch.dict(os.environ, {
@@ -40,6 +59,20 @@ class TestSecurityManager:
         assert len(hash1) == 64
         assert all(c in '0123456789abcdef' for c in hash1)
     
+    def test_anonymized_is_lazy(self):
+        """Test that anonymization only runs for emitted log records."""
+        test_logger = logging.getLogger("tests.lazy_anonymized")
+        test_logger.setLevel(logging.INFO)
+
+        with patch("project.database.security.hashlib", wraps=hashlib) as hashing:
+            test_logger.debug("dropped %s", self.security.anonymized("123"))
+            assert not hashing.sha256.called
+
+            anonymized = self.security.anonymized("123")
+            first = str(anonymized)
+            assert str(anonymized) == first
+            assert hashing.sha256.call_count == 1
+
     def test_encrypt_decrypt_text(self):
         """Test text encryption and decryption."""
         original_text = "This is a test warning reason with émojis 🚨"
@@ -68,6 +101,58 @@ class TestSecurityManager:
         with pytest.raises(ValueError):
             self.security.decrypt_text("invalid_encrypted_data")
     
+    def test_binary_ciphertext_format(self):
+        """Test the compact binary storage format."""
+        encrypted = self.security.encrypt_to_bytes("Binary reason")
+
+        assert isinstance(encrypted, bytes)
+        assert encrypted[0] == CIPHERTEXT_FORMAT_V2
+        assert encrypted[1] == self.security.primary_key_id
+        # version byte + key ID + nonce + plaintext + 16-byte tag
+        assert len(encrypted) == 2 + 12 + len("Binary reason") + 16
+        assert not self.security.is_legacy_ciphertext(encrypted)
+        assert self.security.decrypt_text(encrypted) == "Binary reason"
+
+    def test_decrypt_legacy_text_ciphertext(self):
+        """Test that legacy base64 ciphertexts stay readable in any column type."""
+        legacy = self.security.encrypt_text("Legacy reason")
+
+        assert self.security.is_legacy_ciphertext(legacy)
+        assert self.security.decrypt_text(legacy) == "Legacy reason"
+        # Legacy text converted to BYTEA in place
+        assert self.security.decrypt_text(legacy.encode("ascii")) == "Legacy reason"
+
+    def test_binary_ciphertext_tampering(self):
+        """Test that a modified binary ciphertext fails authentication."""
+        encrypted = bytearray(self.security.encrypt_to_bytes("Binary reason"))
+        encrypted[-1] ^= 0x01
+
+        with pytest.raises(ValueError):
+            self.security.decrypt_text(bytes(encrypted))
+
+    def test_encrypt_decrypt_many(self):
+        """Test batch encryption and decryption round trip."""
+        texts = ["first reason", "", "third reason"]
+
+        encrypted = self.security.encrypt_many(texts)
+        assert encrypted[1] == b""
+        assert self.security.decrypt_many(encrypted) == texts
+
+    def test_decrypt_many_continues_past_failures(self):
+        """Test that one corrupt ciphertext does not abort the batch."""
+        encrypted = self.security.encrypt_many(["good", "also good"])
+        batch = [encrypted[0], "invalid_encrypted_data", encrypted[1]]
+
+        results = self.security.decrypt_many(batch, default="[FAILED]")
+        assert results == ["good", "[FAILED]", "also good"]
+
+    def test_decrypt_many_async(self):
+        """Test the thread-offloaded batch decryption."""
+        encrypted = self.security.encrypt_many(["one", "two"])
+
+        results = asyncio.run(self.security.decrypt_many_async(encrypted))
+        assert results == ["one", "two"]
+
     def test_create_lookup_key(self):
         """Test lookup key creation."""
         guild_id = "123456789012345678"
@@ -108,4 +193,223 @@ class TestSecurityManager:
         assert anon1 != main_hash
         
         # Should be 8 characters for logs
-        assert len(anon1) == 8
\ No newline at end of file
+        assert len(anon1) == 8
+
+class TestIDHashSchemes:
+    """Test pluggable deterministic ID hashing."""
+
+    env: ClassVar[dict[str, str]] = {
+        "SALT_KEY": "dGVzdF9zYWx0XzEyMzQ1Njc4OTAxMjM0NTY3ODkwMTIzNDU2Nzg=",
+        "PEPPER_KEY": "dGVzdF9wZXBwZXJfMTIzNDU2Nzg5MDEyMzQ1Njc4OTAxMjM0NTY3",
+    }
+
+    def make_manager(self, algorithm: str) -> SecurityManager:
+        """Build a manager using the given ID hash algorithm."""
+        with patch.dict(os.environ, {**self.env, "ID_HASH_ALGORITHM": algorithm}):
+            return SecurityManager()
+
+    def test_default_scheme_is_hmac(self):
+        """Test that HMAC-SHA256 is the default scheme."""
+        with patch.dict(os.environ, self.env):
+            os.environ.pop("ID_HASH_ALGORITHM", None)
+            security = SecurityManager()
+        assert security.hash_scheme == HASH_SCHEME_HMAC_SHA256
+
+    def test_blake2b_scheme(self):
+        """Test BLAKE2b produces stable 64-char digests distinct from HMAC."""
+        blake = self.make_manager("blake2b")
+        hmac_manager = self.make_manager("hmac-sha256")
+        user_id = "123456789012345678"
+
+        assert blake.hash_scheme == HASH_SCHEME_BLAKE2B
+        assert blake.hash_discord_id(user_id) == blake.hash_discord_id(user_id)
+        assert len(blake.hash_discord_id(user_id)) == 64
+        assert blake.hash_discord_id(user_id) != hmac_manager.hash_discord_id(user_id)
+
+    def test_invalid_algorithm(self):
+        """Test that unknown algorithms are rejected."""
+        with pytest.raises(ValueError, match="ID_HASH_ALGORITHM"):
+            self.make_manager("md5")
+
+    def test_hash_is_memoized(self):
+        """Test that repeated lookups are served from the memo."""
+        with patch.object(
+            HMACIDHasher,
+            "hash",
+            autospec=True,
+            side_effect=HMACIDHasher.hash,
+        ) as hashing:
+            security = self.make_manager("hmac-sha256")
+            first = security.hash_discord_id("123456789012345678")
+            assert security.hash_discord_id("123456789012345678") == first
+
+        assert hashing.call_count == 1
+
+    def test_verify_legacy_argon2_hash(self):
+        """Test that legacy Argon2 digests can be verified for re-keying."""
+        security = self.make_manager("hmac-sha256")
+        legacy = Argon2IDHasher(self.env["PEPPER_KEY"]).hash("123456789012345678")
+
+        assert security.verify_discord_id(
+            "123456789012345678",
+            legacy,
+            HASH_SCHEME_ARGON2,
+        )
+        assert not security.verify_discord_id(
+            "987654321098765432",
+            legacy,
+            HASH_SCHEME_ARGON2,
+        )
+
+
+class TestKeyring:
+    """Test key-ID tagged encryption with multiple keys."""
+
+    def make_manager(self, keys: dict[int, str], primary: int) -> SecurityManager:
+        """Build a manager with the given keyring and primary key."""
+        env = {
+            "ENCRYPTION_KEYS": ",".join(f"{k}:{v}" for k, v in keys.items()),
+            "ENCRYPTION_KEY_ID": str(primary),
+            "SALT_KEY": "dGVzdF9zYWx0XzEyMzQ1Njc4OTAxMjM0NTY3ODkwMTIzNDU2Nzg=",
+            "PEPPER_KEY": "dGVzdF9wZXBwZXJfMTIzNDU2Nzg5MDEyMzQ1Njc4OTAxMjM0NTY3",
+        }
+        with patch.dict(os.environ, env):
+            return SecurityManager()
+
+    def setup_method(self):
+        """Generate two keys for each test."""
+        self.old_key = Fernet.generate_key().decode()
+        self.new_key = Fernet.generate_key().decode()
+
+    def test_rotated_manager_reads_old_ciphertexts(self):
+        """Test that old-key ciphertexts stay readable after rotation."""
+        old = self.make_manager({1: self.old_key}, primary=1)
+        rotated = self.make_manager({1: self.old_key, 2: self.new_key}, primary=2)
+
+        encrypted = old.encrypt_to_bytes("Old reason")
+        legacy = old.encrypt_text("Legacy reason")
+
+        assert rotated.ciphertext_key_id(encrypted) == 1
+        assert rotated.needs_reencryption(encrypted)
+        assert rotated.needs_reencryption(legacy)
+        assert rotated.decrypt_text(encrypted) == "Old reason"
+        assert rotated.decrypt_text(legacy) == "Legacy reason"
+
+        reencrypted = rotated.encrypt_to_bytes(rotated.decrypt_text(encrypted))
+        assert rotated.ciphertext_key_id(reencrypted) == 2
+        assert not rotated.needs_reencryption(reencrypted)
+
+    def test_unknown_key_id(self):
+        """Test that ciphertexts from a retired key fail cleanly."""
+        old = self.make_manager({1: self.old_key}, primary=1)
+        retired = self.make_manager({2: self.new_key}, primary=2)
+
+        with pytest.raises(ValueError):
+            retired.decrypt_text(old.encrypt_to_bytes("Old reason"))
+
+    def test_primary_key_must_exist(self):
+        """Test that the primary key ID must be in the keyring."""
+        with pytest.raises(ValueError, match="ENCRYPTION_KEY_ID"):
+            self.make_manager({1: self.old_key}, primary=3)
+
+
+class TestLazyConstruction:
+    """Test that importing the database layer does not derive keys."""
+
+    # Generous wall-clock budget for importing models, services and a cog
+    IMPORT_BUDGET_SECONDS = 5.0
+
+    def test_import_does_not_construct_manager(self):
+        """Test the import-time budget with a password-style key."""
+        code = (
+            "import time\n"
+            "start = time.perf_counter()\n"
+            "import project.database.models, project.database.services\n"
+            "import project.cogs.moderation\n"
+            "elapsed = time.perf_counter() - start\n"
+            "import project.database.security as security\n"
+            "print(security._security_manager is None, elapsed)\n"
+        )
+        env = {
+            **os.environ,
+            "ENCRYPTION_KEY": "not-a-fernet-key-so-pbkdf2-is-used",
+            "KEY_DERIVATION_SALT": "test_salt",
+        }
+        env.pop("ENCRYPTION_KEYS", None)
+        result = subprocess.run(
+            [sys.executable, "-c", code],
+            capture_output=True,
+            text=True,
+            env=env,
+            cwd=Path(__file__).resolve().parents[2],
+            check=True,
+        )
+
+        not_constructed, elapsed = result.stdout.split()
+        assert not_constructed == "True"
+        assert float(elapsed) < self.IMPORT_BUDGET_SECONDS
+
+    def test_proxy_constructs_once(self):
+        """Test that the global proxy builds a single shared manager."""
+        with (
+            patch.object(security_module, "_security_manager", None),
+            patch.object(
+                security_module,
+                "SecurityManager",
+                wraps=SecurityManager,
+            ) as construct,
+        ):
+            assert security_module.security_manager.hash_scheme
+            manager = security_module.get_security_manager()
+            assert manager is security_module.get_security_manager()
+            proxy = security_module.security_manager
+            assert proxy.primary_key_id == manager.primary_key_id
+
+        assert construct.call_count == 1
+
+
+class TestKeyCache:
+    """Test the on-disk cache of password-derived keys."""
+
+    def make_manager(self, password: str, cache_path: Path) -> SecurityManager:
+        """Build a manager from a password-style key."""
+        env = {
+            "ENCRYPTION_KEY": password,
+            "KEY_DERIVATION_SALT": "test_salt",
+            "KEY_CACHE_FILE": str(cache_path),
+        }
+        with patch.dict(os.environ, env):
+            os.environ.pop("ENCRYPTION_KEYS", None)
+            return SecurityManager()
+
+    def test_cache_skips_derivation(self, tmp_path):
+        """Test that a cached key is reused without running PBKDF2."""
+        cache_path = tmp_path / "key.cache"
+        first = self.make_manager("correct horse", cache_path)
+        assert stat.S_IMODE(cache_path.stat().st_mode) == 0o600
+
+        with patch("project.database.security.PBKDF2HMAC") as kdf:
+            second = self.make_manager("correct horse", cache_path)
+            kdf.assert_not_called()
+
+        assert second.decrypt_text(first.encrypt_to_bytes("reason")) == "reason"
+
+    def test_cache_ignored_for_other_password(self, tmp_path):
+        """Test that a cache written for another password is not used."""
+        cache_path = tmp_path / "key.cache"
+        first = self.make_manager("correct horse", cache_path)
+        second = self.make_manager("battery staple", cache_path)
+
+        with pytest.raises(ValueError):
+            second.decrypt_text(first.encrypt_to_bytes("reason"))
+
+    def test_cache_ignored_when_readable_by_others(self, tmp_path):
+        """Test that a cache file with loose permissions is not trusted."""
+        cache_path = tmp_path / "key.cache"
+        self.make_manager("correct horse", cache_path)
+        cache_path.chmod(0o644)
+
+        with patch("project.database.security.PBKDF2HMAC") as kdf:
+            kdf.return_value.derive.return_value = bytes(32)
+            self.make_manager("correct horse", cache_path)
+            kdf.assert_called_once()
@@ -1,14 +1,35 @@
 """Tests for database services."""
 
+import gzip
+import json
 import os
+import stat
+import tempfile
+import tracemalloc
+from collections import Counter
+from pathlib import Path
 from unittest.mock import patch
 
 import pytest
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import event, insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, sessionmaker
 
+from project.database.cache import WarningSummaryCache
+from project.database.cleanup import DatabaseCleanup
 from project.database.connection import Base, engine
-from project.database.models import SecureWarning
-from project.database.services import WarningService
+from project.database.models import (
+    GDPRRequest,
+    ModerationLog,
+    SecureWarning,
+    WarningCounter,
+)
+from project.database.security import (
+    HASH_SCHEME_ARGON2,
+    Argon2IDHasher,
+    security_manager,
+)
+from project.database.services import MAX_PAGE_SIZE, WarningService
 
 
 class TestWarningService:
@@ -242,3 +263,594 @@ class TestWarningService:
         )
         assert len(all_warnings) == 2
         assert all(w.is_deleted for w in all_warnings)
+
+
+class TestLegacyRekey:
+    """Test re-keying rows written with the legacy Argon2 hash scheme."""
+
+    @classmethod
+    def setup_class(cls):
+        """Setup test database."""
+        cls.Session = sessionmaker(bind=engine)
+        Base.metadata.create_all(bind=engine)
+
+    def setup_method(self):
+        """Start from tables without other tests' rows."""
+        self.teardown_method()
+
+    def teardown_method(self):
+        """Cleanup after each test."""
+        with self.Session() as session:
+            session.query(ModerationLog).delete()
+            session.query(SecureWarning).delete()
+            session.commit()
+
+    guild_id = "123456789012345678"
+    user_id = "987654321098765432"
+    moderator_id = "555666777888999000"
+
+    def add_legacy_warning(self, log_user_id: str | None = None) -> int:
+        """Store a legacy warning, and a log about ``log_user_id`` if given."""
+        # Rows must verify against the shared manager's pepper
+        legacy = Argon2IDHasher(security_manager._pepper)  # noqa: SLF001
+        with self.Session() as session:
+            warning = SecureWarning(
+                guild_id_hash=legacy.hash(self.guild_id),
+                user_id_hash=legacy.hash(self.user_id),
+                moderator_id_hash=legacy.hash(self.moderator_id),
+                hash_scheme=HASH_SCHEME_ARGON2,
+                reason_encrypted=security_manager.encrypt_to_bytes("Legacy warning"),
+                lookup_key=security_manager.create_lookup_key(
+                    self.guild_id,
+                    self.user_id,
+                ),
+            )
+            session.add(warning)
+            session.flush()
+            if log_user_id is not None:
+                session.add(
+                    ModerationLog(
+                        guild_id_hash=legacy.hash(self.guild_id),
+                        user_id_hash=legacy.hash(log_user_id),
+                        moderator_id_hash=legacy.hash(self.moderator_id),
+                        hash_scheme=HASH_SCHEME_ARGON2,
+                        action_type="warn",
+                        warning_id=warning.id,
+                    ),
+                )
+            session.commit()
+            return warning.id
+
+    def test_rekey_legacy_warning(self):
+        """Test that a legacy warning becomes visible to hash lookups."""
+        warning_id = self.add_legacy_warning(log_user_id=self.user_id)
+
+        service = WarningService()
+        assert service.get_warning_by_id(warning_id, self.guild_id) is None
+
+        moderators = [self.moderator_id]
+        assert service.rekey_legacy_hashes(self.guild_id, self.user_id, moderators) == 1
+        assert service.rekey_legacy_hashes(self.guild_id, self.user_id, moderators) == 0
+
+        with self.Session() as session:
+            rekeyed = session.get(SecureWarning, warning_id)
+            assert rekeyed.hash_scheme == security_manager.hash_scheme
+            assert rekeyed.guild_id_hash == security_manager.hash_discord_id(
+                self.guild_id,
+            )
+            assert rekeyed.user_id_hash == security_manager.hash_discord_id(
+                self.user_id,
+            )
+            assert rekeyed.moderator_id_hash == security_manager.hash_discord_id(
+                self.moderator_id,
+            )
+            log = session.query(ModerationLog).one()
+            assert log.hash_scheme == security_manager.hash_scheme
+            assert log.moderator_id_hash == rekeyed.moderator_id_hash
+
+    def test_unknown_moderator_keeps_the_legacy_scheme(self):
+        """Test that a row is left alone until its moderator can be verified."""
+        warning_id = self.add_legacy_warning()
+
+        service = WarningService()
+        assert service.rekey_legacy_hashes(self.guild_id, self.user_id) == 0
+        with self.Session() as session:
+            warning = session.get(SecureWarning, warning_id)
+            assert warning.hash_scheme == HASH_SCHEME_ARGON2
+
+        assert (
+            service.rekey_legacy_hashes(
+                self.guild_id,
+                self.user_id,
+                [self.moderator_id],
+            )
+            == 1
+        )
+
+    def test_unverified_log_keeps_the_legacy_scheme(self):
+        """Test that a log no candidate ID verifies is not marked as re-keyed."""
+        self.add_legacy_warning(log_user_id="111111111111111111")
+
+        service = WarningService()
+        assert (
+            service.rekey_legacy_hashes(
+                self.guild_id,
+                self.user_id,
+                [self.moderator_id],
+            )
+            == 1
+        )
+
+        with self.Session() as session:
+            log = session.query(ModerationLog).one()
+            assert log.hash_scheme == HASH_SCHEME_ARGON2
+            assert log.user_id_hash.startswith("$argon2")
+
+
+class TestAddWarningWithCount:
+    """Test the single-transaction warn path."""
+
+    @classmethod
+    def setup_class(cls):
+        """Setup test database."""
+        cls.Session = sessionmaker(bind=engine)
+        Base.metadata.create_all(bind=engine)
+
+    def teardown_method(self):
+        """Cleanup after each test."""
+        with self.Session() as session:
+            session.query(GDPRRequest).delete()
+            session.query(WarningCounter).delete()
+            session.query(ModerationLog).delete()
+            session.query(SecureWarning).delete()
+            session.commit()
+
+    def test_returns_active_count_with_one_commit(self):
+        """Test that warning, audit log and count share one commit."""
+        service = WarningService()
+
+        with patch.object(
+            Session,
+            "commit",
+            autospec=True,
+            side_effect=Session.commit,
+        ) as commit:
+            first, first_count = service.add_warning_with_count("1", "2", "3", "First")
+            assert commit.call_count == 1
+        second, second_count = service.add_warning_with_count("1", "2", "3", "Again")
+        _other, other_count = service.add_warning_with_count("1", "4", "3", "Other")
+
+        assert (first_count, second_count, other_count) == (1, 2, 1)
+        with self.Session() as session:
+            logs = session.query(ModerationLog).filter(
+                ModerationLog.warning_id == second.id,
+            )
+            assert [log.action_type for log in logs] == ["warn"]
+            assert session.get(SecureWarning, first.id) is not None
+
+    def test_failed_log_rolls_back_warning(self):
+        """Test that the warning is not kept if the audit log cannot be written."""
+        service = WarningService()
+
+        # A log without hashed IDs violates NOT NULL when inserted
+        with (
+            patch.object(
+                ModerationLog,
+                "bulk_values",
+                side_effect=lambda **_kwargs: [{"action_type": "warn"}],
+            ),
+            pytest.raises(IntegrityError),
+        ):
+            service.add_warning_with_count("1", "2", "3", "Never stored")
+
+        with self.Session() as session:
+            assert session.query(SecureWarning).count() == 0
+
+    def test_delete_paths_decrement_counter(self):
+        """Test that single and GDPR deletes only touch active warnings."""
+        service = WarningService()
+        first, _count = service.add_warning_with_count("1", "2", "3", "First")
+        second, _count = service.add_warning_with_count("1", "2", "3", "Second")
+        service.add_warning_with_count("9", "2", "3", "Other guild")
+
+        assert service.delete_warning(first.id, "1", "3") is True
+        # Already deleted warnings are not matched again
+        assert service.delete_warning(first.id, "1", "3") is False
+        assert service.get_warning_count("1", "2") == 1
+        assert [w.id for w in service.get_user_warnings("1", "2")] == [second.id]
+        assert service.get_warning_by_id(first.id, "1") is None
+
+        assert service.delete_user_data("2", "1") is True
+        assert service.get_warning_count("1", "2") == 0
+        assert service.get_warning_count("9", "2") == 1
+
+    def test_count_is_read_from_counter(self):
+        """Test that warn keeps the counter in step with the warnings table."""
+        service = WarningService()
+        service.add_warning_with_count("1", "2", "3", "First")
+        service.add_warning_with_count("1", "2", "3", "Second")
+
+        lookup_key = security_manager.create_lookup_key("1", "2")
+        with self.Session() as session:
+            assert session.get(WarningCounter, lookup_key).active_count == 2
+            session.get(WarningCounter, lookup_key).active_count = 9
+            session.commit()
+
+        assert service.get_warning_count("1", "2") == 9
+
+        cleanup = DatabaseCleanup()
+        try:
+            assert cleanup.repair_warning_counters() == 1
+        finally:
+            cleanup.close()
+        assert service.get_warning_count("1", "2") == 2
+
+
+class TestWarningPagination:
+    """Test keyset pagination of a member's warning history."""
+
+    @classmethod
+    def setup_class(cls):
+        """Setup test database."""
+        cls.Session = sessionmaker(bind=engine)
+        Base.metadata.create_all(bind=engine)
+
+    def teardown_method(self):
+        """Cleanup after each test."""
+        with self.Session() as session:
+            session.query(WarningCounter).delete()
+            session.query(ModerationLog).delete()
+            session.query(SecureWarning).delete()
+            session.commit()
+
+    def test_pages_cover_history_once(self):
+        """Test that pages are newest first, disjoint and complete."""
+        service = WarningService()
+        added = [
+            service.add_warning("1", "2", "3", f"Reason {i}").id for i in range(23)
+        ]
+        service.add_warning("1", "4", "3", "Other member")
+
+        seen, sizes, cursor = [], [], None
+        while True:
+            page = service.get_user_warnings_page("1", "2", limit=10, cursor=cursor)
+            sizes.append(len(page.warnings))
+            seen.extend(warning.id for warning in page.warnings)
+            cursor = page.next_cursor
+            if cursor is None:
+                break
+
+        assert sizes == [10, 10, 3]
+        assert seen == sorted(added, reverse=True)
+
+    def test_excludes_deleted_warnings(self):
+        """Test that soft-deleted warnings are skipped unless requested."""
+        service = WarningService()
+        kept = service.add_warning("1", "2", "3", "Kept")
+        removed = service.add_warning("1", "2", "3", "Removed")
+        with self.Session() as session:
+            session.get(SecureWarning, removed.id).soft_delete()
+            session.commit()
+
+        page = service.get_user_warnings_page("1", "2")
+        assert [warning.id for warning in page.warnings] == [kept.id]
+        assert page.next_cursor is None
+
+        page = service.get_user_warnings_page("1", "2", include_deleted=True)
+        assert len(page.warnings) == 2
+
+    def test_invalid_arguments(self):
+        """Test that bad cursors and page sizes are rejected."""
+        service = WarningService()
+
+        with pytest.raises(ValueError, match="cursor"):
+            service.get_user_warnings_page("1", "2", cursor="not-a-cursor")
+        with pytest.raises(ValueError, match="limit"):
+            service.get_user_warnings_page("1", "2", limit=MAX_PAGE_SIZE + 1)
+
+
+class TestBulkDeleteWarnings:
+    """Test the set-based bulk delete."""
+
+    @classmethod
+    def setup_class(cls):
+        """Setup test database."""
+        cls.Session = sessionmaker(bind=engine)
+        Base.metadata.create_all(bind=engine)
+
+    def teardown_method(self):
+        """Cleanup after each test."""
+        with self.Session() as session:
+            session.query(WarningCounter).delete()
+            session.query(ModerationLog).delete()
+            session.query(SecureWarning).delete()
+            session.commit()
+
+    def test_deletes_in_one_statement(self):
+        """Test one UPDATE and one INSERT regardless of the number of IDs."""
+        service = WarningService()
+        ids = [service.add_warning("1", str(i % 2), "3", f"R{i}").id for i in range(6)]
+        other_guild = service.add_warning("9", "0", "3", "Other guild").id
+
+        statements = []
+
+        def record(_conn, _cursor, statement, *_args):
+            statements.append(statement.split()[0:3])
+
+        event.listen(engine, "before_cursor_execute", record)
+        try:
+            results = service.bulk_delete_warnings(
+                [*ids, other_guild, 999999],
+                guild_id="1",
+                moderator_id="3",
+            )
+        finally:
+            event.remove(engine, "before_cursor_execute", record)
+
+        assert results == {
+            "total_requested": 8,
+            "deleted": 6,
+            "failed": 0,
+            "not_found": 2,
+            "errors": [],
+        }
+        assert statements.count(["UPDATE", "warnings", "SET"]) == 1
+        assert statements.count(["INSERT", "INTO", "moderation_logs"]) == 1
+
+        with self.Session() as session:
+            logs = (
+                session.query(ModerationLog)
+                .filter(ModerationLog.action_type == "warning_deleted")
+                .order_by(ModerationLog.warning_id)
+                .all()
+            )
+            assert [log.warning_id for log in logs] == ids
+            assert len({log.reason_encrypted for log in logs}) == 1
+            assert len({log.context_encrypted for log in logs}) == 1
+            assert logs[0].get_decrypted_reason() == "Bulk deletion of warning"
+            assert session.get(SecureWarning, other_guild).is_deleted is False
+            assert all(session.get(SecureWarning, i).version == 2 for i in ids)
+
+        assert service.get_warning_count("1", "0") == 0
+        assert service.get_warning_count("1", "1") == 0
+        assert service.bulk_delete_warnings(ids, "1", "3")["deleted"] == 0
+
+    def test_clear_user_warnings(self):
+        """Test that clearing a member is one transaction with one audit log."""
+        service = WarningService()
+        ids = [service.add_warning("1", "2", "3", f"R{i}").id for i in range(4)]
+        other = service.add_warning("1", "5", "3", "Other member").id
+
+        with patch.object(
+            Session,
+            "commit",
+            autospec=True,
+            side_effect=Session.commit,
+        ) as commit:
+            assert service.clear_user_warnings("1", "2", "3") == 4
+            assert commit.call_count == 1
+
+        with self.Session() as session:
+            assert all(session.get(SecureWarning, i).is_deleted for i in ids)
+            assert session.get(SecureWarning, other).is_deleted is False
+            (log,) = session.query(ModerationLog).filter(
+                ModerationLog.action_type == "warning_deleted",
+            )
+            assert log.get_decrypted_reason() == "Cleared 4 warnings"
+            assert log.user_id_hash == security_manager.hash_discord_id("2")
+
+        assert service.get_warning_count("1", "2") == 0
+        assert service.get_warning_count("1", "5") == 1
+        assert service.clear_user_warnings("1", "2", "3") == 0
+
+
+class TestStreamingExport:
+    """Test the streaming GDPR export."""
+
+    GUILD_ID = "123456789012345678"
+    USER_ID = "987654321098765432"
+    MODERATOR_ID = "555666777888999000"
+
+    @classmethod
+    def setup_class(cls):
+        """Setup test database."""
+        cls.Session = sessionmaker(bind=engine)
+        Base.metadata.create_all(bind=engine)
+
+    def teardown_method(self):
+        """Cleanup after each test."""
+        with self.Session() as session:
+            session.query(GDPRRequest).delete()
+            session.query(WarningCounter).delete()
+            session.query(ModerationLog).delete()
+            session.query(SecureWarning).delete()
+            session.commit()
+
+    @staticmethod
+    def read_export(path: Path) -> list[dict]:
+        """Read every record of an export file."""
+        with gzip.open(path, "rt", encoding="utf-8") as export:
+            return [json.loads(line) for line in export]
+
+    def seed_logs(self, count: int) -> None:
+        """Bulk insert ``count`` moderation logs for the test user."""
+        rows = ModerationLog.bulk_values(
+            guild_id=self.GUILD_ID,
+            user_id=self.USER_ID,
+            moderator_id=self.MODERATOR_ID,
+            action_type="warn",
+            warning_ids=[None] * count,
+            reason="Seeded reason",
+            context="Seeded context",
+        )
+        with self.Session() as session:
+            session.execute(insert(ModerationLog.__table__), rows)
+            session.commit()
+
+    def test_export_matches_in_memory_export(self):
+        """Test that the file holds the same records as export_user_data."""
+        service = WarningService()
+        kept = service.add_warning(self.GUILD_ID, self.USER_ID, "3", "Kept")
+        deleted = service.add_warning(self.GUILD_ID, self.USER_ID, "3", "Deleted")
+        service.add_warning("1", self.USER_ID, "3", "Other guild")
+        service.bulk_delete_warnings([deleted.id], self.GUILD_ID, "3")
+
+        expected = service.export_user_data(self.USER_ID, self.GUILD_ID)
+        path = service.export_user_data_to_file(
+            self.USER_ID,
+            self.GUILD_ID,
+            batch_size=1,
+        )
+        try:
+            assert path.name.endswith(".ndjson.gz")
+            assert stat.S_IMODE(path.stat().st_mode) == 0o600
+            records = self.read_export(path)
+        finally:
+            path.unlink()
+
+        header, *rows = records
+        assert header["type"] == "export"
+        assert header["user_id_hash"] == expected["user_id_hash"]
+        warnings = [r for r in rows if r.pop("type") == "warning"]
+        logs = rows[len(warnings) :]
+        assert warnings == expected["warnings"]
+        assert logs == expected["moderation_logs"]
+        assert [w["id"] for w in warnings] == [kept.id, deleted.id]
+        assert "reason" not in warnings[1]
+
+        with self.Session() as session:
+            assert (
+                session.query(GDPRRequest)
+                .filter(GDPRRequest.status == "completed")
+                .count()
+                == 2
+            )
+
+    def test_failed_export_removes_file(self):
+        """Test that a failure mid-export leaves no temp file behind."""
+        service = WarningService()
+        service.add_warning(self.GUILD_ID, self.USER_ID, "3", "Reason")
+        created = []
+        real_mkstemp = tempfile.mkstemp
+
+        def mkstemp(*args, **kwargs):
+            fd, name = real_mkstemp(*args, **kwargs)
+            created.append(Path(name))
+            return fd, name
+
+        with (
+            patch("project.database.services.tempfile.mkstemp", side_effect=mkstemp),
+            patch.object(
+                ModerationLog,
+                "decrypt_fields",
+                side_effect=RuntimeError("boom"),
+            ),
+            pytest.raises(RuntimeError),
+        ):
+            service.export_user_data_to_file(self.USER_ID, self.GUILD_ID)
+
+        assert len(created) == 1
+        assert not created[0].exists()
+
+    @pytest.mark.slow
+    def test_memory_is_bounded_for_large_histories(self):
+        """Test peak memory with 100k logs stays far below a full load."""
+        self.seed_logs(100_000)
+        service = WarningService()
+
+        tracemalloc.start()
+        try:
+            path = service.export_user_data_to_file(self.USER_ID, self.GUILD_ID)
+            _current, streaming_peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as export:
+                counts = Counter(json.loads(line)["type"] for line in export)
+        finally:
+            path.unlink()
+
+        assert counts == {"export": 1, "moderation_log": 100_000}
+        assert streaming_peak < 16 * 1024 * 1024
+
+
+class TestWarningSummaries:
+    """Test the read-through warning summary cache."""
+
+    @classmethod
+    def setup_class(cls):
+        """Setup test database."""
+        cls.Session = sessionmaker(bind=engine)
+        Base.metadata.create_all(bind=engine)
+
+    def setup_method(self):
+        """Enable a fresh summary cache."""
+        self.cache = WarningSummaryCache()
+        self.patches = [
+            patch("project.database.cache.summary_cache", self.cache),
+            patch("project.database.services.summary_cache", self.cache),
+        ]
+        for cache_patch in self.patches:
+            cache_patch.start()
+
+    def teardown_method(self):
+        """Cleanup after each test."""
+        for cache_patch in self.patches:
+            cache_patch.stop()
+        with self.Session() as session:
+            session.query(WarningCounter).delete()
+            session.query(ModerationLog).delete()
+            session.query(SecureWarning).delete()
+            session.commit()
+
+    @staticmethod
+    def count_queries(func):
+        """Call ``func`` and return its result and the number of statements."""
+        statements = []
+
+        def record(*_args):
+            statements.append(1)
+
+        event.listen(engine, "before_cursor_execute", record)
+        try:
+            return func(), len(statements)
+        finally:
+            event.remove(engine, "before_cursor_execute", record)
+
+    def test_repeated_reads_hit_the_cache(self):
+        """Test that only the first read of a member queries the database."""
+        service = WarningService()
+        first = service.add_warning("1", "2", "3", "First")
+        second = service.add_warning("1", "2", "3", "Second")
+
+        summary, first_queries = self.count_queries(
+            lambda: service.get_warning_summary("1", "2"),
+        )
+        count, repeat_queries = self.count_queries(
+            lambda: service.get_warning_count("1", "2"),
+        )
+
+        assert summary.warning_ids == (second.id, first.id)
+        assert summary.created_at[0] >= summary.created_at[1]
+        assert count == 2
+        assert first_queries == 1
+        assert repeat_queries == 0
+        assert self.cache.stats()["hit_ratio"] == 0.5
+
+    def test_writes_invalidate_the_member(self):
+        """Test that every mutating method drops the member's summary."""
+        service = WarningService()
+        first = service.add_warning("1", "2", "3", "First")
+        assert service.get_warning_count("1", "2") == 1
+        service.add_warning("1", "4", "3", "Other member")
+
+        service.add_warning("1", "2", "3", "Second")
+        assert service.get_warning_count("1", "2") == 2
+
+        service.bulk_delete_warnings([first.id], "1", "3")
+        assert service.get_warning_count("1", "2") == 1
+
+        service.clear_user_warnings("1", "2", "3")
+        assert service.get_warning_count("1", "2") == 0
+        assert service.get_warning_count("1", "4") == 1
@@ -0,0 +1,180 @@
+"""Tests for the per-command unit of work."""
+
+import asyncio
+import tempfile
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from project.database.cache import WarningSummaryCache
+from project.database.connection import Base, engine, to_async_url
+from project.database.models import ModerationLog, SecureWarning, WarningCounter
+from project.database.security import security_manager
+from project.database.services import AsyncWarningService, WarningService
+from project.database.unit_of_work import (
+    async_unit_of_work,
+    begin_async_unit_of_work,
+    end_async_unit_of_work,
+    unit_of_work,
+)
+
+
+class CheckoutCounter:
+    """Count connections checked out of an engine's pool."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+
+    def _checkout(self, *_args):
+        self.count += 1
+
+    def __enter__(self):
+        event.listen(self.engine, "checkout", self._checkout)
+        return self
+
+    def __exit__(self, *_exc):
+        event.remove(self.engine, "checkout", self._checkout)
+
+
+class TestUnitOfWork:
+    """Test sync service calls sharing one unit of work."""
+
+    @classmethod
+    def setup_class(cls):
+        """Setup test database."""
+        cls.Session = sessionmaker(bind=engine)
+        Base.metadata.create_all(bind=engine)
+
+    def teardown_method(self):
+        """Cleanup after each test."""
+        with self.Session() as session:
+            session.query(WarningCounter).delete()
+            session.query(ModerationLog).delete()
+            session.query(SecureWarning).delete()
+            session.commit()
+
+    def warning_count(self) -> int:
+        """Count stored warnings from an independent session."""
+        with self.Session() as session:
+            return session.query(SecureWarning).count()
+
+    def test_calls_share_one_connection_and_commit(self):
+        """Test that a unit checks out one connection and commits on exit."""
+        service = WarningService()
+
+        with unit_of_work():
+            with CheckoutCounter(engine) as checkouts:
+                service.add_warning("1", "2", "3", "First")
+                service.add_warning("1", "2", "3", "Second")
+                assert service.get_warning_count("1", "2") == 2
+                assert len(service.get_user_warnings("1", "2")) == 2
+            # Flushed for the unit, but not committed yet
+            assert self.warning_count() == 0
+
+        assert checkouts.count == 1
+        assert self.warning_count() == 2
+
+    def test_exception_rolls_back_every_call(self):
+        """Test that an error in the unit discards all of its writes."""
+        service = WarningService()
+
+        def failing_command():
+            with unit_of_work():
+                service.add_warning("1", "2", "3", "First")
+                raise RuntimeError("command failed")
+
+        with pytest.raises(RuntimeError, match="command failed"):
+            failing_command()
+
+        assert self.warning_count() == 0
+
+    def test_summary_cache_never_sees_uncommitted_writes(self):
+        """Test that a unit reads its own writes past the summary cache."""
+        cache = WarningSummaryCache()
+        lookup_key = security_manager.create_lookup_key("1", "2")
+        service = WarningService()
+        service.add_warning("1", "2", "3", "Committed")
+
+        with (
+            patch("project.database.cache.summary_cache", cache),
+            patch("project.database.services.summary_cache", cache),
+        ):
+            assert service.get_warning_count("1", "2") == 1  # cached
+            with unit_of_work():
+                service.add_warning("1", "2", "3", "Pending")
+                assert service.get_warning_count("1", "2") == 2
+                # Other commands still get the committed state
+                assert cache.get(lookup_key).count == 1
+
+            assert cache.get(lookup_key) is None
+            assert service.get_warning_count("1", "2") == 2
+
+
+class TestAsyncUnitOfWork:
+    """Test async service calls sharing one unit of work."""
+
+    def setup_method(self):
+        """Create a fresh database file for each test."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.url = f"sqlite:///{Path(self.tmp.name) / 'unit.db'}"
+        self.engine = create_engine(self.url)
+        Base.metadata.create_all(bind=self.engine)
+        self.Session = sessionmaker(bind=self.engine)
+
+    def teardown_method(self):
+        """Dispose engines and remove the database file."""
+        self.engine.dispose()
+        self.tmp.cleanup()
+
+    def run(self, scenario):
+        """Run ``scenario(service, factory)``; return connections checked out."""
+
+        async def runner():
+            async_engine = create_async_engine(to_async_url(self.url))
+            factory = async_sessionmaker(bind=async_engine, expire_on_commit=False)
+            try:
+                with CheckoutCounter(async_engine.sync_engine) as checkouts:
+                    await scenario(AsyncWarningService(factory), factory)
+                return checkouts.count
+            finally:
+                await async_engine.dispose()
+
+        return asyncio.run(runner())
+
+    def test_command_uses_one_connection(self):
+        """Test that a command's service calls check out one connection."""
+
+        async def scenario(service, factory):
+            async with async_unit_of_work(factory):
+                _warning, count = await service.add_warning_with_count(
+                    "1",
+                    "2",
+                    "3",
+                    "Reason",
+                )
+                assert count == 1
+                assert await service.get_warning_count("1", "2") == 1
+                page = await service.get_user_warnings_page("1", "2")
+                assert len(page.warnings) == 1
+
+        assert self.run(scenario) == 1
+        with self.Session() as session:
+            assert session.query(SecureWarning).count() == 1
+            assert session.query(ModerationLog).count() == 1
+
+    def test_failed_command_rolls_back(self):
+        """Test that the after-invoke hook discards a failed command's work."""
+
+        async def scenario(service, factory):
+            begin_async_unit_of_work(factory)
+            await service.add_warning("1", "2", "3", "Reason")
+            await end_async_unit_of_work(failed=True)
+
+        self.run(scenario)
+        with self.Session() as session:
+            assert session.query(SecureWarning).count() == 0
@@ -4,6 +4,7 @@ from unittest.mock import patch
 import pytest
 
 from project.config import BotConfig
+from project.database.settings import DatabaseExecutorConfig, DatabasePoolConfig
 
 
 class TestBotConfig:
@@ -39,3 +40,47 @@ class TestBotConfig:
         """Test error when channel ID is missing."""
         with pytest.raises(ValueError, match="REPORT_CHANNEL_ID"):
             BotConfig.from_env()
+
+    @patch.dict(
+        os.environ,
+        {
+            "DB_POOL_SIZE": "20",
+            "DB_MAX_OVERFLOW": "5",
+            "DB_POOL_RECYCLE": "600",
+            "DB_POOL_TIMEOUT": "2.5",
+            "DB_POOL_PRE_PING": "false",
+        },
+    )
+    def test_database_pool_from_env(self):
+        """Test pool settings creation from environment variables."""
+        assert DatabasePoolConfig.from_env() == DatabasePoolConfig(
+            pool_size=20,
+            max_overflow=5,
+            pool_recycle=600,
+            pool_timeout=2.5,
+            pool_pre_ping=False,
+        )
+
+    @patch.dict(
+        os.environ,
+        {
+            "DB_EXECUTOR_WORKERS": "2",
+            "DB_EXECUTOR_MAX_QUEUE": "8",
+            "DB_EXECUTOR_ASYNC_ACTIVE": "3",
+        },
+    )
+    def test_database_executor_from_env(self):
+        """Test executor settings creation from environment variables."""
+        assert DatabaseExecutorConfig.from_env() == DatabaseExecutorConfig(
+            max_workers=2,
+            max_queue=8,
+            max_async_active=3,
+        )
+
+    @patch.dict(os.environ, {}, clear=True)
+    def test_database_pool_defaults(self):
+        """Test that pre-ping is left to the backend when unset."""
+        pool = DatabasePoolConfig.from_env()
+
+        assert pool.pool_size == 5
+        assert pool.pool_pre_ping is None
@@ -1,10 +1,24 @@
 """Tests for moderation cog."""
 
-from unittest.mock import MagicMock, patch
+import asyncio
+from datetime import UTC, date, datetime
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 
-from project.cogs.moderation import Moderation
+from project.cogs.moderation import (
+    DATABASE_BUSY_MESSAGE,
+    Moderation,
+    WarningHistoryView,
+    build_modstats_embed,
+    match_moderators,
+    resolve_moderators,
+)
+from project.database.analytics import GuildModerationStats
+from project.database.executor import DatabaseBusyError
+from project.database.models import SecureWarning
+from project.database.security import security_manager
+from project.database.services import WarningPage
 
 
 class TestModeration:
@@ -36,7 +50,7 @@ class TestModeration:
         assert Moderation.parse_time("30d") == 2592000  # 30 days
         assert Moderation.parse_time("31d") is None  # Over 30 days
 
-    @patch("project.cogs.moderation.init_database")
+    @patch("project.cogs.moderation.check_schema_version_async")
     @patch("project.cogs.moderation.get_config")
     def test_database_service_integration(self, mock_get_config, mock_init_db):
         """Test that moderation cog integrates with database service."""
@@ -50,7 +64,7 @@ class TestModeration:
         # Verify bot is properly set
         assert mod.bot == mock_bot
 
-    @patch("project.cogs.moderation.init_database")
+    @patch("project.cogs.moderation.check_schema_version_async")
     @patch("project.cogs.moderation.get_config")
     def test_database_initialization_failure(self, mock_get_config, mock_init_db):
         """Test moderation cog handles database initialization failure."""
@@ -60,3 +74,125 @@ class TestModeration:
 
         with pytest.raises(Exception, match="Database connection failed"):
             Moderation(mock_bot)
+
+
+class TestWarningHistoryView:
+    """Test the paged !warnings view."""
+
+    @staticmethod
+    def make_page(first_id: int, size: int, next_cursor: str | None) -> WarningPage:
+        """Build a page of fake warnings."""
+        warnings = [
+            MagicMock(id=warning_id, created_at=datetime(2024, 1, 1, tzinfo=UTC))
+            for warning_id in range(first_id, first_id - size, -1)
+        ]
+        return WarningPage(warnings=warnings, next_cursor=next_cursor)
+
+    def test_pages_decrypt_only_visible_warnings(self):
+        """Test that each render fetches and decrypts a single page."""
+        service = MagicMock()
+        service.get_user_warnings_page = AsyncMock(
+            side_effect=[
+                self.make_page(30, 10, "cursor-1"),
+                self.make_page(20, 10, "cursor-2"),
+                self.make_page(30, 10, "cursor-1"),
+            ],
+        )
+        decrypt = AsyncMock(side_effect=lambda warnings: ["Reason"] * len(warnings))
+
+        async def scenario():
+            view = WarningHistoryView(
+                service,
+                guild_id="1",
+                member=MagicMock(id=2, display_name="Member"),
+                author_id=3,
+                total=30,
+            )
+            first = await view.render()
+            assert view.previous_page.disabled
+            assert not view.next_page.disabled
+
+            view.cursors.append(view.next_cursor)
+            second = await view.render()
+            assert not view.previous_page.disabled
+
+            view.cursors.pop()
+            await view.render()
+            return first, second
+
+        with patch.object(SecureWarning, "decrypt_reasons_async", decrypt):
+            first, second = asyncio.run(scenario())
+
+        assert len(first.fields) == 10
+        assert second.fields[0].name == "Warning #20"
+        assert second.footer.text == "Page 2 • Total warnings: 30"
+        assert [len(call.args[0]) for call in decrypt.await_args_list] == [10, 10, 10]
+        cursors = [
+            call.kwargs["cursor"]
+            for call in service.get_user_warnings_page.await_args_list
+        ]
+        assert cursors == [None, "cursor-1", None]
+
+
+class TestModstatsEmbed:
+    """Test rendering of !modstats results."""
+
+    def test_moderators_resolve_to_mentions(self):
+        """Test that staff hashes become mentions and members stay hashed."""
+        moderator = MagicMock(id=10, mention="<@10>")
+        moderator.guild_permissions.manage_messages = True
+        guild = MagicMock(members=[moderator])
+        offender_hash = security_manager.hash_discord_id("2")
+        stats = GuildModerationStats(
+            days=30,
+            actions_per_day={
+                date(2024, 1, 1): {"warn": 2},
+                date(2024, 1, 2): {"warn": 1, "kick": 1},
+            },
+            top_moderators=[
+                (security_manager.hash_discord_id("10"), 3),
+                ("f" * 64, 1),
+            ],
+            repeat_offenders=[(offender_hash, 3)],
+        )
+
+        moderators = asyncio.run(resolve_moderators(stats, guild))
+        embed = build_modstats_embed(stats, moderators)
+
+        fields = {field.name: field.value for field in embed.fields}
+        assert fields["Actions (4)"] == "warn: 3\nkick: 1"
+        assert fields["Recent days"] == "2024-01-02: 2\n2024-01-01: 2"
+        assert fields["Top moderators"] == "<@10>: 3\n`ffffffff`: 1"
+        assert fields["Repeat offenders"] == f"`{offender_hash[:8]}`: 3 actions"
+
+    def test_staff_hashing_stops_once_every_moderator_is_found(self):
+        """Test that staff after the last top moderator are not hashed."""
+        staff = [(10, "<@10>"), (11, "<@11>"), (12, "<@12>")]
+        wanted = [security_manager.hash_discord_id("10")]
+
+        with patch.object(
+            security_manager,
+            "hash_discord_id",
+            wraps=security_manager.hash_discord_id,
+        ) as hash_discord_id:
+            mentions = match_moderators(wanted, staff)
+
+        assert mentions == {wanted[0]: "<@10>"}
+        hash_discord_id.assert_called_once_with("10")
+
+
+class TestDatabaseBusy:
+    """Test that commands shed by the database ask the moderator to retry."""
+
+    @patch("project.cogs.moderation.get_async_warning_service")
+    def test_busy_database_asks_to_retry(self, mock_get_service):
+        """Test the reply when admission control rejects a command."""
+        mock_get_service.return_value.clear_user_warnings = AsyncMock(
+            side_effect=DatabaseBusyError("Database saturated"),
+        )
+        ctx = MagicMock(send=AsyncMock())
+        cog = Moderation(MagicMock())
+
+        asyncio.run(Moderation.clear_warnings.callback(cog, ctx, MagicMock()))
+
+        ctx.send.assert_awaited_once_with(DATABASE_BUSY_MESSAGE)